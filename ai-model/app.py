@@ -1,29 +1,261 @@
-from flask import Flask, request, jsonify
+import time
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import os
 import re
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
-from duckduckgo_search import DDGS
+from verification_cache import VerificationCache, parse_force_refresh, parse_max_age
+from singleflight import SingleFlight
+from name_index import NameIndex
+from registry import Registry, registry_result
+from embeddings import get_encoder
+from recommender import recommend
+from cause_index import CauseIndex, parse_nearby_query
+from feature_store import FeatureStore, merge_weights, parse_ngo_names, trust_levels
+from page_cache import PageCache, conditional_headers, is_cacheable
+from http_client import SCRAPE_USER_AGENT, RateLimited, outbound
+from jobs import JobQueueFull, JobRunner, JobStore, validate_callback_url
+from deadline import (
+    DEADLINE_SCRAPE_ESTIMATE_MS, DEADLINE_SENTIMENT_ESTIMATE_MS, Deadline, StageEstimate, parse_deadline_ms, plan_scrape
+)
+from html_text import VisibleTextExtractor, extract_visible_text
+from batch_verification import BATCH_MAX_NAMES, parse_batch_names, stream_batch_results
+from sentiment_batcher import SentimentBatcher
+from inference_backends import SENTIMENT_BACKEND, TorchBackend, select_backend
+from metrics import (
+    BYTES_DOWNLOADED, IN_FLIGHT, INFERENCE_BATCH_SIZE, INFERENCE_SECONDS, LINK_FETCHES,
+    VERIFICATIONS, fetch_outcome, render_metrics, stage_timer
+)
 import warnings
 warnings.filterwarnings('ignore')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for requests from your React frontend
 
-# Load HuggingFace sentiment analysis model
-print("🔄 Loading sentiment analysis model...")
-try:
-    MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-    sentiment_model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
-    print("✅ Sentiment model loaded successfully!")
-except Exception as e:
-    print(f"⚠️ Model loading error: {e}")
-    tokenizer = None
-    sentiment_model = None
+# Scraping limits: pages are fetched in parallel, capped globally and per host,
+# and the whole stage gives up once SCRAPE_DEADLINE seconds have passed
+SCRAPE_MAX_WORKERS = int(os.getenv('SCRAPE_MAX_WORKERS', 8))
+SCRAPE_PER_HOST_LIMIT = int(os.getenv('SCRAPE_PER_HOST_LIMIT', 2))
+SCRAPE_DEADLINE = float(os.getenv('SCRAPE_DEADLINE', 8))
+SCRAPE_TIMEOUT = 5
+
+# Sentiment over scraped text: 'chunked' scores every page with overlapping token
+# windows in one batch, 'single' scores the combined text truncated to 512 tokens
+SENTIMENT_MODE = os.getenv('SENTIMENT_MODE', 'chunked')
+SENTIMENT_WINDOW_TOKENS = int(os.getenv('SENTIMENT_WINDOW_TOKENS', 512))
+SENTIMENT_WINDOW_STRIDE = int(os.getenv('SENTIMENT_WINDOW_STRIDE', 128))
+
+# Pages are streamed and parsed as they arrive; reading stops once a page has
+# given PAGE_TEXT_CHARS of visible text or SCRAPE_MAX_BYTES (html_text.py).
+# 'chunked' mode keeps enough text per page for several windows to slide over
+PAGE_TEXT_CHARS = int(os.getenv('PAGE_TEXT_CHARS', 8000 if SENTIMENT_MODE == 'chunked' else 1000))
+SCRAPE_CHUNK_BYTES = 16 * 1024
+SCRAPE_HEADERS = {
+    'User-Agent': SCRAPE_USER_AGENT
+}
+
+scrape_executor = ThreadPoolExecutor(max_workers=SCRAPE_MAX_WORKERS, thread_name_prefix='scrape')
+host_semaphores = {}
+host_semaphores_lock = threading.Lock()
+# DuckDuckGo searches run on this pool so a deadline can stop waiting for them
+SEARCH_MAX_WORKERS = int(os.getenv('SEARCH_MAX_WORKERS', 8))
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix='search')
+search_clients = threading.local()
+
+# Verification results shared by all workers through a local SQLite file
+verification_cache = VerificationCache('full')
+# Names of verified NGOs, so variants of a name reuse one verification
+name_index = NameIndex('full')
+# Offline NGO registry export (NGO_REGISTRY_PATH); a match adds registry_match
+registry = Registry()
+# Concurrent verifications of the same NGO share one pipeline run
+verification_flights = SingleFlight()
+# Extracted text of every scraped URL, revalidated with conditional GETs
+page_cache = PageCache(f"page{PAGE_TEXT_CHARS}")  # text cut at another length is not reused
+# Verifications requested with "async": true, polled at /jobs/<id> (jobs.py)
+job_store = JobStore('full')
+# Cause catalog ranked by /predict, shared by workers through a memory-mapped snapshot
+# (with sentence embeddings when EMBEDDING_MODEL_DIR is set)
+cause_index = CauseIndex(encoder=get_encoder())
+# Recent scrape and sentiment stage run times, to plan around a deadline_ms
+scrape_estimate = StageEstimate(DEADLINE_SCRAPE_ESTIMATE_MS / 1000)
+sentiment_estimate = StageEstimate(DEADLINE_SENTIMENT_ESTIMATE_MS / 1000)
+
+# Points awarded by calculate_trust_score. /rescore reapplies them (or overrides
+# sent with the request) to the features saved for every verified NGO.
+SCORING_WEIGHTS = {
+    'base': 50,
+    'positive_sentiment': 30,   # times the sentiment score
+    'negative_sentiment': 20,   # times the sentiment score, subtracted
+    'links_strong': 20,         # 5+ links
+    'links_moderate': 10,       # 3-4 links
+    'links_limited': 5,         # 1-2 links
+    'links_none': -10,
+    'wikipedia': 15,
+    'official_domain': 10,      # .org/.gov link
+    'rich_content': 5,          # more than 3000 characters scraped
+    'limited_content': -5,      # less than 500 characters scraped
+    'registry_match': 15,       # listed in the offline NGO registry
+    'registry_confirmed': 20    # registration ID confirmed by the registry (web checks skipped)
+}
+TRUST_LEVELS = [(80, 'HIGH'), (60, 'MEDIUM'), (40, 'LOW'), (0, 'VERY LOW')]
+FEATURE_COLUMNS = [
+    'num_links', 'has_wikipedia', 'has_org_domain',
+    'sentiment_positive', 'sentiment_negative', 'sentiment_score', 'text_length',
+    'registry_match', 'registry_confirmed'
+]
+feature_store = FeatureStore('full', FEATURE_COLUMNS)
+
+# Heavy dependencies (torch, transformers, duckduckgo_search) are imported
+# where they are first needed so /livez can answer before they finish loading.
+# MODEL_LOAD_MODE=eager loads the model at import time, which under gunicorn's
+# preload_app happens once in the master so forked workers share the weights
+# copy-on-write. MODEL_LOAD_MODE=background loads it on a thread instead and
+# /readyz reports 503 until it is done.
+MODEL_NAME = os.getenv('SENTIMENT_MODEL_PATH', "cardiffnlp/twitter-roberta-base-sentiment-latest")
+MODEL_LOAD_MODE = os.getenv('MODEL_LOAD_MODE', 'eager')
+# Non-PyTorch backends are checked against the fp32 reference on a fixture corpus
+SENTIMENT_BACKEND_CHECK = os.getenv('SENTIMENT_BACKEND_CHECK', '1') == '1'
+# Set by gunicorn.conf.py: the preloading master only loads the PyTorch model.
+# ONNX Runtime sessions and quantized kernels start OpenMP/intra-op thread pools
+# that don't survive fork, so each worker builds (and checks) the configured
+# backend in post_fork (ensure_backend)
+defer_backend = os.getenv('SENTIMENT_BACKEND_AFTER_FORK') == '1'
+
+tokenizer = None
+sentiment_model = None
+sentiment_backend = None
+backend_pending = False  # the configured backend is still to be built in this worker
+model_state = 'not_loaded'  # not_loaded -> loading -> loaded | failed
+model_error = None
+model_loader_pid = None
+model_loader_lock = threading.Lock()
+startup_timings = {}
+
+
+@contextmanager
+def startup_phase(name):
+    """Record and log how long a startup phase takes"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"⏱️ Startup phase '{name}' took {startup_timings[name]:.0f}ms")
+
+
+def load_model():
+    """Load HuggingFace sentiment analysis model"""
+    global tokenizer, sentiment_model, sentiment_backend, backend_pending, model_state, model_error
+    
+    print("🔄 Loading sentiment analysis model...")
+    model_state = 'loading'
+    try:
+        with startup_phase('import_ml_libraries'):
+            from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        with startup_phase('load_tokenizer'):
+            loaded_tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        with startup_phase('load_model'):
+            loaded_model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+            loaded_model.eval()
+        deferred = defer_backend and SENTIMENT_BACKEND != 'pytorch'
+        if deferred:
+            loaded_backend = TorchBackend(loaded_model)
+            print(f"🧮 Sentiment backend: pytorch until each worker builds '{SENTIMENT_BACKEND}' after the fork")
+        else:
+            with startup_phase('load_backend'):
+                loaded_backend = select_backend(
+                    SENTIMENT_BACKEND, loaded_model, loaded_tokenizer, MODEL_NAME,
+                    check=SENTIMENT_BACKEND_CHECK
+                )
+            print(f"🧮 Sentiment backend: {loaded_backend.name}")
+        
+        tokenizer, sentiment_model, sentiment_backend = loaded_tokenizer, loaded_model, loaded_backend
+        backend_pending = deferred
+        model_state = 'loaded'
+        print("✅ Sentiment model loaded successfully!")
+    except Exception as e:
+        print(f"⚠️ Model loading error: {e}")
+        model_error = str(e)
+        model_state = 'failed'
+    
+    startup_timings['time_to_ready'] = round((time.perf_counter() - STARTUP_STARTED) * 1000, 1)
+    print(f"⏱️ Ready {startup_timings['time_to_ready']:.0f}ms after start")
+
+
+def ensure_model_loading():
+    """Start loading the model in this process unless it is loaded or already loading"""
+    global model_loader_pid
+    
+    with model_loader_lock:
+        if model_state in ('loaded', 'failed') or model_loader_pid == os.getpid():
+            return
+        model_loader_pid = os.getpid()
+    
+    if MODEL_LOAD_MODE == 'background':
+        threading.Thread(target=load_model, name='model-loader', daemon=True).start()
+    else:
+        load_model()
+
+
+def ensure_backend():
+    """
+    Build the configured sentiment backend in this worker (gunicorn post_fork)
+    
+    From here on this process builds its backend itself when it loads the model.
+    If the preloading master deferred the backend, it is built now, on a thread
+    with MODEL_LOAD_MODE=background; the PyTorch model answers meanwhile.
+    """
+    global defer_backend, backend_pending
+    
+    with model_loader_lock:
+        defer_backend = False
+        if model_state != 'loaded' or not backend_pending:
+            return
+        backend_pending = False
+    
+    def build():
+        global sentiment_backend
+        with startup_phase('load_backend'):
+            sentiment_backend = select_backend(
+                SENTIMENT_BACKEND, sentiment_model, tokenizer, MODEL_NAME, check=SENTIMENT_BACKEND_CHECK
+            )
+        print(f"🧮 Sentiment backend: {sentiment_backend.name}")
+    
+    if MODEL_LOAD_MODE == 'background':
+        threading.Thread(target=build, name='backend-loader', daemon=True).start()
+    else:
+        build()
+
+
+startup_timings['app_init'] = round((time.perf_counter() - STARTUP_STARTED) * 1000, 1)
+ensure_model_loading()
+
+
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive'}), 200
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: the sentiment model is loaded and verifications can run"""
+    if model_state != 'loaded':
+        return jsonify({
+            'status': 'not_ready',
+            'model_state': model_state,
+            'error': model_error
+        }), 503
+    
+    return jsonify({'status': 'ready', 'model_state': model_state}), 200
 
 
 @app.route('/health', methods=['GET'])
@@ -32,11 +264,31 @@ def health():
     return jsonify({
         'status': 'healthy',
         'model_loaded': sentiment_model is not None,
+        'model_state': model_state,
+        'sentiment_backend': sentiment_backend.name if sentiment_backend else None,
+        'startup_timings': startup_timings,
         'model_name': 'NGO Verification Engine (Sentiment + Web Search)',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'cache': verification_cache.stats(),
+        'names': name_index.stats(),
+        'registry': registry.stats(),
+        'coalescing': verification_flights.stats(),
+        'outbound': outbound.stats(),
+        'page_cache': page_cache.stats(),
+        'jobs': job_store.stats(),
+        'cause_index': cause_index.stats(),
+        'embeddings': cause_index.encoder.stats() if cause_index.encoder else None,
+        'sentiment_batching': sentiment_batcher.metrics()
     }), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics (aggregated across gunicorn workers)"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
 @app.route('/verify_ngo', methods=['POST'])
 def verify_ngo():
     """
@@ -44,9 +296,26 @@ def verify_ngo():
     
     Expected input:
     {
-        "ngo_name": "Akshaya Patra Foundation"
+        "ngo_name": "Akshaya Patra Foundation",
+        "registration_id": "KA/2017/0123456",  # optional, NGO Darpan ID or registration number
+        "max_age": 86400,         # optional, oldest cached result accepted (seconds)
+        "force_refresh": false,   # optional, skip the cache and re-verify
+        "deadline_ms": 3000,      # optional, latency budget; stages that do not fit are skipped
+        "async": false,           # optional, queue a job and return 202 at once
+        "callback_url": "https://..."  # optional with async, receives the finished job
     }
     
+    With "async": true the response is {"job_id", "status": "queued",
+    "status_url": "/jobs/<job_id>", ...} and the result is polled there.
+    
+    With deadline_ms the response also has "deadline_ms", "elapsed_ms" and
+    "skipped_stages" (any of "search", "scrape", "sentiment").
+    
+    An NGO found in the offline registry (registry.py) gains registry_match
+    points; the matched records are returned as "registry". A registration_id
+    match (with the same name) confirms the NGO without any network access: the
+    search, scraping and sentiment stages are skipped.
+    
     Expected output:
     {
         "ngo_name": "Akshaya Patra Foundation",
@@ -56,7 +325,8 @@ def verify_ngo():
         "links": [...],
         "trust_score": 91.6,
         "trust_level": "HIGH",
-        "notes": [...]
+        "notes": [...],
+        "cached": false
     }
     """
     try:
@@ -70,188 +340,796 @@ def verify_ngo():
         if not ngo_name:
             return jsonify({'error': 'NGO name is required'}), 400
         
-        print(f"🔍 Verifying NGO: {ngo_name}")
+        try:
+            deadline_ms = parse_deadline_ms(data.get('deadline_ms'))
+            max_age = parse_max_age(data.get('max_age'))
+            force_refresh = parse_force_refresh(data.get('force_refresh'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Step 1: Search the web for NGO
-        links = search_ngo(ngo_name)
-        print(f"📄 Found {len(links)} links")
+        if data.get('async'):
+            try:
+                callback_url = validate_callback_url(data.get('callback_url'))
+                job = job_runner.submit(
+                    ngo_name,
+                    {
+                        'max_age': max_age,
+                        'force_refresh': force_refresh,
+                        'deadline_ms': deadline_ms,
+                        'registration_id': data.get('registration_id')
+                    },
+                    callback_url
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except JobQueueFull as e:
+                return jsonify({'error': str(e)}), 503
+            status_url = f"/jobs/{job['job_id']}"
+            return jsonify({**job, 'status_url': status_url}), 202, {'Location': status_url}
         
-        # Step 2: Scrape content from links
-        text_content = scrape_links(links, max_links=5)
-        print(f"📝 Scraped {len(text_content)} characters of text")
+        result = get_verification(
+            ngo_name,
+            max_age=max_age,
+            force_refresh=force_refresh,
+            deadline_ms=deadline_ms,
+            registration_id=data.get('registration_id')
+        )
         
-        # Step 3: Perform sentiment analysis
-        sentiment_result = analyze_sentiment(text_content)
-        print(f"💭 Sentiment: {sentiment_result['label']} ({sentiment_result['score']:.2f})")
+        return jsonify(result), 200
         
-        # Step 4: Calculate trust score
+    except Exception as e:
+        print(f"❌ Error verifying NGO: {str(e)}")
+        VERIFICATIONS.labels(engine='full', outcome='error').inc()
+        return jsonify(error_result(data.get('ngo_name', 'Unknown'), e)), 500
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """State of a verification job, with its result once the status is done"""
+    job_runner.ensure_started()
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job), 200
+
+
+@app.route('/verify_ngo/batch', methods=['POST'])
+def verify_ngo_batch():
+    """
+    Verify many NGOs concurrently and stream the results as NDJSON
+    
+    Expected input:
+    {
+        "ngo_names": ["Akshaya Patra Foundation", "Goonj", ...],
+        "max_age": 86400,         # optional, applied to every name
+        "force_refresh": false    # optional, applied to every name
+    }
+    
+    Output: one JSON object per line, in completion order, each with the
+    NGO's position in the request as "index" plus the /verify_ngo fields. A
+    name given more than once is verified once and sent once per position.
+    """
+    data = request.get_json(silent=True)
+    ngo_names = parse_batch_names(data)
+    
+    if not ngo_names:
+        return jsonify({'error': 'ngo_names must be a non-empty list'}), 400
+    if len(ngo_names) > BATCH_MAX_NAMES:
+        return jsonify({'error': f'At most {BATCH_MAX_NAMES} NGOs per batch'}), 400
+    
+    try:
+        max_age = parse_max_age(data.get('max_age'))
+        force_refresh = parse_force_refresh(data.get('force_refresh'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    print(f"📦 Batch verification of {len(ngo_names)} NGOs")
+    
+    def verify(ngo_name):
+        return get_verification(ngo_name, max_age=max_age, force_refresh=force_refresh)
+    
+    return Response(
+        stream_batch_results(ngo_names, verify, error_result),
+        mimetype='application/x-ndjson'
+    )
+
+
+@app.route('/rescore', methods=['POST'])
+def rescore_view():
+    """
+    Reapply the scoring rules to the saved features of verified NGOs
+    
+    Expected input (all optional):
+    {
+        "weights": {"wikipedia": 20, "links_none": -15},  # overrides of SCORING_WEIGHTS
+        "ngo_names": ["Goonj", ...],                      # default: every stored NGO
+        "update_cache": false                             # write the new scores into cached results
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(rescore(data.get('weights'), data.get('ngo_names'), data.get('update_cache', False))), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    """
+    Rank causes for a volunteer (recommender.py)
+    
+    Expected input:
+    {
+        "userId": "user_123",
+        "interests": ["education"],
+        "skills": ["teaching", "coding"],
+        "location": {"lat": 12.97, "lng": 77.59},   # optional
+        "topK": 10,                                # optional
+        "causes": [{"id": "cause_001", "title": ..., "category": ..., "location": {...}, "requiredSkills": [...]}],
+        "filter": {"categories": ["education"], "ids": [...],  # optional
+                   "maxDistanceKm": 25, "nearest": 50}
+    }
+    
+    Without "causes" the resident catalog (POST /causes) is ranked instead.
+    
+    Expected output:
+    {
+        "success": true,
+        "recommendations": [{"causeId": "cause_001", "score": 0.71, "reason": "...", "distanceKm": 1.0}, ...]
+    }
+    """
+    try:
+        return jsonify(recommend(request.get_json(silent=True), cause_index)), 200
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+
+@app.route('/causes', methods=['POST'])
+def upsert_causes():
+    """Add or replace causes in the resident catalog used by /predict: {"causes": [...]}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        stored = cause_index.upsert(data.get('causes'))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    return jsonify({'success': True, 'upserted': stored, **cause_index.stats()}), 200
+
+
+@app.route('/causes/<cause_id>', methods=['DELETE'])
+def delete_cause(cause_id):
+    """Remove one cause from the resident catalog"""
+    if not cause_index.delete([cause_id]):
+        return jsonify({'error': 'Unknown cause', 'success': False}), 404
+    return jsonify({'success': True, 'deleted': 1, **cause_index.stats()}), 200
+
+
+@app.route('/causes/delete', methods=['POST'])
+def delete_causes():
+    """Remove several causes from the resident catalog: {"ids": [...]}"""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list):
+        return jsonify({'error': 'ids must be a list', 'success': False}), 400
+    return jsonify({'success': True, 'deleted': cause_index.delete(ids), **cause_index.stats()}), 200
+
+@app.route('/causes/nearby', methods=['GET'])
+def nearby_causes():
+    """Causes of the resident catalog near a point: ?lat=&lng= with radiusKm (km), k (nearest) or both"""
+    try:
+        lat, lng, radius_km, k = parse_nearby_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    causes = cause_index.nearby(lat, lng, radius_km, k)
+    return jsonify({'success': True, 'causes': causes, 'count': len(causes)}), 200
+
+
+
+def get_verification(ngo_name, max_age=None, force_refresh=False, deadline_ms=None, registration_id=None):
+    """
+    Return a cached verification when one is fresh enough, otherwise run the pipeline
+    
+    With deadline_ms the pipeline skips or shortens stages to answer within it.
+    Only requests with the same budget share a pipeline run.
+    
+    The name is first resolved against the verified NGOs (name_index.py), so
+    spellings with the same canonical key share a cached result and pipeline
+    run. A name merely close to a verified NGO is verified on its own, with that
+    NGO as canonical["suggestion"], unless it is a near-duplicate with the same
+    legal suffix and registration_id (canonical["reused"]).
+    Otherwise registration_id is only used when the pipeline runs (a cached
+    result is returned as it is).
+    """
+    canonical, cached = lookup_verification(ngo_name, registration_id, max_age, force_refresh)
+    if cached is not None:
+        return cached
+    ngo_name = canonical['name']
+    
+    key = canonical['key'] if deadline_ms is None else f"{canonical['key']}@{deadline_ms}ms"
+    result, shared = verification_flights.do(key, compute_verification, ngo_name, deadline_ms, registration_id)
+    if shared:
+        print(f"🔗 Joined running verification of {ngo_name}")
+        VERIFICATIONS.labels(engine='full', outcome='coalesced').inc()
+        return {**result, 'cached': False, 'coalesced': True, 'canonical': canonical}
+    
+    return {**result, 'cached': False, 'canonical': canonical}
+
+
+def lookup_verification(ngo_name, registration_id=None, max_age=None, force_refresh=False):
+    """
+    Resolve a name against the verified NGOs and look up its cached result
+    
+    Returns (canonical, response), response being the cached result as
+    /verify_ngo returns it, or None when the pipeline has to run for
+    canonical["name"]. Shared with app_async.py.
+    """
+    canonical = name_index.resolve(ngo_name, registration_id)
+    if canonical['match'] == 'fuzzy':
+        print(f"🪪 {ngo_name} is close to verified NGO {canonical['suggestion']} ({canonical['similarity']}), "
+              f"{'using its result' if canonical['reused'] else 'verifying it as is'}")
+    if not force_refresh:
+        cached = verification_cache.get(canonical['name'], max_age=max_age)
+        if cached is not None:
+            result, age = cached
+            print(f"⚡ Cache hit for {canonical['name']} ({age:.0f}s old)")
+            VERIFICATIONS.labels(engine='full', outcome='cached').inc()
+            return canonical, {**result, 'cached': True, 'cache_age': round(age, 1), 'canonical': canonical}
+    return canonical, None
+
+
+def error_result(ngo_name, error):
+    """The /verify_ngo answer for a verification that raised"""
+    return {
+        'error': str(error),
+        'ngo_name': ngo_name,
+        'trust_score': 0,
+        'trust_level': 'ERROR'
+    }
+
+
+def run_verification_job(ngo_name, params):
+    """Body of an async /verify_ngo job"""
+    return get_verification(
+        ngo_name,
+        max_age=params.get('max_age'),
+        force_refresh=params.get('force_refresh', False),
+        deadline_ms=params.get('deadline_ms'),
+        registration_id=params.get('registration_id')
+    )
+
+
+# Started per worker (gunicorn post_fork) so the preloading master runs no jobs
+job_runner = JobRunner(job_store, run_verification_job)
+
+
+def compute_verification(ngo_name, deadline_ms=None, registration_id=None):
+    """Run the pipeline for a cache miss and cache the result"""
+    with IN_FLIGHT.labels(engine='full').track_inprogress():
+        result = run_verification(ngo_name, Deadline(deadline_ms), registration_id)
+    VERIFICATIONS.labels(engine='full', outcome='computed').inc()
+    save_verification(ngo_name, result, registration_id)
+    return result
+
+
+def save_verification(ngo_name, result, registration_id=None):
+    """Cache a computed result and add its name to the verified NGOs"""
+    # Results computed without the sentiment model (unless the registry confirmed
+    # the NGO), or that skipped a stage to meet a deadline, are not worth keeping
+    confirmed = (result.get('registry') or {}).get('matched_by') == 'registration_id'
+    if (sentiment_model is not None or confirmed) and not result.get('skipped_stages'):
+        verification_cache.put(ngo_name, result)
+        name_index.add(ngo_name, registration_id)
+
+
+def run_verification(ngo_name, deadline=None, registration_id=None):
+    """
+    Run the full registry lookup, search, scrape, sentiment and scoring pipeline for one NGO
+    
+    An NGO the registry confirms by registration ID is scored without any
+    network access; a name match only adds to the score of the web checks.
+    """
+    deadline = deadline or Deadline()
+    print(f"🔍 Verifying NGO: {ngo_name}")
+    
+    with stage_timer('full', 'total'):
+        registry_records, matched_by = check_registry(ngo_name, registration_id)
+        if matched_by == 'registration_id':
+            links, text_content = [], ''
+            sentiment_result = {'label': 'NEUTRAL', 'score': 0.5, 'pages': []}
+        else:
+            links, text_content, sentiment_result = analyze_web_presence(ngo_name, deadline)
+        return score_verification(
+            ngo_name, deadline, links, text_content, sentiment_result, registry_records, matched_by
+        )
+
+
+def check_registry(ngo_name, registration_id=None):
+    """Registry stage: returns (registry_records, matched_by)"""
+    with stage_timer('full', 'registry'):
+        registry_records, matched_by = registry.lookup(ngo_name, registration_id)
+    if matched_by == 'registration_id':
+        print("📒 Found in NGO registry by registration_id, skipping the web checks")
+    elif registry_records:
+        print("📒 Found in NGO registry by name")
+    return registry_records, matched_by
+
+
+def score_verification(ngo_name, deadline, links, text_content, sentiment_result, registry_records=(), matched_by=None):
+    """Scoring stage: the /verify_ngo result for the web checks and registry lookup"""
+    # Step 4: Calculate trust score
+    with stage_timer('full', 'scoring'):
         trust_data = calculate_trust_score(
             ngo_name, 
             sentiment_result, 
             links, 
-            len(text_content)
+            len(text_content),
+            registry_records=registry_records,
+            matched_by=matched_by
         )
+    
+    print(f"✅ Trust Score: {trust_data['trust_score']:.1f}/100 ({trust_data['trust_level']})")
+    
+    # Keep the raw scoring inputs so /rescore can apply new weights later
+    confirmed = matched_by == 'registration_id'
+    if (sentiment_model is not None or confirmed) and not deadline.skipped:
+        feature_store.put(
+            ngo_name,
+            scoring_features(sentiment_result, links, len(text_content), registry_records, matched_by),
+            trust_data['trust_score']
+        )
+    
+    # Combine all results
+    result = {
+        'ngo_name': ngo_name,
+        'sentiment_label': sentiment_result['label'],
+        'sentiment_score': sentiment_result['score'],
+        'num_links': len(links),
+        'links': links[:5],  # Return top 5 links
+        'page_sentiments': sentiment_result.get('pages', []),
+        **trust_data,
+        'registry': registry_result(registry_records, matched_by)
+    }
+    return deadline.annotate(result)
+
+
+def analyze_web_presence(ngo_name, deadline):
+    """
+    Search, scrape and sentiment stages: returns (links, text_content, sentiment_result)
+    
+    Under a bounded Deadline, the search is abandoned once the budget is spent,
+    scraping gets what is left after reserving the model's recent run time and
+    falls back to the search snippets when that is too little, and the model is
+    skipped when it no longer fits.
+    """
+    # Step 1: Search the web for NGO
+    with stage_timer('full', 'search'):
+        links, snippets = search_ngo(ngo_name, deadline=deadline)
+    print(f"📄 Found {len(links)} links")
+    
+    # Step 2: Scrape content from links
+    plan = plan_scrape_stage(deadline)
+    if plan is None:
+        pages = snippets
+        print(f"⏱️ No time left to scrape, using {len(pages)} search snippets")
+    else:
+        max_links, scrape_seconds = plan
+        started = time.monotonic()
+        with stage_timer('full', 'scrape'):
+            pages = scrape_pages(links, max_links=max_links, deadline_seconds=scrape_seconds)
+        if links:
+            scrape_estimate.observe(time.monotonic() - started)
+    text_content = combine_pages(pages)
+    print(f"📝 Scraped {len(text_content)} characters of text")
+    
+    # Step 3: Perform sentiment analysis
+    sentiment_result = sentiment_stage(pages, text_content, deadline)
+    return links, text_content, sentiment_result
+
+
+def plan_scrape_stage(deadline):
+    """
+    (max_links, seconds) the scrape stage gets, reserving the sentiment model's
+    recent run time, or None (scrape skipped) when that leaves too little
+    """
+    plan = plan_scrape(
+        deadline,
+        sentiment_estimate.seconds if sentiment_model is not None else 0,
+        max_links=5,
+        stage_seconds=SCRAPE_DEADLINE,
+        estimate=scrape_estimate
+    )
+    if plan is None:
+        deadline.skip('scrape')
+    return plan
+
+
+def sentiment_stage(pages, text_content, deadline):
+    """Score the scraped pages, or answer NEUTRAL when the model no longer fits the deadline"""
+    model_available = sentiment_model is not None
+    if model_available and not sentiment_estimate.fits(deadline):
+        deadline.skip('sentiment')
+        print("⏱️ No time left for the sentiment model")
+        return {'label': 'NEUTRAL', 'score': 0.5, 'pages': []}
+    
+    started = time.monotonic()
+    with stage_timer('full', 'sentiment'):
+        if SENTIMENT_MODE == 'chunked':
+            sentiment_result = analyze_sentiment_chunked(pages)
+        else:
+            sentiment_result = analyze_sentiment(text_content)
+    if model_available and pages:
+        sentiment_estimate.observe(time.monotonic() - started)
+    print(f"💭 Sentiment: {sentiment_result['label']} ({sentiment_result['score']:.2f})")
+    return sentiment_result
+
+
+def get_ddgs():
+    """Return this thread's DuckDuckGo client, reused across searches (keeps its connections alive)"""
+    from duckduckgo_search import DDGS
+    
+    if not hasattr(search_clients, 'ddgs'):
+        search_clients.ddgs = DDGS()
+    return search_clients.ddgs
+
+
+def search_ngo(ngo_name, max_results=10, deadline=None):
+    """
+    Search for NGO using DuckDuckGo, returning (links, [(link, snippet), ...])
+    
+    Under a bounded Deadline the search is given up once the budget is spent
+    (skipped stage 'search') and the NGO is scored without any links.
+    """
+    deadline = deadline or Deadline()
+    if deadline.remaining() == 0:
+        deadline.skip('search')
+        print("⏱️ No time left to search")
+        return [], []
+    
+    # Rate limited and retried on rate limit errors, never past the deadline (http_client.py)
+    future = search_executor.submit(
+        outbound.call,
+        'duckduckgo.com',
+        lambda: [r for r in get_ddgs().text(f"{ngo_name} NGO official", max_results=max_results) if 'href' in r],
+        deadline=deadline.expires
+    )
+    try:
+        results = future.result(timeout=deadline.timeout())
+    except (FutureTimeoutError, RateLimited):
+        future.cancel()
+        deadline.skip('search')
+        print("⏱️ Deadline reached before DuckDuckGo answered")
+        return [], []
+    except Exception as e:
+        print(f"⚠️ Search error: {e}")
+        return [], []
+    
+    links = [r['href'] for r in results]
+    snippets = [(r['href'], r['body']) for r in results if r.get('body')]
+    return links, snippets
+
+
+def get_host_semaphore(link):
+    """Return the semaphore limiting concurrent fetches to the link's host"""
+    host = urlparse(link).netloc.lower()
+    with host_semaphores_lock:
+        if host not in host_semaphores:
+            host_semaphores[host] = threading.BoundedSemaphore(SCRAPE_PER_HOST_LIMIT)
+        return host_semaphores[host]
+
+
+def extract_text(html):
+    """Return the first PAGE_TEXT_CHARS characters of visible text in an HTML page"""
+    return extract_visible_text(html, PAGE_TEXT_CHARS)
+
+
+def read_page_text(response):
+    """
+    Stream a response body through the text extractor, returning (text, bytes_read)
+    
+    Stops reading as soon as the page has given enough visible text or the byte
+    limit is reached, so the rest of a large page is never downloaded.
+    """
+    extractor = VisibleTextExtractor(PAGE_TEXT_CHARS, encoding=response.encoding)
+    for chunk in response.iter_content(SCRAPE_CHUNK_BYTES):
+        if extractor.feed_bytes(chunk):
+            break
+    return extractor.get_text(), extractor.bytes_read
+
+
+def fetch_page_text(link, deadline):
+    """Fetch a single page and return its first PAGE_TEXT_CHARS characters of visible text"""
+    cached = page_cache.get(link)
+    if cached is not None and cached.fresh:
+        LINK_FETCHES.labels(engine='full', outcome='cached').inc()
+        return cached.text
+    
+    host_semaphore = get_host_semaphore(link)
+    if not host_semaphore.acquire(timeout=max(0, deadline - time.monotonic())):
+        print(f"⚠️ Scraping skipped for {link}: host busy until deadline")
+        LINK_FETCHES.labels(engine='full', outcome='skipped').inc()
+        return ""
+    
+    try:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            LINK_FETCHES.labels(engine='full', outcome='skipped').inc()
+            return ""
         
-        print(f"✅ Trust Score: {trust_data['trust_score']:.1f}/100 ({trust_data['trust_level']})")
-        
-        # Combine all results
-        result = {
-            'ngo_name': ngo_name,
-            'sentiment_label': sentiment_result['label'],
-            'sentiment_score': sentiment_result['score'],
-            'num_links': len(links),
-            'links': links[:5],  # Return top 5 links
-            **trust_data
-        }
+        with stage_timer('full', 'fetch'):
+            response = outbound.get(
+                link,
+                headers={**SCRAPE_HEADERS, **conditional_headers(cached)},
+                timeout=SCRAPE_TIMEOUT,
+                deadline=deadline,
+                respect_robots=True,
+                stream=True
+            )
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            page_cache.revalidated(link)
+            LINK_FETCHES.labels(engine='full', outcome='not_modified').inc()
+            return cached.text
         
-        return jsonify(result), 200
+        with response, stage_timer('full', 'read'):
+            text, bytes_read = read_page_text(response)
+        BYTES_DOWNLOADED.labels(engine='full').inc(bytes_read)
         
+    except requests.RequestException as e:
+        print(f"⚠️ Scraping error for {link}: {e}")
+        LINK_FETCHES.labels(engine='full', outcome=fetch_outcome(e)).inc()
+        return ""
     except Exception as e:
-        print(f"❌ Error verifying NGO: {str(e)}")
-        return jsonify({
-            'error': str(e),
-            'ngo_name': data.get('ngo_name', 'Unknown'),
-            'trust_score': 0,
-            'trust_level': 'ERROR'
-        }), 500
+        print(f"⚠️ Parsing error for {link}: {e}")
+        LINK_FETCHES.labels(engine='full', outcome='parse_error').inc()
+        return ""
+    finally:
+        host_semaphore.release()
+    
+    LINK_FETCHES.labels(engine='full', outcome='ok' if response.ok else 'http_error').inc()
+    if is_cacheable(response.headers):
+        page_cache.put(
+            link, text, response.status_code,
+            response.headers.get('ETag'), response.headers.get('Last-Modified')
+        )
+    return text
 
 
-def search_ngo(ngo_name, max_results=10):
-    """Search for NGO using DuckDuckGo"""
-    try:
-        ddgs = DDGS()
-        results = ddgs.text(f"{ngo_name} NGO official", max_results=max_results)
-        links = [r['href'] for r in results if 'href' in r]
-        return links
-    except Exception as e:
-        print(f"⚠️ Search error: {e}")
+def scrape_pages(links, max_links=5, deadline_seconds=None):
+    """
+    Scrape text content from NGO links, returning [(link, text), ...]
+    
+    All links are fetched concurrently (bounded by SCRAPE_MAX_WORKERS overall and
+    SCRAPE_PER_HOST_LIMIT per host). Pages that have not finished when the stage
+    deadline expires are dropped. Pages are returned in the original link order so
+    the result does not depend on which page answered first.
+    """
+    links = links[:max_links]
+    if not links:
         return []
+    
+    if deadline_seconds is None:
+        deadline_seconds = SCRAPE_DEADLINE
+    deadline = time.monotonic() + deadline_seconds
+    
+    futures = [scrape_executor.submit(fetch_page_text, link, deadline) for link in links]
+    done, not_done = wait(futures, timeout=deadline_seconds)
+    
+    for future in not_done:
+        future.cancel()
+    if not_done:
+        print(f"⚠️ Scraping deadline reached, dropped {len(not_done)} slow page(s)")
+    
+    pages = []
+    for link, future in zip(links, futures):
+        if future in done:
+            text = future.result()
+            if text:
+                pages.append((link, text))
+    
+    return pages
 
 
-def scrape_links(links, max_links=5):
-    """Scrape text content from NGO links"""
+def combine_pages(pages):
+    """Join scraped page texts in link order"""
     all_text = ""
-    
-    for link in links[:max_links]:
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(link, headers=headers, timeout=5)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Get text and clean it
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            all_text += text[:1000] + " "  # Take first 1000 chars from each page
-            
-        except Exception as e:
-            print(f"⚠️ Scraping error for {link}: {e}")
-            continue
+    for _, text in pages:
+        all_text += text + " "
     
     return all_text[:5000]  # Limit total text to 5000 chars
 
 
-def analyze_sentiment(text):
-    """Analyze sentiment using HuggingFace model"""
-    if not text or sentiment_model is None or tokenizer is None:
-        return {'label': 'NEUTRAL', 'score': 0.5}
+def scrape_links(links, max_links=5, deadline_seconds=None):
+    """Scrape text content from NGO links"""
+    return combine_pages(scrape_pages(links, max_links=max_links, deadline_seconds=deadline_seconds))
+
+
+SENTIMENT_LABELS = ['NEGATIVE', 'NEUTRAL', 'POSITIVE']
+
+
+def run_sentiment_batch(windows):
+    """Run one padded forward pass over token windows; returns one softmax row per window"""
+    # Pad the windows of every request in the batch to the longest one
+    inputs = tokenizer.pad({'input_ids': windows}, return_tensors="pt")
+    
+    # Get predictions (model outputs: negative=0, neutral=1, positive=2)
+    INFERENCE_BATCH_SIZE.labels(mode=SENTIMENT_MODE).observe(len(windows))
+    with INFERENCE_SECONDS.labels(mode=SENTIMENT_MODE).time():
+        scores = sentiment_backend.predict_proba(inputs)
+    return list(scores)
+
+
+# Concurrent requests share forward passes through the micro-batcher, in both
+# sentiment modes: each request submits its token windows (one in 'single' mode)
+sentiment_batcher = SentimentBatcher(run_sentiment_batch)
+
+
+def analyze_sentiment_chunked(pages):
+    """
+    Analyze sentiment over every scraped page with overlapping token windows
+    
+    Each page is split into SENTIMENT_WINDOW_TOKENS-token windows overlapping by
+    SENTIMENT_WINDOW_STRIDE tokens, and all windows of all pages are submitted
+    to the micro-batcher together, so they share forward passes with other
+    requests. Window softmax scores are averaged, weighted by the number of
+    tokens in each window, into one result per page and one overall.
+    """
+    if not pages or sentiment_model is None or tokenizer is None:
+        return {'label': 'NEUTRAL', 'score': 0.5, 'pages': []}
     
     try:
-        # Truncate text to model's max length
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
+        import torch
+        
+        encoding = tokenizer(
+            [text for _, text in pages],
+            truncation=True,
+            max_length=SENTIMENT_WINDOW_TOKENS,
+            stride=SENTIMENT_WINDOW_STRIDE,
+            return_overflowing_tokens=True
+        )
+        windows = encoding['input_ids']
+        window_pages = torch.tensor(encoding['overflow_to_sample_mapping'])
         
-        with torch.no_grad():
-            outputs = sentiment_model(**inputs)
+        started = time.perf_counter()
+        window_scores = torch.stack(sentiment_batcher.submit(windows).result())
+        print(f"💭 Scored {len(windows)} windows from {len(pages)} pages in {(time.perf_counter() - started) * 1000:.0f}ms")
         
-        # Get prediction
-        scores = torch.nn.functional.softmax(outputs.logits, dim=-1)
-        prediction = torch.argmax(scores, dim=-1).item()
-        confidence = scores[0][prediction].item()
+        window_weights = torch.tensor([len(window) for window in windows], dtype=torch.float32)
         
-        # Map to labels (model outputs: negative=0, neutral=1, positive=2)
-        labels = ['NEGATIVE', 'NEUTRAL', 'POSITIVE']
+        page_results = []
+        for page_index, (link, _) in enumerate(pages):
+            mask = window_pages == page_index
+            weight = window_weights[mask].sum()
+            scores = (window_scores[mask] * window_weights[mask].unsqueeze(-1)).sum(dim=0) / weight
+            prediction = int(torch.argmax(scores))
+            page_results.append({
+                'url': link,
+                'label': SENTIMENT_LABELS[prediction],
+                'score': scores[prediction].item(),
+                'windows': int(mask.sum()),
+                'weight': weight.item()
+            })
+        
+        overall = (window_scores * window_weights.unsqueeze(-1)).sum(dim=0) / window_weights.sum()
+        prediction = int(torch.argmax(overall))
         
         return {
-            'label': labels[prediction],
-            'score': confidence
+            'label': SENTIMENT_LABELS[prediction],
+            'score': overall[prediction].item(),
+            'pages': page_results
         }
         
+    except Exception as e:
+        print(f"⚠️ Chunked sentiment analysis error: {e}")
+        return {'label': 'NEUTRAL', 'score': 0.5, 'pages': []}
+
+
+def analyze_sentiment(text):
+    """Analyze sentiment using HuggingFace model"""
+    if not text or sentiment_model is None or tokenizer is None:
+        return {'label': 'NEUTRAL', 'score': 0.5}
+    
+    try:
+        # Truncate text to model's max length
+        window = tokenizer(text, truncation=True, max_length=512)['input_ids']
+        scores = sentiment_batcher.predict(window)
+        prediction = int(scores.argmax())
+        return {'label': SENTIMENT_LABELS[prediction], 'score': scores[prediction].item()}
+        
     except Exception as e:
         print(f"⚠️ Sentiment analysis error: {e}")
         return {'label': 'NEUTRAL', 'score': 0.5}
 
 
-def calculate_trust_score(ngo_name, sentiment_result, links, text_length):
+def scoring_features(sentiment_result, links, text_length, registry_records=(), matched_by=None):
+    """Raw inputs of calculate_trust_score, as saved in the feature store"""
+    return {
+        'num_links': len(links),
+        'has_wikipedia': any('wikipedia.org' in link for link in links),
+        'has_org_domain': any(re.search(r'\.(org|gov)', link) for link in links),
+        'sentiment_positive': sentiment_result['label'] == 'POSITIVE',
+        'sentiment_negative': sentiment_result['label'] == 'NEGATIVE',
+        'sentiment_score': sentiment_result['score'],
+        'text_length': text_length,
+        'registry_match': bool(registry_records),
+        'registry_confirmed': bool(registry_records) and matched_by == 'registration_id'
+    }
+
+
+def calculate_trust_score(ngo_name, sentiment_result, links, text_length, weights=SCORING_WEIGHTS,
+                          registry_records=(), matched_by=None):
     """Calculate trust score based on multiple factors"""
-    score = 50  # Base score
+    features = scoring_features(sentiment_result, links, text_length, registry_records, matched_by)
+    trust_data = score_trust(features, weights)
+    
+    # Point at the page that contributed most to the overall sentiment label
+    page_sentiments = [p for p in sentiment_result.get('pages', []) if p['label'] == sentiment_result['label']]
+    if page_sentiments:
+        top_page = max(page_sentiments, key=lambda p: p['score'] * p['weight'])
+        trust_data['notes'].insert(1, f"Sentiment driven mostly by {top_page['url']} ({top_page['label']} {top_page['score']:.2f})")
+    return trust_data
+
+
+def score_trust(features, weights=SCORING_WEIGHTS):
+    """Score one NGO's features; also rebuilds the notes of rescored results"""
+    score = weights['base']  # Base score
     notes = []
     
     # Factor 1: Sentiment (0-30 points)
-    if sentiment_result['label'] == 'POSITIVE':
-        sentiment_boost = sentiment_result['score'] * 30
+    if features['sentiment_positive']:
+        sentiment_boost = features['sentiment_score'] * weights['positive_sentiment']
         score += sentiment_boost
         notes.append(f"Positive sentiment increased trust (+{sentiment_boost:.1f})")
-    elif sentiment_result['label'] == 'NEGATIVE':
-        sentiment_penalty = sentiment_result['score'] * 20
+    elif features['sentiment_negative']:
+        sentiment_penalty = features['sentiment_score'] * weights['negative_sentiment']
         score -= sentiment_penalty
         notes.append(f"Negative sentiment decreased trust (-{sentiment_penalty:.1f})")
     else:
         notes.append("Neutral sentiment (no change)")
     
-    # Factor 2: Number of links found (0-20 points)
-    if len(links) >= 5:
-        score += 20
+    # Factor 2: Number of links found (0-20 points), unless the registry confirmed the NGO offline
+    if features['registry_confirmed']:
+        notes.append("Web checks skipped - registration ID confirmed by the NGO registry")
+    elif features['num_links'] >= 5:
+        score += weights['links_strong']
         notes.append("Strong web presence (5+ links)")
-    elif len(links) >= 3:
-        score += 10
+    elif features['num_links'] >= 3:
+        score += weights['links_moderate']
         notes.append("Moderate web presence (3-4 links)")
-    elif len(links) >= 1:
-        score += 5
+    elif features['num_links'] >= 1:
+        score += weights['links_limited']
         notes.append("Limited web presence (1-2 links)")
     else:
-        score -= 10
+        score += weights['links_none']
         notes.append("No web presence found")
     
     # Factor 3: Wikipedia presence (0-15 points)
-    has_wikipedia = any('wikipedia.org' in link for link in links)
-    if has_wikipedia:
-        score += 15
-        notes.append("Found Wikipedia page (+15)")
+    if features['has_wikipedia']:
+        score += weights['wikipedia']
+        notes.append(f"Found Wikipedia page ({weights['wikipedia']:+g})")
     
     # Factor 4: Official domain (.org, .gov) (0-10 points)
-    has_org_domain = any(re.search(r'\.(org|gov)', link) for link in links)
-    if has_org_domain:
-        score += 10
-        notes.append("Found .org/.gov domain(s) (+10)")
-    
-    # Factor 5: Content length (0-5 points)
-    if text_length > 3000:
-        score += 5
-        notes.append("Rich content available (+5)")
-    elif text_length < 500:
-        score -= 5
-        notes.append("Limited content found (-5)")
+    if features['has_org_domain']:
+        score += weights['official_domain']
+        notes.append(f"Found .org/.gov domain(s) ({weights['official_domain']:+g})")
+    
+    # Factor 5: Content length (0-5 points); nothing is scraped for an NGO confirmed offline
+    if not features['registry_confirmed']:
+        if features['text_length'] > 3000:
+            score += weights['rich_content']
+            notes.append(f"Rich content available ({weights['rich_content']:+g})")
+        elif features['text_length'] < 500:
+            score += weights['limited_content']
+            notes.append(f"Limited content found ({weights['limited_content']:+g})")
+    
+    # Factor 6: Listed in the offline NGO registry (0-15 points)
+    if features['registry_match']:
+        score += weights['registry_match']
+        notes.append(f"Listed in the NGO registry ({weights['registry_match']:+g})")
+    if features['registry_confirmed']:
+        score += weights['registry_confirmed']
+        notes.append(f"Registration ID confirmed by the NGO registry ({weights['registry_confirmed']:+g})")
     
     # Clamp score to 0-100
     score = max(0, min(100, score))
     
     # Determine trust level
-    if score >= 80:
-        trust_level = "HIGH"
-    elif score >= 60:
-        trust_level = "MEDIUM"
-    elif score >= 40:
-        trust_level = "LOW"
-    else:
-        trust_level = "VERY LOW"
+    trust_level = next(level for minimum, level in TRUST_LEVELS if score >= minimum)
     
     return {
         'trust_score': round(score, 1),
@@ -260,6 +1138,84 @@ def calculate_trust_score(ngo_name, sentiment_result, links, text_length):
     }
 
 
+def score_features(matrix, weights=SCORING_WEIGHTS):
+    """Vectorized calculate_trust_score over a feature matrix; returns (scores, levels)"""
+    f = dict(zip(FEATURE_COLUMNS, matrix.T))
+    num_links = f['num_links']
+    web_checked = f['registry_confirmed'] == 0
+    
+    score = np.full(len(matrix), float(weights['base']))
+    score += np.where(f['sentiment_positive'] > 0, f['sentiment_score'] * weights['positive_sentiment'], 0.0)
+    score -= np.where(
+        (f['sentiment_positive'] == 0) & (f['sentiment_negative'] > 0),
+        f['sentiment_score'] * weights['negative_sentiment'],
+        0.0
+    )
+    score += np.where(web_checked, np.select(
+        [num_links >= 5, num_links >= 3, num_links >= 1],
+        [weights['links_strong'], weights['links_moderate'], weights['links_limited']],
+        default=weights['links_none']
+    ), 0)
+    score += np.where(f['has_wikipedia'] > 0, weights['wikipedia'], 0)
+    score += np.where(f['has_org_domain'] > 0, weights['official_domain'], 0)
+    score += np.where(web_checked, np.select(
+        [f['text_length'] > 3000, f['text_length'] < 500],
+        [weights['rich_content'], weights['limited_content']],
+        default=0
+    ), 0)
+    score += np.where(f['registry_match'] > 0, weights['registry_match'], 0)
+    score += np.where(f['registry_confirmed'] > 0, weights['registry_confirmed'], 0)
+    score = np.clip(score, 0, 100)
+    return score, trust_levels(score, TRUST_LEVELS)
+
+
+def rescore(weights=None, ngo_names=None, update_cache=False):
+    """
+    Recompute trust scores of stored NGOs from their saved features
+    
+    weights overrides SCORING_WEIGHTS key by key. With update_cache the new
+    scores are also written into the feature store and the cached results,
+    whose notes are rebuilt from the stored features under the new weights.
+    """
+    weights = merge_weights(SCORING_WEIGHTS, weights)
+    started = time.perf_counter()
+    names, matrix, previous_scores = feature_store.load(parse_ngo_names(ngo_names))
+    scores, levels = score_features(matrix, weights)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    results = [
+        {
+            'ngo_name': name,
+            'trust_score': round(float(score), 1),
+            'trust_level': str(level),
+            'previous_score': None if np.isnan(previous) else float(previous)
+        }
+        for name, score, level, previous in zip(names, scores, levels, previous_scores)
+    ]
+    if update_cache:
+        feature_store.update_scores(names, [r['trust_score'] for r in results])
+        verification_cache.update({
+            r['ngo_name']: {
+                'trust_score': r['trust_score'],
+                'trust_level': r['trust_level'],
+                'notes': score_trust(dict(zip(FEATURE_COLUMNS, row.tolist())), weights)['notes'],
+                'rescored': True
+            }
+            for r, row in zip(results, matrix)
+        })
+    
+    print(f"🧮 Rescored {len(results)} NGOs in {elapsed_ms:.1f}ms")
+    return {
+        'weights': weights,
+        'count': len(results),
+        'changed': sum(1 for r in results if r['previous_score'] != r['trust_score']),
+        'elapsed_ms': round(elapsed_ms, 2),
+        'updated_cache': bool(update_cache),
+        'results': results
+    }
+
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 8000))
+    job_runner.ensure_started()
     app.run(host='0.0.0.0', port=port, debug=False)
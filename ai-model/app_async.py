@@ -0,0 +1,735 @@
+"""
+Asyncio-native NGO verification service (ASGI)
+
+Serves the same endpoints and JSON contract as app.py / app_simple.py, but the
+pipeline awaits DuckDuckGo searches and page fetches instead of blocking a
+worker on them, so one process can keep dozens of verifications in flight.
+Pages are parsed incrementally as they download (html_text.py), sentiment
+inference, which is CPU-bound, runs in a thread pool, and the SQLite stores are
+called through asyncio.to_thread. Only the network stages are async twins of
+the engine's; the registry, scoring, caching and deadline steps are the
+engine's own functions.
+
+VERIFY_ENGINE picks the pipeline: 'full' (app.py, search + scrape + sentiment
+model) or 'simple' (app_simple.py, web search only).
+
+Run with:
+    uvicorn app_async:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import httpx
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
+
+from html_text import VisibleTextExtractor
+from http_client import (
+    SCRAPE_USER_AGENT, AsyncHttpClient, RateLimited, RobotsDisallowed, is_retryable_error, rate_limits, robots_cache
+)
+from deadline import Deadline, parse_deadline_ms
+from jobs import (
+    JOB_CALLBACK_RETRIES, JOB_CALLBACK_TIMEOUT, JOB_MAX_WORKERS, JobQueueFull, check_callback_host,
+    validate_callback_url
+)
+from recommender import recommend
+from cause_index import parse_nearby_query
+from page_cache import conditional_headers, is_cacheable
+from singleflight import AsyncSingleFlight
+from verification_cache import parse_force_refresh, parse_max_age
+from batch_verification import BATCH_MAX_NAMES, parse_batch_names, stream_batch_results_async
+from metrics import (
+    BYTES_DOWNLOADED, IN_FLIGHT, LINK_FETCHES, SEARCH_QUERIES, VERIFICATIONS, fetch_outcome, render_metrics,
+    stage_timer
+)
+
+VERIFY_ENGINE = os.getenv('VERIFY_ENGINE', 'full')
+
+if VERIFY_ENGINE == 'simple':
+    import app_simple as engine
+else:
+    import app as engine
+
+ASYNC_MAX_FETCHES = int(os.getenv('ASYNC_MAX_FETCHES', 64))
+ASYNC_CPU_WORKERS = int(os.getenv('ASYNC_CPU_WORKERS', 4))
+PER_HOST_LIMIT = int(os.getenv('SCRAPE_PER_HOST_LIMIT', 2))
+SCRAPE_DEADLINE = float(os.getenv('SCRAPE_DEADLINE', 8))
+SCRAPE_TIMEOUT = 5
+SCRAPE_HEADERS = {
+    'User-Agent': SCRAPE_USER_AGENT
+}
+
+app = Quart(__name__)
+app = cors(app, allow_origin='*')  # Enable CORS for requests from your React frontend
+
+cpu_executor = ThreadPoolExecutor(max_workers=ASYNC_CPU_WORKERS, thread_name_prefix='cpu')
+http_client = None
+ddgs = None
+host_semaphores = {}
+in_flight = 0
+verification_flights = AsyncSingleFlight()
+# Async /verify_ngo jobs run as tasks on this loop, stored in the engine's job_store
+job_slots = None
+job_tasks = set()
+
+
+@app.before_serving
+async def open_http_client():
+    """Pooled client with retries, rate limits and robots.txt checks (http_client.py), shared by all requests"""
+    global http_client
+    http_client = AsyncHttpClient(
+        rate_limits, robots_cache,
+        max_connections=ASYNC_MAX_FETCHES,
+        headers=SCRAPE_HEADERS,
+        follow_redirects=True
+    )
+
+
+@app.before_serving
+async def resume_jobs():
+    """Pick up jobs left queued, or orphaned by a dead worker, before the restart"""
+    global job_slots
+    job_slots = asyncio.Semaphore(JOB_MAX_WORKERS)
+    recovered = await asyncio.to_thread(engine.job_store.recover)
+    if recovered:
+        print(f"♻️ Resuming {len(recovered)} queued verification job(s)")
+    for job_id in recovered:
+        schedule_job(job_id)
+
+
+@app.after_serving
+async def close_http_client():
+    global ddgs
+    await http_client.aclose()
+    if ddgs is not None:
+        await ddgs.__aexit__(None, None, None)
+        ddgs = None
+
+
+async def run_cpu(func, *args):
+    """Run CPU-bound work (ranking, embeddings, inference) off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, func, *args)
+
+
+async def engine_response(view):
+    """Call one of the engine's Flask views in a thread (they read SQLite) and return its JSON and status"""
+    def call():
+        with engine.app.app_context():
+            response, status = view()
+        return response.get_json(), status
+    return await asyncio.to_thread(call)
+
+
+@app.route('/health', methods=['GET'])
+async def health():
+    """Health check endpoint"""
+    data, status = await engine_response(engine.health)
+    return jsonify({
+        **data, 'server': 'asgi', 'in_flight': in_flight, 'coalescing': verification_flights.stats(),
+        'outbound': http_client.stats()
+    }), status
+
+
+@app.route('/livez', methods=['GET'])
+async def livez():
+    """Liveness probe: the process is up and serving requests"""
+    data, status = await engine_response(engine.livez)
+    return jsonify(data), status
+
+
+@app.route('/readyz', methods=['GET'])
+async def readyz():
+    """Readiness probe, delegated to the selected engine"""
+    data, status = await engine_response(engine.readyz)
+    return jsonify(data), status
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
+@app.route('/rescore', methods=['POST'])
+async def rescore():
+    """Reapply the engine's scoring rules to saved features (same input as the sync services)"""
+    data = await request.get_json(silent=True) or {}
+    try:
+        result = await run_cpu(
+            engine.rescore, data.get('weights'), data.get('ngo_names'), data.get('update_cache', False)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result), 200
+
+@app.route('/predict', methods=['POST'])
+async def predict():
+    """Rank causes for a volunteer (same input and output as the sync services)"""
+    data = await request.get_json(silent=True)
+    try:
+        return jsonify(await run_cpu(recommend, data, engine.cause_index)), 200
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+
+
+@app.route('/causes', methods=['POST'])
+async def upsert_causes():
+    """Add or replace causes in the resident catalog used by /predict"""
+    data = await request.get_json(silent=True) or {}
+    try:
+        stored = await run_cpu(engine.cause_index.upsert, data.get('causes'))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    return jsonify({'success': True, 'upserted': stored, **engine.cause_index.stats()}), 200
+
+
+@app.route('/causes/<cause_id>', methods=['DELETE'])
+async def delete_cause(cause_id):
+    """Remove one cause from the resident catalog"""
+    if not await run_cpu(engine.cause_index.delete, [cause_id]):
+        return jsonify({'error': 'Unknown cause', 'success': False}), 404
+    return jsonify({'success': True, 'deleted': 1, **engine.cause_index.stats()}), 200
+
+
+@app.route('/causes/delete', methods=['POST'])
+async def delete_causes():
+    """Remove several causes from the resident catalog"""
+    data = await request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list):
+        return jsonify({'error': 'ids must be a list', 'success': False}), 400
+    deleted = await run_cpu(engine.cause_index.delete, ids)
+    return jsonify({'success': True, 'deleted': deleted, **engine.cause_index.stats()}), 200
+
+@app.route('/causes/nearby', methods=['GET'])
+async def nearby_causes():
+    """Causes of the resident catalog near a point: ?lat=&lng= with radiusKm (km), k (nearest) or both"""
+    try:
+        lat, lng, radius_km, k = parse_nearby_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    causes = await run_cpu(engine.cause_index.nearby, lat, lng, radius_km, k)
+    return jsonify({'success': True, 'causes': causes, 'count': len(causes)}), 200
+
+
+
+@app.route('/verify_ngo', methods=['POST'])
+async def verify_ngo():
+    """
+    Verify an NGO; same request and response shape as the sync services
+
+    Expected input:
+    {
+        "ngo_name": "Akshaya Patra Foundation",
+        "registration_id": "...", # optional, registry lookup
+        "max_age": 86400,         # optional
+        "force_refresh": false,   # optional
+        "deadline_ms": 3000,      # optional, latency budget
+        "async": false,           # optional, queue a job and return 202 at once
+        "callback_url": "https://..."  # optional with async
+    }
+    """
+    global in_flight
+    data = await request.get_json(silent=True)
+    ngo_name = (data or {}).get('ngo_name', '').strip()
+
+    if VERIFY_ENGINE != 'simple' and not data:
+        return jsonify({'error': 'No data provided'}), 400
+    if not ngo_name:
+        if VERIFY_ENGINE == 'simple':
+            return jsonify({'error': 'NGO name is required', 'success': False}), 400
+        return jsonify({'error': 'NGO name is required'}), 400
+
+    try:
+        deadline_ms = parse_deadline_ms(data.get('deadline_ms'))
+        max_age = parse_max_age(data.get('max_age'))
+        force_refresh = parse_force_refresh(data.get('force_refresh'))
+    except ValueError as e:
+        if VERIFY_ENGINE == 'simple':
+            return jsonify({'error': str(e), 'success': False}), 400
+        return jsonify({'error': str(e)}), 400
+
+    if data.get('async'):
+        return await submit_job(ngo_name, data, deadline_ms, max_age, force_refresh)
+
+    in_flight += 1
+    try:
+        result = await get_verification(
+            ngo_name,
+            max_age=max_age,
+            force_refresh=force_refresh,
+            deadline_ms=deadline_ms,
+            registration_id=data.get('registration_id')
+        )
+        return jsonify(result), 200
+
+    except Exception as e:
+        print(f"❌ Error verifying NGO: {str(e)}")
+        VERIFICATIONS.labels(engine=VERIFY_ENGINE, outcome='error').inc()
+        if VERIFY_ENGINE == 'simple':
+            return jsonify(engine.error_result(ngo_name, e)), 200  # Return 200 to prevent backend from failing
+        return jsonify(engine.error_result(ngo_name, e)), 500
+    finally:
+        in_flight -= 1
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+async def job_status(job_id):
+    """State of a verification job, with its result once the status is done"""
+    job = await asyncio.to_thread(engine.job_store.get, job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job), 200
+
+
+@app.route('/verify_ngo/batch', methods=['POST'])
+async def verify_ngo_batch():
+    """
+    Verify many NGOs concurrently and stream the results as NDJSON
+
+    Same input and output as the sync services: {"ngo_names": [...], "max_age",
+    "force_refresh"}, answered with one JSON object per line in completion
+    order, each with the NGO's position in the request as "index".
+    """
+    data = await request.get_json(silent=True)
+    ngo_names = parse_batch_names(data)
+
+    try:
+        if not ngo_names:
+            raise ValueError('ngo_names must be a non-empty list')
+        if len(ngo_names) > BATCH_MAX_NAMES:
+            raise ValueError(f'At most {BATCH_MAX_NAMES} NGOs per batch')
+        max_age = parse_max_age(data.get('max_age'))
+        force_refresh = parse_force_refresh(data.get('force_refresh'))
+    except ValueError as e:
+        if VERIFY_ENGINE == 'simple':
+            return jsonify({'error': str(e), 'success': False}), 400
+        return jsonify({'error': str(e)}), 400
+    print(f"📦 Batch verification of {len(ngo_names)} NGOs")
+
+    async def verify(ngo_name):
+        return await get_verification(ngo_name, max_age=max_age, force_refresh=force_refresh)
+
+    return Response(
+        stream_batch_results_async(ngo_names, verify, engine.error_result),
+        mimetype='application/x-ndjson'
+    )
+
+
+async def submit_job(ngo_name, data, deadline_ms=None, max_age=None, force_refresh=False):
+    """Store an async verification job, schedule it and answer 202"""
+    try:
+        callback_url = await asyncio.to_thread(validate_callback_url, data.get('callback_url'))
+        job = await asyncio.to_thread(
+            engine.job_store.create,
+            ngo_name,
+            {
+                'max_age': max_age,
+                'force_refresh': force_refresh,
+                'deadline_ms': deadline_ms,
+                'registration_id': data.get('registration_id')
+            },
+            callback_url
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+
+    schedule_job(job['job_id'])
+    status_url = f"/jobs/{job['job_id']}"
+    return jsonify({**job, 'status_url': status_url}), 202, {'Location': status_url}
+
+
+def schedule_job(job_id):
+    task = asyncio.ensure_future(run_job(job_id))
+    job_tasks.add(task)  # keep a reference until it finishes
+    task.add_done_callback(job_tasks.discard)
+
+
+async def run_job(job_id):
+    """Claim and run one stored job, at most JOB_MAX_WORKERS at a time"""
+    async with job_slots:
+        job = await asyncio.to_thread(engine.job_store.claim, job_id)
+        if job is None:
+            return  # already taken by another worker
+
+        print(f"🧾 Job {job_id} started for {job['ngo_name']}")
+        params = job['params']
+        try:
+            result = await get_verification(
+                job['ngo_name'],
+                max_age=params.get('max_age'),
+                force_refresh=params.get('force_refresh', False),
+                deadline_ms=params.get('deadline_ms'),
+                registration_id=params.get('registration_id')
+            )
+            await asyncio.to_thread(engine.job_store.finish, job_id, result)
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            await asyncio.to_thread(engine.job_store.finish, job_id, None, e)
+
+    if job['callback_url']:
+        finished = await asyncio.to_thread(engine.job_store.get, job_id)
+        status = await send_callback(job['callback_url'], finished)
+        await asyncio.to_thread(engine.job_store.set_callback_status, job_id, status)
+
+
+async def send_callback(url, job):
+    """POST a finished job to its callback URL, retrying with backoff (jobs.send_callback)"""
+    try:
+        await asyncio.to_thread(check_callback_host, urlparse(url).hostname)
+    except ValueError as e:
+        return f"refused: {e}"
+    try:
+        response = await http_client.request(
+            'POST', url, json=job, timeout=JOB_CALLBACK_TIMEOUT, headers={'X-Job-Id': job['job_id']},
+            retries=JOB_CALLBACK_RETRIES - 1, retry_errors=True, follow_redirects=False
+        )
+    except (httpx.HTTPError, RateLimited) as e:
+        return f"failed: {type(e).__name__}"
+    return 'delivered' if response.is_success else f"failed: HTTP {response.status_code}"
+
+
+async def get_verification(ngo_name, max_age=None, force_refresh=False, deadline_ms=None, registration_id=None):
+    """Return a cached verification when one is fresh enough, otherwise run the pipeline (engine.get_verification)"""
+    canonical, cached = await asyncio.to_thread(
+        engine.lookup_verification, ngo_name, registration_id, max_age, force_refresh
+    )
+    if cached is not None:
+        return cached
+    ngo_name = canonical['name']
+
+    key = canonical['key'] if deadline_ms is None else f"{canonical['key']}@{deadline_ms}ms"
+    result, shared = await verification_flights.do(key, compute_verification, ngo_name, deadline_ms, registration_id)
+    if shared:
+        print(f"🔗 Joined running verification of {ngo_name}")
+        VERIFICATIONS.labels(engine=VERIFY_ENGINE, outcome='coalesced').inc()
+        return {**result, 'cached': False, 'coalesced': True, 'canonical': canonical}
+
+    return {**result, 'cached': False, 'canonical': canonical}
+
+
+async def compute_verification(ngo_name, deadline_ms=None, registration_id=None):
+    """Run the pipeline for a cache miss and cache the result"""
+    run_verification = run_simple_verification if VERIFY_ENGINE == 'simple' else run_full_verification
+    with IN_FLIGHT.labels(engine=VERIFY_ENGINE).track_inprogress():
+        result = await run_verification(ngo_name, Deadline(deadline_ms), registration_id)
+    VERIFICATIONS.labels(engine=VERIFY_ENGINE, outcome='computed').inc()
+    await asyncio.to_thread(engine.save_verification, ngo_name, result, registration_id)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Full pipeline (app.py): registry -> search -> scrape -> sentiment -> score
+# ---------------------------------------------------------------------------
+
+def get_ddgs():
+    """Return the DuckDuckGo client shared by this loop's searches (keeps its connections alive)"""
+    from duckduckgo_search import AsyncDDGS
+
+    global ddgs
+    if ddgs is None:
+        ddgs = AsyncDDGS()
+    return ddgs
+
+
+async def search_ngo(ngo_name, max_results=10, deadline=None):
+    """Search for NGO using DuckDuckGo, returning (links, [(link, snippet), ...]) (app.search_ngo)"""
+    deadline = deadline or Deadline()
+    if deadline.remaining() == 0:
+        deadline.skip('search')
+        print("⏱️ No time left to search")
+        return [], []
+
+    async def search():
+        return [
+            r async for r in get_ddgs().text(f"{ngo_name} NGO official", max_results=max_results)
+            if 'href' in r
+        ]
+
+    try:
+        results = await asyncio.wait_for(
+            http_client.call('duckduckgo.com', search, deadline=deadline.expires), deadline.timeout()
+        )
+    except (asyncio.TimeoutError, RateLimited):
+        deadline.skip('search')
+        print("⏱️ Deadline reached before DuckDuckGo answered")
+        return [], []
+    except Exception as e:
+        print(f"⚠️ Search error: {e}")
+        return [], []
+    return [r['href'] for r in results], [(r['href'], r['body']) for r in results if r.get('body')]
+
+
+def get_host_semaphore(link):
+    """Return the semaphore limiting concurrent fetches to the link's host"""
+    host = urlparse(link).netloc.lower()
+    if host not in host_semaphores:
+        host_semaphores[host] = asyncio.Semaphore(PER_HOST_LIMIT)
+    return host_semaphores[host]
+
+
+async def fetch_page_text(link, deadline):
+    """Stream a single page and extract its visible text as it arrives (app.fetch_page_text)"""
+    cached = await asyncio.to_thread(engine.page_cache.get, link)
+    if cached is not None and cached.fresh:
+        LINK_FETCHES.labels(engine='full', outcome='cached').inc()
+        return cached.text
+
+    async with get_host_semaphore(link):
+        if deadline - time.monotonic() <= 0:
+            LINK_FETCHES.labels(engine='full', outcome='skipped').inc()
+            return ""
+        try:
+            with stage_timer('full', 'fetch'):
+                response = await http_client.request(
+                    'GET', link, headers=conditional_headers(cached), timeout=SCRAPE_TIMEOUT,
+                    deadline=deadline, stream=True, respect_robots=True
+                )
+                try:
+                    if response.status_code == 304 and cached is not None:
+                        await asyncio.to_thread(engine.page_cache.revalidated, link)
+                        LINK_FETCHES.labels(engine='full', outcome='not_modified').inc()
+                        return cached.text
+
+                    extractor = VisibleTextExtractor(engine.PAGE_TEXT_CHARS, encoding=response.encoding)
+                    async for chunk in response.aiter_bytes(engine.SCRAPE_CHUNK_BYTES):
+                        if extractor.feed_bytes(chunk):
+                            break
+                finally:
+                    await response.aclose()
+            text = extractor.get_text()
+        except (httpx.HTTPError, RateLimited, RobotsDisallowed) as e:
+            print(f"⚠️ Scraping error for {link}: {e}")
+            LINK_FETCHES.labels(engine='full', outcome=fetch_outcome(e)).inc()
+            return ""
+        except Exception as e:
+            print(f"⚠️ Parsing error for {link}: {e}")
+            LINK_FETCHES.labels(engine='full', outcome='parse_error').inc()
+            return ""
+
+        BYTES_DOWNLOADED.labels(engine='full').inc(extractor.bytes_read)
+        LINK_FETCHES.labels(engine='full', outcome='ok' if response.is_success else 'http_error').inc()
+        if is_cacheable(response.headers):
+            await asyncio.to_thread(
+                engine.page_cache.put, link, text, response.status_code,
+                response.headers.get('ETag'), response.headers.get('Last-Modified')
+            )
+        return text
+
+
+async def scrape_pages(links, max_links=5, deadline_seconds=None):
+    """Fetch all links concurrently and return [(link, text), ...] in link order"""
+    links = links[:max_links]
+    if not links:
+        return []
+
+    timeout = SCRAPE_DEADLINE if deadline_seconds is None else deadline_seconds
+    deadline = time.monotonic() + timeout
+    tasks = [asyncio.create_task(fetch_page_text(link, deadline)) for link in links]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+
+    for task in pending:
+        task.cancel()
+    if pending:
+        print(f"⚠️ Scraping deadline reached, dropped {len(pending)} slow page(s)")
+
+    return [(link, task.result()) for link, task in zip(links, tasks) if task in done and task.result()]
+
+
+async def run_full_verification(ngo_name, deadline=None, registration_id=None):
+    """app.run_verification with the network stages awaited"""
+    deadline = deadline or Deadline()
+    print(f"🔍 Verifying NGO: {ngo_name}")
+
+    with stage_timer('full', 'total'):
+        registry_records, matched_by = await asyncio.to_thread(engine.check_registry, ngo_name, registration_id)
+        if matched_by == 'registration_id':
+            links, text_content = [], ''
+            sentiment_result = {'label': 'NEUTRAL', 'score': 0.5, 'pages': []}
+        else:
+            links, text_content, sentiment_result = await analyze_web_presence(ngo_name, deadline)
+        return await asyncio.to_thread(
+            engine.score_verification,
+            ngo_name, deadline, links, text_content, sentiment_result, registry_records, matched_by
+        )
+
+
+async def analyze_web_presence(ngo_name, deadline):
+    """app.analyze_web_presence with the search and scrape awaited"""
+    with stage_timer('full', 'search'):
+        links, snippets = await search_ngo(ngo_name, deadline=deadline)
+    print(f"📄 Found {len(links)} links")
+
+    plan = engine.plan_scrape_stage(deadline)
+    if plan is None:
+        pages = snippets
+        print(f"⏱️ No time left to scrape, using {len(pages)} search snippets")
+    else:
+        max_links, scrape_seconds = plan
+        started = time.monotonic()
+        with stage_timer('full', 'scrape'):
+            pages = await scrape_pages(links, max_links=max_links, deadline_seconds=scrape_seconds)
+        if links:
+            engine.scrape_estimate.observe(time.monotonic() - started)
+    text_content = engine.combine_pages(pages)
+    print(f"📝 Scraped {len(text_content)} characters of text")
+
+    sentiment_result = await run_cpu(engine.sentiment_stage, pages, text_content, deadline)
+    return links, text_content, sentiment_result
+
+
+# ---------------------------------------------------------------------------
+# Simple pipeline (app_simple.py): registry -> search -> presence analysis -> score
+# ---------------------------------------------------------------------------
+
+async def run_search_query(query, deadline=None):
+    """Run one DuckDuckGo query and return formatted results (app_simple.run_search_query)"""
+    async def search():
+        return [engine.format_search_result(r) async for r in get_ddgs().text(query, max_results=5)]
+
+    try:
+        results = await http_client.call('duckduckgo.com', search, deadline=deadline and deadline.expires)
+    except Exception as e:
+        print(f"⚠️ Search query failed: {query} - {str(e)}")
+        SEARCH_QUERIES.labels(engine='simple', outcome='rate_limited' if is_retryable_error(e) else 'error').inc()
+        return []
+
+    SEARCH_QUERIES.labels(engine='simple', outcome='ok' if results else 'empty').inc()
+    return results
+
+
+async def probe_url(url):
+    """True when a guessed official website answers with 200"""
+    cached = await asyncio.to_thread(engine.probe_cache.get, url)
+    if cached is not None and cached.fresh:
+        LINK_FETCHES.labels(engine='simple', outcome='cached').inc()
+        return cached.status == 200
+
+    try:
+        response = await http_client.request('HEAD', url, headers=conditional_headers(cached), timeout=3)
+    except (RateLimited, RobotsDisallowed) as e:
+        LINK_FETCHES.labels(engine='simple', outcome=fetch_outcome(e)).inc()
+        return False  # never sent, so nothing is known about the site
+    except Exception as e:
+        LINK_FETCHES.labels(engine='simple', outcome=fetch_outcome(e)).inc()
+        await asyncio.to_thread(engine.probe_cache.put, url, '', 0)
+        return False
+
+    if response.status_code == 304 and cached is not None:
+        await asyncio.to_thread(engine.probe_cache.revalidated, url)
+        LINK_FETCHES.labels(engine='simple', outcome='not_modified').inc()
+        return cached.status == 200
+
+    LINK_FETCHES.labels(engine='simple', outcome='ok' if response.is_success else 'http_error').inc()
+    if is_cacheable(response.headers):
+        await asyncio.to_thread(
+            engine.probe_cache.put, url, '', response.status_code,
+            response.headers.get('ETag'), response.headers.get('Last-Modified')
+        )
+    return response.status_code == 200
+
+
+async def perform_web_search(ngo_name, max_results=10, deadline=None):
+    """
+    app_simple.perform_web_search with the queries and probes as tasks
+
+    All queries run at once, and the search stops as soon as those finished in
+    priority order yield max_results unique URLs. The domain probes start once
+    DuckDuckGo has found nothing, or alongside it after SEARCH_PROBE_GRACE_MS.
+    """
+    deadline = deadline or Deadline()
+    if deadline.remaining() == 0:
+        deadline.skip('search')
+        print("⏱️ No time left to search")
+        return []
+    print(f"🌐 Searching web for: {ngo_name}")
+
+    guesses = engine.build_domain_guesses(ngo_name)
+    queries = [asyncio.ensure_future(run_search_query(q, deadline)) for q in engine.build_search_queries(ngo_name)]
+    probes = []
+    probes_at = time.monotonic() + engine.SEARCH_PROBE_GRACE
+
+    def start_probes():
+        if not probes:
+            probes.extend(asyncio.ensure_future(probe_url(url)) for url in guesses)
+
+    try:
+        pending = set(queries)
+        while pending:
+            timeout = deadline.timeout()
+            if not probes:
+                grace = max(0.0, probes_at - time.monotonic())
+                timeout = grace if timeout is None else min(timeout, grace)
+            _, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if pending and deadline.remaining() == 0:
+                deadline.skip('search_queries')
+                print(f"⏱️ Deadline reached, dropped {len(pending)} search query(ies)")
+                break
+            if pending and time.monotonic() >= probes_at:
+                start_probes()  # DuckDuckGo is slow, probe alongside it
+
+            finished_in_order = []
+            for task in queries:
+                if not task.done():
+                    break
+                finished_in_order.append(task.result())
+            if len(engine.merge_search_results(finished_in_order, max_results)) >= max_results:
+                break
+
+        results = engine.merge_search_results([task.result() for task in queries if task.done()], max_results)
+        if results:
+            print(f"✅ Found {len(results)} search results via DuckDuckGo")
+            return results
+
+        # Direct web presence check (fallback), first guess that answers wins
+        print("🔄 Using direct web presence detection...")
+        start_probes()
+        for url, task in zip(guesses, probes):
+            try:
+                found = await asyncio.wait_for(asyncio.shield(task), deadline.timeout())
+            except asyncio.TimeoutError:
+                deadline.skip('domain_probe')
+                print("⏱️ Deadline reached before the domain probes answered")
+                break
+            if found:
+                results.append(engine.official_site_result(ngo_name, url))
+                print(f"✅ Found official website: {url}")
+                break
+    finally:
+        for task in queries + probes:
+            task.cancel()
+
+    if not results:
+        print("⚠️ No web presence detected")
+    return results
+
+
+async def run_simple_verification(ngo_name, deadline=None, registration_id=None):
+    """app_simple.run_verification with the web search awaited"""
+    deadline = deadline or Deadline()
+    print(f"\n🔍 Verifying NGO: {ngo_name}")
+
+    with stage_timer('simple', 'total'):
+        registry_records, matched_by = await asyncio.to_thread(engine.check_registry, ngo_name, registration_id)
+        if matched_by == 'registration_id':
+            search_results = []
+        else:
+            with stage_timer('simple', 'search'):
+                search_results = await perform_web_search(ngo_name, deadline=deadline)
+        return await asyncio.to_thread(
+            engine.score_verification, ngo_name, deadline, search_results, registry_records, matched_by
+        )
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.getenv('PORT', 8000))
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -1,16 +1,91 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import os
-import re
-import requests
-from bs4 import BeautifulSoup
-from duckduckgo_search import DDGS
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+import numpy as np
+from verification_cache import VerificationCache, normalize_ngo_name, parse_force_refresh, parse_max_age
+from singleflight import SingleFlight
+from name_index import NameIndex
+from registry import Registry, registry_result
+from embeddings import get_encoder
+from recommender import recommend
+from cause_index import CauseIndex, parse_nearby_query
+from feature_store import FeatureStore, merge_weights, parse_ngo_names, trust_levels
+from page_cache import PageCache, conditional_headers, is_cacheable
+from http_client import RateLimited, RobotsDisallowed, is_retryable_error, outbound
+from jobs import JobQueueFull, JobRunner, JobStore, validate_callback_url
+from deadline import Deadline, parse_deadline_ms
+from lexicon import LexiconMatcher, load_lexicons
+from metrics import (
+    IN_FLIGHT, LINK_FETCHES, SEARCH_QUERIES, VERIFICATIONS, fetch_outcome, render_metrics, stage_timer
+)
+from batch_verification import BATCH_MAX_NAMES, parse_batch_names, stream_batch_results
 import warnings
 warnings.filterwarnings('ignore')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for requests from your React frontend
 
+# Verification results shared by all workers through a local SQLite file
+verification_cache = VerificationCache('simple')
+# Names of verified NGOs, so variants of a name reuse one verification
+name_index = NameIndex('simple')
+# Offline NGO registry export (NGO_REGISTRY_PATH); a registration ID match skips the web search
+registry = Registry()
+# Concurrent verifications of the same NGO share one pipeline run
+verification_flights = SingleFlight()
+# Outcome of every domain probe, revalidated with conditional HEADs
+probe_cache = PageCache('probe')
+# Verifications requested with "async": true, polled at /jobs/<id> (jobs.py)
+job_store = JobStore('simple')
+# Cause catalog ranked by /predict, shared by workers through a memory-mapped snapshot
+# (with sentence embeddings when EMBEDDING_MODEL_DIR is set)
+cause_index = CauseIndex(encoder=get_encoder())
+
+# Points awarded by calculate_trust_score. /rescore reapplies them (or overrides
+# sent with the request) to the features saved for every verified NGO.
+SCORING_WEIGHTS = {
+    'base': 50,
+    'legitimate_name': 10,
+    'results_strong': 20,       # 10+ search results
+    'results_good': 15,         # 5-9
+    'results_moderate': 10,     # 2-4
+    'results_minimal': 5,       # 1
+    'results_none': 0,
+    'sentiment': 25,            # times the 0-1 sentiment score, rounded down
+    'positive_many': 20,        # 10+ positive indicators
+    'positive_several': 15,     # 5-9
+    'positive_some': 10,        # 2-4
+    'negative_each': 10,        # penalty per negative indicator...
+    'negative_max': 30,         # ...capped at this
+    'official_site': 10,
+    'registry_match': 15        # listed in the offline NGO registry
+}
+TRUST_LEVELS = [(80, 'VERY HIGH'), (70, 'HIGH'), (55, 'MEDIUM'), (40, 'LOW'), (0, 'VERY LOW')]
+SENTIMENT_LABELS = [(0.65, 'POSITIVE'), (0.45, 'NEUTRAL'), (0, 'NEGATIVE')]
+FEATURE_COLUMNS = [
+    'num_results', 'has_legitimate_name', 'sentiment_score',
+    'positive_indicators', 'negative_indicators', 'neutral_indicators', 'has_official_site',
+    'registry_match'
+]
+feature_store = FeatureStore('simple', FEATURE_COLUMNS)
+
+# Search queries and domain probes run concurrently on this pool
+SEARCH_MAX_WORKERS = int(os.getenv('SEARCH_MAX_WORKERS', 16))
+# The fallback domain probes start once DuckDuckGo has answered with nothing, or
+# alongside it when it has not answered within this grace period
+SEARCH_PROBE_GRACE = float(os.getenv('SEARCH_PROBE_GRACE_MS', 1500)) / 1000
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix='search')
+search_clients = threading.local()
+
+# Indicator and name keyword lexicons (lexicons.json), each compiled into a
+# single-pass whole-word matcher
+LEXICONS = load_lexicons()
+indicator_matcher = LexiconMatcher({category: LEXICONS[category] for category in ('positive', 'negative', 'neutral')})
+name_matcher = LexiconMatcher({'legitimate_name': LEXICONS['legitimate_name']})
+
 print("✅ NGO Verification Service (Simplified) - Ready!")
 
 
@@ -21,10 +96,126 @@ def health():
         'status': 'healthy',
         'model_loaded': True,
         'model_name': 'NGO Verification Engine (Web Search Based)',
-        'version': '2.0.0-simple'
+        'version': '2.0.0-simple',
+        'cache': verification_cache.stats(),
+        'names': name_index.stats(),
+        'registry': registry.stats(),
+        'outbound': outbound.stats(),
+        'coalescing': verification_flights.stats(),
+        'probe_cache': probe_cache.stats(),
+        'jobs': job_store.stats(),
+        'cause_index': cause_index.stats(),
+        'embeddings': cause_index.encoder.stats() if cause_index.encoder else None
     }), 200
 
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive'}), 200
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: there is no model to load, so ready as soon as it is alive"""
+    return jsonify({'status': 'ready'}), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics (aggregated across gunicorn workers)"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
+@app.route('/rescore', methods=['POST'])
+def rescore_view():
+    """
+    Reapply the scoring rules to the saved features of verified NGOs
+    
+    Expected input (all optional):
+    {
+        "weights": {"official_site": 15},  # overrides of SCORING_WEIGHTS
+        "ngo_names": ["Goonj", ...],        # default: every stored NGO
+        "update_cache": false               # write the new scores into cached results
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(rescore(data.get('weights'), data.get('ngo_names'), data.get('update_cache', False))), 200
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    """
+    Rank causes for a volunteer (recommender.py)
+    
+    Expected input:
+    {
+        "userId": "user_123",
+        "interests": ["education"],
+        "skills": ["teaching", "coding"],
+        "location": {"lat": 12.97, "lng": 77.59},   # optional
+        "topK": 10,                                # optional
+        "causes": [{"id": "cause_001", "title": ..., "category": ..., "location": {...}, "requiredSkills": [...]}],
+        "filter": {"categories": ["education"], "ids": [...],  # optional
+                   "maxDistanceKm": 25, "nearest": 50}
+    }
+    
+    Without "causes" the resident catalog (POST /causes) is ranked instead.
+    
+    Expected output:
+    {
+        "success": true,
+        "recommendations": [{"causeId": "cause_001", "score": 0.71, "reason": "...", "distanceKm": 1.0}, ...]
+    }
+    """
+    try:
+        return jsonify(recommend(request.get_json(silent=True), cause_index)), 200
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+
+@app.route('/causes', methods=['POST'])
+def upsert_causes():
+    """Add or replace causes in the resident catalog used by /predict: {"causes": [...]}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        stored = cause_index.upsert(data.get('causes'))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    return jsonify({'success': True, 'upserted': stored, **cause_index.stats()}), 200
+
+
+@app.route('/causes/<cause_id>', methods=['DELETE'])
+def delete_cause(cause_id):
+    """Remove one cause from the resident catalog"""
+    if not cause_index.delete([cause_id]):
+        return jsonify({'error': 'Unknown cause', 'success': False}), 404
+    return jsonify({'success': True, 'deleted': 1, **cause_index.stats()}), 200
+
+
+@app.route('/causes/delete', methods=['POST'])
+def delete_causes():
+    """Remove several causes from the resident catalog: {"ids": [...]}"""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list):
+        return jsonify({'error': 'ids must be a list', 'success': False}), 400
+    return jsonify({'success': True, 'deleted': cause_index.delete(ids), **cause_index.stats()}), 200
+
+@app.route('/causes/nearby', methods=['GET'])
+def nearby_causes():
+    """Causes of the resident catalog near a point: ?lat=&lng= with radiusKm (km), k (nearest) or both"""
+    try:
+        lat, lng, radius_km, k = parse_nearby_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    causes = cause_index.nearby(lat, lng, radius_km, k)
+    return jsonify({'success': True, 'causes': causes, 'count': len(causes)}), 200
+
+
+
 @app.route('/verify_ngo', methods=['POST'])
 def verify_ngo():
     """
@@ -32,9 +223,26 @@ def verify_ngo():
     
     Expected input:
     {
-        "ngo_name": "Akshaya Patra Foundation"
+        "ngo_name": "Akshaya Patra Foundation",
+        "registration_id": "KA/2017/0123456",  # optional, NGO Darpan ID or registration number
+        "max_age": 86400,         # optional, oldest cached result accepted (seconds)
+        "force_refresh": false,   # optional, skip the cache and re-verify
+        "deadline_ms": 3000,      # optional, latency budget; work that does not fit is skipped
+        "async": false,           # optional, queue a job and return 202 at once
+        "callback_url": "https://..."  # optional with async, receives the finished job
     }
     
+    With "async": true the response is {"job_id", "status": "queued",
+    "status_url": "/jobs/<job_id>", ...} and the result is polled there.
+    
+    With deadline_ms the response also has "deadline_ms", "elapsed_ms" and
+    "skipped_stages" (any of "search", "search_queries", "domain_probe").
+    
+    An NGO found in the offline registry (registry.py) under its registration_id
+    is confirmed without a web search; a match on the name alone adds to the
+    score but the web is still searched. The matched records are returned as
+    "registry".
+    
     Expected output:
     {
         "ngo_name": "Akshaya Patra Foundation",
@@ -44,7 +252,8 @@ def verify_ngo():
         "sentiment_score": 0.85,
         "num_links": 10,
         "links": [...],
-        "notes": [...]
+        "notes": [...],
+        "cached": false
     }
     """
     try:
@@ -57,134 +266,458 @@ def verify_ngo():
                 'success': False
             }), 400
         
-        print(f"\n🔍 Verifying NGO: {ngo_name}")
-        
-        # Perform web search
-        search_results = perform_web_search(ngo_name)
-        
-        # Analyze results
-        analysis = analyze_ngo_presence(ngo_name, search_results)
+        try:
+            deadline_ms = parse_deadline_ms(data.get('deadline_ms'))
+            max_age = parse_max_age(data.get('max_age'))
+            force_refresh = parse_force_refresh(data.get('force_refresh'))
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
         
-        # Calculate trust score
-        trust_data = calculate_trust_score(ngo_name, search_results, analysis)
+        if data.get('async'):
+            try:
+                callback_url = validate_callback_url(data.get('callback_url'))
+                job = job_runner.submit(
+                    ngo_name,
+                    {
+                        'max_age': max_age,
+                        'force_refresh': force_refresh,
+                        'deadline_ms': deadline_ms,
+                        'registration_id': data.get('registration_id')
+                    },
+                    callback_url
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e), 'success': False}), 400
+            except JobQueueFull as e:
+                return jsonify({'error': str(e), 'success': False}), 503
+            status_url = f"/jobs/{job['job_id']}"
+            return jsonify({**job, 'status_url': status_url}), 202, {'Location': status_url}
         
-        print(f"✅ Verification complete: {trust_data['trust_score']}/100 ({trust_data['trust_level']})")
+        result = get_verification(
+            ngo_name,
+            max_age=max_age,
+            force_refresh=force_refresh,
+            deadline_ms=deadline_ms,
+            registration_id=data.get('registration_id')
+        )
         
-        return jsonify({
-            'success': True,
-            'ngo_name': ngo_name,
-            'trust_score': trust_data['trust_score'],
-            'trust_level': trust_data['trust_level'],
-            'sentiment_label': analysis['sentiment_label'],
-            'sentiment_score': analysis['sentiment_score'],
-            'num_links': len(search_results),
-            'links': search_results[:10],  # Return top 10 links
-            'notes': trust_data['notes']
-        }), 200
+        return jsonify(result), 200
         
     except Exception as e:
         print(f"❌ Error during verification: {str(e)}")
+        VERIFICATIONS.labels(engine='simple', outcome='error').inc()
+        return jsonify(error_result(ngo_name if 'ngo_name' in locals() else 'Unknown', e)), 200  # Return 200 to prevent backend from failing
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """State of a verification job, with its result once the status is done"""
+    job_runner.ensure_started()
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job', 'success': False}), 404
+    return jsonify(job), 200
+
+
+@app.route('/verify_ngo/batch', methods=['POST'])
+def verify_ngo_batch():
+    """
+    Verify many NGOs concurrently and stream the results as NDJSON
+    
+    Expected input:
+    {
+        "ngo_names": ["Akshaya Patra Foundation", "Goonj", ...],
+        "max_age": 86400,         # optional, applied to every name
+        "force_refresh": false    # optional, applied to every name
+    }
+    
+    Output: one JSON object per line, in completion order, each with the
+    NGO's position in the request as "index" plus the /verify_ngo fields. A
+    name given more than once is verified once and sent once per position.
+    """
+    data = request.get_json(silent=True)
+    ngo_names = parse_batch_names(data)
+    
+    if not ngo_names:
+        return jsonify({
+            'error': 'ngo_names must be a non-empty list',
+            'success': False
+        }), 400
+    if len(ngo_names) > BATCH_MAX_NAMES:
         return jsonify({
-            'error': str(e),
-            'success': False,
-            'ngo_name': ngo_name if 'ngo_name' in locals() else 'Unknown',
-            'trust_score': 50,
-            'trust_level': 'UNKNOWN',
-            'sentiment_label': 'NEUTRAL',
-            'sentiment_score': 0.5,
-            'num_links': 0,
-            'links': [],
-            'notes': ['Error during verification - manual review required']
-        }), 200  # Return 200 to prevent backend from failing
-
-
-def perform_web_search(ngo_name, max_results=10):
-    """Perform web search for NGO using multiple methods"""
+            'error': f'At most {BATCH_MAX_NAMES} NGOs per batch',
+            'success': False
+        }), 400
+    
+    try:
+        max_age = parse_max_age(data.get('max_age'))
+        force_refresh = parse_force_refresh(data.get('force_refresh'))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    print(f"\n📦 Batch verification of {len(ngo_names)} NGOs")
+    
+    def verify(ngo_name):
+        return get_verification(ngo_name, max_age=max_age, force_refresh=force_refresh)
+    
+    return Response(
+        stream_batch_results(ngo_names, verify, error_result),
+        mimetype='application/x-ndjson'
+    )
+
+
+def get_verification(ngo_name, max_age=None, force_refresh=False, deadline_ms=None, registration_id=None):
+    """
+    Return a cached verification when one is fresh enough, otherwise run the pipeline
+    
+    With deadline_ms the search stops waiting for slow queries and probes once
+    the budget is used up, and is skipped when none is left. Only requests with
+    the same budget share a run.
+    
+    The name is first resolved against the verified NGOs (name_index.py), so
+    spellings with the same canonical key share a cached result and pipeline
+    run. A name merely close to a verified NGO is verified on its own, with that
+    NGO as canonical["suggestion"], unless it is a near-duplicate with the same
+    legal suffix and registration_id (canonical["reused"]).
+    Otherwise registration_id is only used when the pipeline runs (a cached
+    result is returned as it is).
+    """
+    canonical, cached = lookup_verification(ngo_name, registration_id, max_age, force_refresh)
+    if cached is not None:
+        return cached
+    ngo_name = canonical['name']
+    
+    key = canonical['key'] if deadline_ms is None else f"{canonical['key']}@{deadline_ms}ms"
+    result, shared = verification_flights.do(key, compute_verification, ngo_name, deadline_ms, registration_id)
+    if shared:
+        print(f"🔗 Joined running verification of {ngo_name}")
+        VERIFICATIONS.labels(engine='simple', outcome='coalesced').inc()
+        return {**result, 'cached': False, 'coalesced': True, 'canonical': canonical}
+    
+    return {**result, 'cached': False, 'canonical': canonical}
+
+
+def lookup_verification(ngo_name, registration_id=None, max_age=None, force_refresh=False):
+    """
+    Resolve a name against the verified NGOs and look up its cached result
+    
+    Returns (canonical, response), response being the cached result as
+    /verify_ngo returns it, or None when the pipeline has to run for
+    canonical["name"]. Shared with app_async.py.
+    """
+    canonical = name_index.resolve(ngo_name, registration_id)
+    if canonical['match'] == 'fuzzy':
+        print(f"🪪 {ngo_name} is close to verified NGO {canonical['suggestion']} ({canonical['similarity']}), "
+              f"{'using its result' if canonical['reused'] else 'verifying it as is'}")
+    if not force_refresh:
+        cached = verification_cache.get(canonical['name'], max_age=max_age)
+        if cached is not None:
+            result, age = cached
+            print(f"⚡ Cache hit for {canonical['name']} ({age:.0f}s old)")
+            VERIFICATIONS.labels(engine='simple', outcome='cached').inc()
+            return canonical, {**result, 'cached': True, 'cache_age': round(age, 1), 'canonical': canonical}
+    return canonical, None
+
+
+def error_result(ngo_name, error):
+    """The /verify_ngo answer for a verification that raised"""
+    return {
+        'error': str(error),
+        'success': False,
+        'ngo_name': ngo_name,
+        'trust_score': 50,
+        'trust_level': 'UNKNOWN',
+        'sentiment_label': 'NEUTRAL',
+        'sentiment_score': 0.5,
+        'num_links': 0,
+        'links': [],
+        'notes': ['Error during verification - manual review required']
+    }
+
+
+def run_verification_job(ngo_name, params):
+    """Body of an async /verify_ngo job"""
+    return get_verification(
+        ngo_name,
+        max_age=params.get('max_age'),
+        force_refresh=params.get('force_refresh', False),
+        deadline_ms=params.get('deadline_ms'),
+        registration_id=params.get('registration_id')
+    )
+
+
+# Started per worker (gunicorn post_fork) so the preloading master runs no jobs
+job_runner = JobRunner(job_store, run_verification_job)
+
+
+def compute_verification(ngo_name, deadline_ms=None, registration_id=None):
+    """Run the pipeline for a cache miss and cache the result"""
+    with IN_FLIGHT.labels(engine='simple').track_inprogress():
+        result = run_verification(ngo_name, Deadline(deadline_ms), registration_id)
+    VERIFICATIONS.labels(engine='simple', outcome='computed').inc()
+    save_verification(ngo_name, result, registration_id)
+    return result
+
+
+def save_verification(ngo_name, result, registration_id=None):
+    """Cache a computed result and add its name to the verified NGOs"""
+    # Results that cut the search short to meet a deadline are not kept
+    if not result.get('skipped_stages'):
+        verification_cache.put(ngo_name, result)
+        name_index.add(ngo_name, registration_id)
+
+
+def run_verification(ngo_name, deadline=None, registration_id=None):
+    """Run the registry lookup, search, presence analysis and scoring pipeline for one NGO"""
+    deadline = deadline or Deadline()
+    print(f"\n🔍 Verifying NGO: {ngo_name}")
+    
+    with stage_timer('simple', 'total'):
+        registry_records, matched_by = check_registry(ngo_name, registration_id)
+        if matched_by == 'registration_id':
+            search_results = []
+        else:
+            with stage_timer('simple', 'search'):
+                search_results = perform_web_search(ngo_name, deadline=deadline)
+        return score_verification(ngo_name, deadline, search_results, registry_records, matched_by)
+
+
+def check_registry(ngo_name, registration_id=None):
+    """
+    Registry stage: returns (registry_records, matched_by)
+    
+    An NGO registered under the given ID and name is confirmed offline
+    (matched_by 'registration_id'): the web search is skipped. A match on the
+    name alone only adds to the score, the web is still searched.
+    """
+    with stage_timer('simple', 'registry'):
+        registry_records, matched_by = registry.lookup(ngo_name, registration_id)
+    if matched_by == 'registration_id':
+        print("📒 Found in NGO registry by registration_id, skipping web search")
+    elif registry_records:
+        print("📒 Found in NGO registry by name")
+    return registry_records, matched_by
+
+
+def score_verification(ngo_name, deadline, search_results, registry_records=(), matched_by=None):
+    """Presence analysis and scoring stages: the /verify_ngo result for the search results"""
+    # Analyze results
+    with stage_timer('simple', 'parse'):
+        analysis = analyze_ngo_presence(ngo_name, search_results)
+    
+    # Calculate trust score
+    with stage_timer('simple', 'scoring'):
+        trust_data = calculate_trust_score(ngo_name, search_results, analysis, registry_records=registry_records)
+    
+    print(f"✅ Verification complete: {trust_data['trust_score']}/100 ({trust_data['trust_level']})")
+    
+    # Keep the raw scoring inputs so /rescore can apply new weights later
+    if not deadline.skipped:
+        feature_store.put(
+            ngo_name, scoring_features(ngo_name, search_results, analysis, registry_records),
+            trust_data['trust_score']
+        )
+    
+    result = {
+        'success': True,
+        'ngo_name': ngo_name,
+        'trust_score': trust_data['trust_score'],
+        'trust_level': trust_data['trust_level'],
+        'sentiment_label': analysis['sentiment_label'],
+        'sentiment_score': analysis['sentiment_score'],
+        'num_links': len(search_results),
+        'links': search_results[:10],  # Return top 10 links
+        'notes': trust_data['notes'],
+        'registry': registry_result(registry_records, matched_by)
+    }
+    return deadline.annotate(result)
+
+
+def build_search_queries(ngo_name):
+    """DuckDuckGo queries for an NGO, in priority order"""
+    return [
+        f"{ngo_name} NGO India",
+        f"{ngo_name} charity foundation",
+        f"{ngo_name} official website"
+    ]
+
+
+def format_search_result(result):
+    """Convert a raw DuckDuckGo result into the {title, url, snippet} shape we return"""
+    return {
+        'title': result.get('title', ''),
+        'url': result.get('href') or result.get('link', ''),
+        'snippet': result.get('body', '') or result.get('snippet', '')
+    }
+
+
+def build_domain_guesses(ngo_name):
+    """Likely official website URLs for an NGO, from its name with and without its legal suffix"""
+    slugs = dict.fromkeys([ngo_name.lower().replace(' ', ''), normalize_ngo_name(ngo_name).replace(' ', '')])
+    return [
+        url
+        for slug in slugs if slug
+        for url in (f"https://www.{slug}.org", f"https://www.{slug}.in", f"https://{slug}.org", f"https://{slug}.in")
+    ]
+
+
+def get_ddgs():
+    """Return this thread's DuckDuckGo client, reused across queries (keeps its connections alive)"""
+    from duckduckgo_search import DDGS
+    
+    if not hasattr(search_clients, 'ddgs'):
+        search_clients.ddgs = DDGS()
+    return search_clients.ddgs
+
+
+def run_search_query(query, deadline=None):
+    """Run one DuckDuckGo query and return formatted results (rate limited and retried, http_client.py)"""
+    try:
+        results = outbound.call(
+            'duckduckgo.com', lambda: [format_search_result(r) for r in get_ddgs().text(query, max_results=5)],
+            deadline=deadline and deadline.expires
+        )
+    except Exception as e:
+        print(f"⚠️ Search query failed: {query} - {str(e)}")
+        SEARCH_QUERIES.labels(engine='simple', outcome='rate_limited' if is_retryable_error(e) else 'error').inc()
+        return []
+    
+    SEARCH_QUERIES.labels(engine='simple', outcome='ok' if results else 'empty').inc()
+    return results
+
+
+def probe_url(url):
+    """True when a guessed official website answers with 200"""
+    cached = probe_cache.get(url)
+    if cached is not None and cached.fresh:
+        LINK_FETCHES.labels(engine='simple', outcome='cached').inc()
+        return cached.status == 200
+    
+    try:
+        response = outbound.head(url, timeout=3, allow_redirects=True, headers=conditional_headers(cached))
+    except (RateLimited, RobotsDisallowed) as e:
+        LINK_FETCHES.labels(engine='simple', outcome=fetch_outcome(e)).inc()
+        return False  # never sent, so nothing is known about the site
+    except Exception as e:
+        LINK_FETCHES.labels(engine='simple', outcome=fetch_outcome(e)).inc()
+        probe_cache.put(url, status=0)  # unreachable guesses are remembered for a shorter time
+        return False
+    
+    if response.status_code == 304 and cached is not None:
+        probe_cache.revalidated(url)
+        LINK_FETCHES.labels(engine='simple', outcome='not_modified').inc()
+        return cached.status == 200
+    
+    LINK_FETCHES.labels(engine='simple', outcome='ok' if response.ok else 'http_error').inc()
+    if is_cacheable(response.headers):
+        probe_cache.put(url, '', response.status_code, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.status_code == 200
+
+
+def official_site_result(ngo_name, url):
+    """The search result recorded for a guessed official website that answered"""
+    return {
+        'title': f"{ngo_name} - Official Website",
+        'url': url,
+        'snippet': f"Official website of {ngo_name}"
+    }
+
+
+def merge_search_results(query_results, max_results):
+    """De-duplicate results by URL, keeping query priority order"""
     results = []
+    seen_urls = set()
+    for search_results in query_results:
+        for result in search_results:
+            if len(results) >= max_results:
+                return results
+            if result['url'] and result['url'] not in seen_urls:
+                seen_urls.add(result['url'])
+                results.append(result)
+    return results
+
+
+def perform_web_search(ngo_name, max_results=10, deadline=None):
+    """
+    Perform web search for NGO using multiple methods
     
+    All DuckDuckGo queries run at the same time. Query results are merged in
+    priority order, and as soon as the queries that have finished in that order
+    yield max_results unique URLs the rest of the work is cancelled. The direct
+    domain probes are only needed when DuckDuckGo finds nothing, so they start
+    when it has, or after SEARCH_PROBE_GRACE if it is slow to answer. When the
+    deadline runs out, whatever has finished by then is used; with no time
+    left at all the search is skipped.
+    """
+    deadline = deadline or Deadline()
+    if deadline.remaining() == 0:
+        deadline.skip('search')
+        print("⏱️ No time left to search")
+        return []
     try:
         print(f"🌐 Searching web for: {ngo_name}")
         
-        # Method 1: Try DuckDuckGo search
+        guesses = build_domain_guesses(ngo_name)
+        query_futures = [
+            search_executor.submit(run_search_query, q, deadline) for q in build_search_queries(ngo_name)
+        ]
+        probe_futures = []
+        probes_at = time.monotonic() + SEARCH_PROBE_GRACE
+        
+        def start_probes():
+            if not probe_futures:
+                probe_futures.extend(search_executor.submit(probe_url, url) for url in guesses)
+        
         try:
-            from duckduckgo_search import DDGS
-            
-            queries = [
-                f"{ngo_name} NGO India",
-                f"{ngo_name} charity foundation",
-                f"{ngo_name} official website"
-            ]
-            
-            seen_urls = set()
-            
-            for query in queries:
-                try:
-                    ddgs = DDGS()
-                    search_results = ddgs.text(query, max_results=5)
-                    
-                    for result in search_results:
-                        url = result.get('href') or result.get('link', '')
-                        if url and url not in seen_urls:
-                            seen_urls.add(url)
-                            results.append({
-                                'title': result.get('title', ''),
-                                'url': url,
-                                'snippet': result.get('body', '') or result.get('snippet', '')
-                            })
-                        if len(results) >= max_results:
-                            break
-                except Exception as e:
-                    print(f"⚠️ Search query failed: {query} - {str(e)}")
-                    continue
+            # Method 1: DuckDuckGo search
+            pending = set(query_futures)
+            while pending:
+                timeout = deadline.timeout()
+                if not probe_futures:
+                    grace = max(0.0, probes_at - time.monotonic())
+                    timeout = grace if timeout is None else min(timeout, grace)
+                _, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if pending and deadline.remaining() == 0:
+                    deadline.skip('search_queries')
+                    print(f"⏱️ Deadline reached, dropped {len(pending)} search query(ies)")
+                    break
+                if pending and time.monotonic() >= probes_at:
+                    start_probes()  # DuckDuckGo is slow, probe alongside it
                 
-                if len(results) >= max_results:
+                finished_in_order = []
+                for future in query_futures:
+                    if not future.done():
+                        break
+                    finished_in_order.append(future.result())
+                if len(merge_search_results(finished_in_order, max_results)) >= max_results:
                     break
             
+            results = merge_search_results(
+                [future.result() for future in query_futures if future.done()],
+                max_results
+            )
             if len(results) > 0:
                 print(f"✅ Found {len(results)} search results via DuckDuckGo")
                 return results
-        except Exception as e:
-            print(f"⚠️ DuckDuckGo search failed: {str(e)}")
-        
-        # Method 2: Direct web presence check (fallback)
-        print("🔄 Using direct web presence detection...")
-        ngo_patterns = [
-            f"https://www.{ngo_name.lower().replace(' ', '')}.org",
-            f"https://www.{ngo_name.lower().replace(' ', '')}.in",
-            f"https://{ngo_name.lower().replace(' ', '')}.org",
-            f"https://{ngo_name.lower().replace(' ', '')}.in",
-        ]
-        
-        for url in ngo_patterns:
-            try:
-                response = requests.head(url, timeout=3, allow_redirects=True)
-                if response.status_code == 200:
-                    results.append({
-                        'title': f"{ngo_name} - Official Website",
-                        'url': url,
-                        'snippet': f"Official website of {ngo_name}"
-                    })
+            
+            # Method 2: Direct web presence check (fallback), first guess that answers wins
+            print("🔄 Using direct web presence detection...")
+            start_probes()
+            for url, future in zip(guesses, probe_futures):
+                try:
+                    found = future.result(timeout=deadline.timeout())
+                except FutureTimeoutError:
+                    deadline.skip('domain_probe')
+                    print("⏱️ Deadline reached before the domain probes answered")
+                    break
+                if found:
+                    results.append(official_site_result(ngo_name, url))
                     print(f"✅ Found official website: {url}")
                     break
-            except:
-                continue
-        
-        # Method 3: Check known NGO databases
-        known_databases = [
-            f"https://www.ngosindia.com/search?q={ngo_name.replace(' ', '+')}",
-            f"https://ngodarpan.gov.in/index.php/search/?q={ngo_name.replace(' ', '+')}",
-        ]
+        finally:
+            for future in query_futures + probe_futures:
+                future.cancel()
         
-        for db_url in known_databases:
-            results.append({
-                'title': f"{ngo_name} - NGO Database Search",
-                'url': db_url,
-                'snippet': f"Search results for {ngo_name} in NGO database"
-            })
-        
-        if len(results) > 0:
-            print(f"✅ Generated {len(results)} reference links")
-        else:
+        if not results:
             print(f"⚠️ No web presence detected")
         
         return results
@@ -197,33 +730,18 @@ def perform_web_search(ngo_name, max_results=10):
 def analyze_ngo_presence(ngo_name, search_results):
     """Analyze NGO's web presence and sentiment"""
     
-    # Keywords indicating positive/negative sentiment
-    positive_keywords = [
-        'registered', 'certified', 'verified', 'official', 'legitimate',
-        'trusted', 'approved', 'recognized', 'established', 'reputable',
-        'government', 'ngo', 'foundation', 'charity', 'non-profit',
-        'award', 'achievement', 'impact', 'helping', 'community'
-    ]
-    
-    negative_keywords = [
-        'fraud', 'scam', 'fake', 'illegal', 'suspended', 'banned',
-        'unverified', 'suspicious', 'complaint', 'warning', 'alert',
-        'investigation', 'controversy', 'dispute'
-    ]
-    
-    neutral_keywords = [
-        'organization', 'group', 'association', 'society', 'trust'
-    ]
-    
     # Analyze snippets
     text_combined = ' '.join([
         r.get('title', '').lower() + ' ' + r.get('snippet', '').lower()
         for r in search_results
     ])
     
-    positive_count = sum(1 for kw in positive_keywords if kw in text_combined)
-    negative_count = sum(1 for kw in negative_keywords if kw in text_combined)
-    neutral_count = sum(1 for kw in neutral_keywords if kw in text_combined)
+    # Count every positive/negative/neutral keyword in one pass; each distinct
+    # keyword found counts as one indicator
+    indicator_terms = indicator_matcher.count(text_combined)
+    positive_count = len(indicator_terms['positive'])
+    negative_count = len(indicator_terms['negative'])
+    neutral_count = len(indicator_terms['neutral'])
     
     total_keywords = positive_count + negative_count + neutral_count
     
@@ -234,108 +752,115 @@ def analyze_ngo_presence(ngo_name, search_results):
         sentiment_score = 0.5
     
     # Determine sentiment label
-    if sentiment_score >= 0.65:
-        sentiment_label = "POSITIVE"
-    elif sentiment_score >= 0.45:
-        sentiment_label = "NEUTRAL"
-    else:
-        sentiment_label = "NEGATIVE"
+    sentiment_label = next(label for minimum, label in SENTIMENT_LABELS if sentiment_score >= minimum)
     
     return {
         'sentiment_score': round(sentiment_score, 2),
         'sentiment_label': sentiment_label,
         'positive_indicators': positive_count,
         'negative_indicators': negative_count,
-        'neutral_indicators': neutral_count
+        'neutral_indicators': neutral_count,
+        'indicator_terms': indicator_terms
+    }
+
+
+def scoring_features(ngo_name, search_results, analysis, registry_records=()):
+    """Raw inputs of calculate_trust_score, as saved in the feature store"""
+    return {
+        'num_results': len(search_results),
+        'has_legitimate_name': name_matcher.matches_any(ngo_name),
+        'sentiment_score': analysis['sentiment_score'],
+        'positive_indicators': analysis['positive_indicators'],
+        'negative_indicators': analysis['negative_indicators'],
+        'neutral_indicators': analysis['neutral_indicators'],
+        'has_official_site': any(
+            'official' in r.get('title', '').lower() or
+            ngo_name.lower().replace(' ', '') in r.get('url', '').lower()
+            for r in search_results
+        ),
+        'registry_match': bool(registry_records)
     }
 
 
-def calculate_trust_score(ngo_name, search_results, analysis):
+def calculate_trust_score(ngo_name, search_results, analysis, weights=SCORING_WEIGHTS, registry_records=()):
     """Calculate final trust score based on multiple factors"""
-    
+    features = scoring_features(ngo_name, search_results, analysis, registry_records)
+    return score_trust(features, weights, analysis['sentiment_label'])
+
+
+def score_trust(features, weights=SCORING_WEIGHTS, sentiment_label=None):
+    """Score one NGO's features; also rebuilds the notes of rescored results"""
     notes = []
-    score = 50  # Base score
+    score = weights['base']  # Base score
     
     # Check if NGO name has legitimate-sounding patterns
-    legitimate_patterns = [
-        'foundation', 'trust', 'society', 'welfare', 'charity',
-        'relief', 'aid', 'help', 'care', 'support', 'seva', 'sangh',
-        'patra', 'akshaya', 'parivaar', 'samiti', 'mandal'
-    ]
-    
-    name_lower = ngo_name.lower()
-    has_legitimate_pattern = any(pattern in name_lower for pattern in legitimate_patterns)
-    
-    if has_legitimate_pattern:
-        score += 10
+    if features['has_legitimate_name']:
+        score += weights['legitimate_name']
         notes.append(f"NGO name follows legitimate naming pattern")
     
     # Factor 1: Number of search results (0-20 points)
-    num_results = len(search_results)
+    num_results = features['num_results']
     if num_results >= 10:
-        score += 20
-        notes.append(f"Strong web presence ({num_results} results found)")
+        score += weights['results_strong']
+        notes.append(f"Strong web presence ({num_results:g} results found)")
     elif num_results >= 5:
-        score += 15
-        notes.append(f"Good web presence ({num_results} results found)")
+        score += weights['results_good']
+        notes.append(f"Good web presence ({num_results:g} results found)")
     elif num_results >= 2:
-        score += 10
-        notes.append(f"Moderate web presence ({num_results} results found)")
+        score += weights['results_moderate']
+        notes.append(f"Moderate web presence ({num_results:g} results found)")
     elif num_results > 0:
-        score += 5
-        notes.append(f"Minimal web presence ({num_results} results found)")
+        score += weights['results_minimal']
+        notes.append(f"Minimal web presence ({num_results:g} results found)")
+    elif features['registry_match']:
+        score += weights['results_none']
+        notes.append("No web search results - NGO listed in the registry")
     else:
+        score += weights['results_none']
         notes.append(f"No web presence detected - verification needed")
     
     # Factor 2: Sentiment analysis (0-25 points)
-    sentiment_score = analysis['sentiment_score']
-    sentiment_points = int(sentiment_score * 25)
+    sentiment_score = features['sentiment_score']
+    sentiment_points = int(sentiment_score * weights['sentiment'])
     score += sentiment_points
-    notes.append(f"Sentiment analysis: {analysis['sentiment_label']} ({sentiment_score:.2f})")
+    if sentiment_label is None:
+        sentiment_label = next(label for minimum, label in SENTIMENT_LABELS if sentiment_score >= minimum)
+    notes.append(f"Sentiment analysis: {sentiment_label} ({sentiment_score:.2f})")
     
     # Factor 3: Positive indicators (0-20 points)
-    positive_count = analysis['positive_indicators']
+    positive_count = features['positive_indicators']
     if positive_count >= 10:
-        score += 20
-        notes.append(f"Many positive indicators found ({positive_count})")
+        score += weights['positive_many']
+        notes.append(f"Many positive indicators found ({positive_count:g})")
     elif positive_count >= 5:
-        score += 15
-        notes.append(f"Several positive indicators found ({positive_count})")
+        score += weights['positive_several']
+        notes.append(f"Several positive indicators found ({positive_count:g})")
     elif positive_count >= 2:
-        score += 10
-        notes.append(f"Some positive indicators found ({positive_count})")
+        score += weights['positive_some']
+        notes.append(f"Some positive indicators found ({positive_count:g})")
     
     # Factor 4: Negative indicators (penalty)
-    negative_count = analysis['negative_indicators']
+    negative_count = features['negative_indicators']
     if negative_count > 0:
-        penalty = min(30, negative_count * 10)
+        penalty = min(weights['negative_max'], negative_count * weights['negative_each'])
         score -= penalty
-        notes.append(f"⚠️ Negative indicators found ({negative_count}) - penalty applied")
+        notes.append(f"⚠️ Negative indicators found ({negative_count:g}) - penalty applied")
     
     # Factor 5: Official website presence (0-10 points)
-    has_official_site = any(
-        'official' in r.get('title', '').lower() or
-        ngo_name.lower().replace(' ', '') in r.get('url', '').lower()
-        for r in search_results
-    )
-    if has_official_site:
-        score += 10
+    if features['has_official_site']:
+        score += weights['official_site']
         notes.append("Official website found")
     
+    # Factor 6: Listed in the offline NGO registry
+    if features['registry_match']:
+        score += weights['registry_match']
+        notes.append("Listed in the NGO registry")
+    
     # Ensure score is within 0-100 range
     score = max(0, min(100, score))
     
     # Determine trust level
-    if score >= 80:
-        trust_level = "VERY HIGH"
-    elif score >= 70:
-        trust_level = "HIGH"
-    elif score >= 55:
-        trust_level = "MEDIUM"
-    elif score >= 40:
-        trust_level = "LOW"
-    else:
-        trust_level = "VERY LOW"
+    trust_level = next(level for minimum, level in TRUST_LEVELS if score >= minimum)
     
     return {
         'trust_score': round(score, 1),
@@ -344,10 +869,84 @@ def calculate_trust_score(ngo_name, search_results, analysis):
     }
 
 
+def score_features(matrix, weights=SCORING_WEIGHTS):
+    """Vectorized calculate_trust_score over a feature matrix; returns (scores, levels)"""
+    f = dict(zip(FEATURE_COLUMNS, matrix.T))
+    num_results = f['num_results']
+    positive = f['positive_indicators']
+    negative = f['negative_indicators']
+    
+    score = np.full(len(matrix), float(weights['base']))
+    score += np.where(f['has_legitimate_name'] > 0, weights['legitimate_name'], 0)
+    score += np.select(
+        [num_results >= 10, num_results >= 5, num_results >= 2, num_results > 0],
+        [weights['results_strong'], weights['results_good'], weights['results_moderate'], weights['results_minimal']],
+        default=weights['results_none']
+    )
+    score += np.trunc(f['sentiment_score'] * weights['sentiment'])
+    score += np.select(
+        [positive >= 10, positive >= 5, positive >= 2],
+        [weights['positive_many'], weights['positive_several'], weights['positive_some']],
+        default=0
+    )
+    score -= np.where(negative > 0, np.minimum(weights['negative_max'], negative * weights['negative_each']), 0)
+    score += np.where(f['has_official_site'] > 0, weights['official_site'], 0)
+    score += np.where(f['registry_match'] > 0, weights['registry_match'], 0)
+    score = np.clip(score, 0, 100)
+    return score, trust_levels(score, TRUST_LEVELS)
+
+
+def rescore(weights=None, ngo_names=None, update_cache=False):
+    """
+    Recompute trust scores of stored NGOs from their saved features
+    
+    weights overrides SCORING_WEIGHTS key by key. With update_cache the new
+    scores are also written into the feature store and the cached results,
+    whose notes are rebuilt from the stored features under the new weights.
+    """
+    weights = merge_weights(SCORING_WEIGHTS, weights)
+    started = time.perf_counter()
+    names, matrix, previous_scores = feature_store.load(parse_ngo_names(ngo_names))
+    scores, levels = score_features(matrix, weights)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    results = [
+        {
+            'ngo_name': name,
+            'trust_score': round(float(score), 1),
+            'trust_level': str(level),
+            'previous_score': None if np.isnan(previous) else float(previous)
+        }
+        for name, score, level, previous in zip(names, scores, levels, previous_scores)
+    ]
+    if update_cache:
+        feature_store.update_scores(names, [r['trust_score'] for r in results])
+        verification_cache.update({
+            r['ngo_name']: {
+                'trust_score': r['trust_score'],
+                'trust_level': r['trust_level'],
+                'notes': score_trust(dict(zip(FEATURE_COLUMNS, row.tolist())), weights)['notes'],
+                'rescored': True
+            }
+            for r, row in zip(results, matrix)
+        })
+    
+    print(f"🧮 Rescored {len(results)} NGOs in {elapsed_ms:.1f}ms")
+    return {
+        'success': True,
+        'weights': weights,
+        'count': len(results),
+        'changed': sum(1 for r in results if r['previous_score'] != r['trust_score']),
+        'elapsed_ms': round(elapsed_ms, 2),
+        'updated_cache': bool(update_cache),
+        'results': results
+    }
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 8000))
     print(f"\n🚀 Starting NGO Verification Service on port {port}")
     print(f"📡 Health check: http://localhost:{port}/health")
     print(f"🔍 Verification endpoint: http://localhost:{port}/verify_ngo")
     print("=" * 60)
+    job_runner.ensure_started()
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,96 @@
+"""
+Batch verification helpers
+
+Runs many NGO verifications concurrently under a bounded worker budget and
+yields each result as a newline-delimited JSON record as soon as it finishes,
+from a thread pool (Flask services) or as tasks on the event loop (app_async.py).
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 4))
+BATCH_MAX_NAMES = int(os.getenv('BATCH_MAX_NAMES', 1000))
+
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+
+def parse_batch_names(data):
+    """
+    Return the NGO names of a batch request with their positions in it
+
+    A list of (ngo_name, indices) pairs in request order. A name given more than
+    once (ignoring case) is verified once, and indices lists every position it
+    was requested at. Blank entries are skipped but keep their positions.
+    """
+    names = data.get('ngo_names') if data else None
+    if not isinstance(names, list):
+        return []
+
+    positions = {}
+    for index, name in enumerate(names):
+        name = str(name or '').strip()
+        if name:
+            positions.setdefault(name.lower(), (name, []))[1].append(index)
+    return list(positions.values())
+
+
+def stream_batch_results(ngo_names, verify, error_result):
+    """
+    Verify every name on the shared batch pool and yield NDJSON lines
+
+    ngo_names are the (ngo_name, indices) pairs of parse_batch_names.
+    verify(ngo_name) returns the result dict for one NGO; error_result(ngo_name, error)
+    builds the record sent when it raises. A result is sent once per position
+    the name was requested at, with that position as "index", since results
+    arrive in completion order.
+    """
+    futures = {
+        batch_executor.submit(verify, ngo_name): (indices, ngo_name)
+        for ngo_name, indices in ngo_names
+    }
+
+    try:
+        for future in as_completed(futures):
+            indices, ngo_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Batch verification failed for {ngo_name}: {e}")
+                result = error_result(ngo_name, e)
+            for index in indices:
+                yield json.dumps({'index': index, **result}) + '\n'
+    finally:
+        # Client went away or the batch finished: drop anything not yet started
+        for future in futures:
+            future.cancel()
+
+
+async def stream_batch_results_async(ngo_names, verify, error_result):
+    """
+    Async twin of stream_batch_results: verify(ngo_name) is a coroutine function,
+    run as tasks with at most BATCH_MAX_WORKERS in progress at once
+    """
+    slots = asyncio.Semaphore(BATCH_MAX_WORKERS)
+
+    async def run(ngo_name, indices):
+        async with slots:
+            try:
+                result = await verify(ngo_name)
+            except Exception as e:
+                print(f"❌ Batch verification failed for {ngo_name}: {e}")
+                result = error_result(ngo_name, e)
+        return indices, result
+
+    tasks = [asyncio.ensure_future(run(ngo_name, indices)) for ngo_name, indices in ngo_names]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            indices, result = await finished
+            for index in indices:
+                yield json.dumps({'index': index, **result}) + '\n'
+    finally:
+        # Client went away or the batch finished: drop anything still running
+        for task in tasks:
+            task.cancel()
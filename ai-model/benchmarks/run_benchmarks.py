@@ -0,0 +1,304 @@
+"""
+Offline benchmarks for the NGO verification services
+
+Replays recorded DuckDuckGo results (fixtures/search_results.json) and serves
+recorded HTML pages from a local stub server, so no network access is needed.
+For app.py ("full") and app_simple.py ("simple") it measures:
+
+- per-stage latency (search, scrape, parse, sentiment, scoring, end_to_end)
+  over sequential verifications
+- end-to-end throughput of POST /verify_ngo under concurrent load. The same
+  few NGOs are verified over and over, so concurrent requests for one NGO would
+  share a single pipeline run; single-flight merging is therefore switched off
+  unless --single-flight is given, and the number of merged requests is
+  reported next to the throughput either way
+
+Results are written as JSON. With --baseline, the run fails (exit code 1) when
+a stage's p50 latency or the throughput regresses by more than --max-regression.
+
+Usage:
+    python benchmarks/run_benchmarks.py --engine all --iterations 5 --concurrency 8 \\
+        --output benchmarks/results.json [--baseline previous.json --max-regression 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import wraps
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+# Keep benchmark runs away from the real cache before the apps are imported
+os.environ.setdefault('VERIFY_CACHE_PATH', os.path.join(tempfile.mkdtemp(prefix='ngo-bench-'), 'cache.db'))
+# Refetch every page each iteration so the scrape stage is measured, not the page cache
+os.environ.setdefault('PAGE_CACHE_FRESH_SECONDS', '0')
+os.environ.setdefault('PAGE_CACHE_NEGATIVE_SECONDS', '0')
+# Every request goes to the local stub server; per-host rate limits would only measure the limiter
+os.environ.setdefault('HTTP_RATE_LIMIT', '0')
+os.environ.setdefault('HTTP_DOMAIN_RATE_LIMITS', '')
+
+from stub_server import start_stub_server, stub_url  # noqa: E402
+
+SEARCH_FIXTURES = os.path.join(BENCHMARK_DIR, 'fixtures', 'search_results.json')
+
+
+class StageTimer:
+    """Thread-safe collection of per-stage durations"""
+
+    def __init__(self):
+        self.durations = {}
+        self.lock = threading.Lock()
+
+    def wrap(self, module, func_name, stage):
+        """Replace module.func_name with a version that records its duration"""
+        original = getattr(module, func_name)
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(stage, (time.perf_counter() - started) * 1000)
+
+        setattr(module, func_name, timed)
+
+    def record(self, stage, elapsed_ms):
+        with self.lock:
+            self.durations.setdefault(stage, []).append(elapsed_ms)
+
+    def reset(self):
+        with self.lock:
+            self.durations = {}
+
+    def summary(self):
+        return {stage: summarize(values) for stage, values in sorted(self.durations.items())}
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'mean_ms': round(statistics.fmean(values), 3),
+        'p50_ms': round(statistics.median(values), 3),
+        'p95_ms': round(values[max(0, int(len(values) * 0.95) - 1)], 3),
+        'max_ms': round(values[-1], 3)
+    }
+
+
+def install_search_replay(base_url, search_latency_ms):
+    """Make duckduckgo_search.DDGS answer from the recorded fixtures"""
+    import duckduckgo_search
+
+    with open(SEARCH_FIXTURES) as f:
+        recorded = json.load(f)['queries']
+
+    class ReplayDDGS:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def text(self, keywords, max_results=None, **kwargs):
+            time.sleep(search_latency_ms / 1000.0)
+            for result in recorded.get(keywords, [])[:max_results]:
+                yield {**result, 'href': stub_url(base_url, result['href'])}
+
+    duckduckgo_search.DDGS = ReplayDDGS
+
+
+def load_engine(name, timer, base_url):
+    """Import an engine and instrument its pipeline stages"""
+    if name == 'full':
+        import app as engine
+        timer.wrap(engine, 'search_ngo', 'search')
+        timer.wrap(engine, 'scrape_pages', 'scrape')
+        timer.wrap(engine, 'read_page_text', 'parse')  # streamed body read + parse
+        timer.wrap(engine, 'analyze_sentiment', 'sentiment')
+        timer.wrap(engine, 'analyze_sentiment_chunked', 'sentiment')
+        timer.wrap(engine, 'calculate_trust_score', 'scoring')
+        timer.wrap(engine, 'run_verification', 'end_to_end')
+    else:
+        import app_simple as engine
+
+        # Domain probes go to the stub server instead of the guessed domains
+        probe_url = engine.probe_url
+        engine.probe_url = lambda url: probe_url(stub_url(base_url, url))
+        timer.wrap(engine, 'perform_web_search', 'search')
+        timer.wrap(engine, 'analyze_ngo_presence', 'parse')
+        timer.wrap(engine, 'calculate_trust_score', 'scoring')
+        timer.wrap(engine, 'run_verification', 'end_to_end')
+    return engine
+
+
+def ngo_names():
+    with open(SEARCH_FIXTURES) as f:
+        queries = json.load(f)['queries']
+    return sorted({query.rsplit(' NGO official', 1)[0] for query in queries if query.endswith(' NGO official')})
+
+
+class NoSingleFlight:
+    """Stands in for an engine's verification_flights so every request runs its own pipeline"""
+
+    coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        return fn(*args, **kwargs), False
+
+    def stats(self):
+        return {'in_flight': 0, 'coalesced': 0}
+
+
+def measure_throughput(engine, names, iterations, concurrency, single_flight=False):
+    """
+    Drive POST /verify_ngo concurrently and return verifications per second
+
+    Requests merged into another one's pipeline run ("coalesced") are counted
+    under merged; without single_flight there are none.
+    """
+    requests_to_send = [name for _ in range(iterations) for name in names]
+    statuses = []
+    merged = []
+
+    def post(name):
+        with engine.app.test_client() as client:
+            response = client.post('/verify_ngo', json={'ngo_name': name, 'force_refresh': True})
+            statuses.append(response.status_code)
+            merged.append(bool((response.get_json(silent=True) or {}).get('coalesced')))
+
+    flights = engine.verification_flights
+    if not single_flight:
+        engine.verification_flights = NoSingleFlight()
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(post, requests_to_send))
+        elapsed = time.perf_counter() - started
+    finally:
+        engine.verification_flights = flights
+
+    return {
+        'requests': len(requests_to_send),
+        'concurrency': concurrency,
+        'single_flight': single_flight,
+        'merged': sum(merged),
+        'pipeline_runs': len(requests_to_send) - sum(merged),
+        'errors': sum(1 for status in statuses if status != 200),
+        'elapsed_s': round(elapsed, 3),
+        'verifications_per_second': round(len(requests_to_send) / elapsed, 2)
+    }
+
+
+def run_engine(name, base_url, args):
+    timer = StageTimer()
+    engine = load_engine(name, timer, base_url)
+    names = ngo_names()
+
+    print(f"🏁 Benchmarking {name} engine on {len(names)} NGOs")
+    engine.run_verification(names[0])  # warm-up
+    timer.reset()
+
+    for _ in range(args.iterations):
+        for ngo_name in names:
+            engine.run_verification(ngo_name)
+    stages = timer.summary()
+
+    timer.reset()
+    throughput = measure_throughput(engine, names, args.iterations, args.concurrency, args.single_flight)
+
+    return {
+        'model_loaded': getattr(engine, 'sentiment_model', True) is not None,
+        'stages': stages,
+        'throughput': throughput
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Return a list of regressions relative to a baseline results file"""
+    regressions = []
+    for engine_name, current in results['engines'].items():
+        previous = baseline.get('engines', {}).get(engine_name)
+        if not previous:
+            continue
+
+        for stage, stats in current['stages'].items():
+            before = previous['stages'].get(stage, {}).get('p50_ms')
+            if before and stats['p50_ms'] > before * (1 + max_regression):
+                regressions.append(f"{engine_name}.{stage} p50 {before}ms -> {stats['p50_ms']}ms")
+
+        # Runs before the switch existed merged requests; throughput with and without isn't comparable
+        if previous['throughput'].get('single_flight', True) != current['throughput']['single_flight']:
+            print(f"⚠️ {engine_name} throughput not compared: baseline ran with another --single-flight setting")
+            continue
+        before = previous['throughput']['verifications_per_second']
+        after = current['throughput']['verifications_per_second']
+        if after < before / (1 + max_regression):
+            regressions.append(f"{engine_name} throughput {before}/s -> {after}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the NGO verification services')
+    parser.add_argument('--engine', choices=['full', 'simple', 'all'], default='all')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--single-flight', action='store_true',
+                        help='let concurrent requests for the same NGO share a pipeline run, as in production')
+    parser.add_argument('--page-latency-ms', type=float, default=20, help='artificial delay per stub page')
+    parser.add_argument('--search-latency-ms', type=float, default=50, help='artificial delay per search query')
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results.json'))
+    parser.add_argument('--baseline', help='previous results file to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency_ms=args.page_latency_ms)
+    install_search_replay(base_url, args.search_latency_ms)
+
+    engines = ['full', 'simple'] if args.engine == 'all' else [args.engine]
+    results = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            'iterations': args.iterations,
+            'concurrency': args.concurrency,
+            'page_latency_ms': args.page_latency_ms,
+            'search_latency_ms': args.search_latency_ms,
+            'single_flight': args.single_flight
+        },
+        'engines': {name: run_engine(name, base_url, args) for name in engines}
+    }
+    server.shutdown()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"📊 Results written to {args.output}")
+
+    for name, result in results['engines'].items():
+        end_to_end = result['stages']['end_to_end']
+        throughput = result['throughput']
+        print(f"   {name}: end_to_end p50 {end_to_end['p50_ms']}ms, "
+              f"{throughput['verifications_per_second']} verifications/s "
+              f"({throughput['merged']} of {throughput['requests']} requests merged)")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
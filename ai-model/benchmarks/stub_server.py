@@ -0,0 +1,104 @@
+"""
+Local stand-in for the web pages the verification pipeline fetches
+
+Serves recorded HTML from benchmarks/fixtures/pages. A recorded URL such as
+https://en.wikipedia.org/wiki/Goonj_(NGO) is requested as
+http://127.0.0.1:<port>/en.wikipedia.org/wiki/Goonj_(NGO) and answered with
+fixtures/pages/en.wikipedia.org/wiki/Goonj_(NGO).html (index.html for paths
+ending in "/"). Anything not recorded gets a 404. Pages carry an ETag and
+requests revalidating it with If-None-Match get a 304.
+
+Run standalone with:
+    python benchmarks/stub_server.py --port 8765 --latency-ms 50
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+
+
+def stub_url(base_url, url):
+    """Rewrite a recorded URL so it is fetched from the stub server"""
+    parsed = urlparse(url)
+    return f"{base_url}/{parsed.netloc}{parsed.path or '/'}"
+
+
+def page_path(request_path):
+    """Map a stub request path to a recorded page file (or None)"""
+    path = unquote(urlparse(request_path).path).lstrip('/')
+    if not path or path.endswith('/'):
+        path += 'index.html'
+    elif not path.endswith('.html'):
+        path += '.html'
+
+    full_path = os.path.normpath(os.path.join(PAGES_DIR, path))
+    if not full_path.startswith(PAGES_DIR) or not os.path.isfile(full_path):
+        return None
+    return full_path
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def _send(self, include_body):
+        time.sleep(self.latency)
+        path = page_path(self.path)
+        if path is None:
+            self.send_error(404)
+            return
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._send(include_body=True)
+
+    def do_HEAD(self):
+        self._send(include_body=False)
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+
+def start_stub_server(port=0, latency_ms=0):
+    """Start the stub server on a background thread and return (server, base_url)"""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'latency': latency_ms / 1000.0})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='stub-server', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve recorded NGO pages locally')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.latency_ms)
+    print(f"📡 Serving recorded pages at {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
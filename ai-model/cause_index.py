@@ -0,0 +1,277 @@
+"""
+Resident cause catalog for /predict
+
+Keeps the cause catalog tokenized and vectorized between requests (a
+recommender.CauseMatrix), so /predict only needs the volunteer's profile and an
+optional filter. Causes are added or replaced with POST /causes and removed
+with DELETE /causes/<id> or POST /causes/delete; GET /causes/nearby lists the
+causes around a point using the matrix's spatial index (geo_index.py).
+
+Every change is written as a snapshot in CAUSE_INDEX_DIR: the numeric arrays as
+.npy files, memory-mapped copy-on-write when a worker starts, and the ids,
+cause objects and vocabulary in index.json. Writers hold a file lock and reload
+the newest snapshot first; other workers notice the new index.json on their
+next request and map it in. A replaced snapshot's files are only deleted once
+CAUSE_SNAPSHOT_GRACE_SECONDS have passed, so a worker reading index.json just
+before a write still finds them; should they be gone anyway, the worker retries
+with the newer snapshot and otherwise keeps serving the one it has mapped.
+With no snapshot yet, the catalog is seeded from CAUSE_CATALOG_PATH (a JSON
+list in the causes.json shape) when that is set.
+
+With a sentence encoder (embeddings.py) the snapshot also holds the causes'
+float16 embeddings. They are memory-mapped like the other arrays. A snapshot
+encoded with a different model is re-encoded once when a worker starts.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+from recommender import CauseMatrix, rank, select_rows
+
+CAUSE_INDEX_DIR = os.getenv('CAUSE_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cause_index'))
+CAUSE_CATALOG_PATH = os.getenv('CAUSE_CATALOG_PATH')
+CAUSE_UPSERT_MAX = int(os.getenv('CAUSE_UPSERT_MAX', 5000))
+CAUSE_SNAPSHOT_GRACE_SECONDS = float(os.getenv('CAUSE_SNAPSHOT_GRACE_SECONDS', 300))
+
+SNAPSHOT_ARRAYS = ('alive', 'lats', 'lngs', 'categories', 'entry_rows', 'entry_terms', 'entry_tf')
+EMBEDDINGS_ARRAY = 'embeddings'
+
+
+def parse_nearby_query(args):
+    """(lat, lng, radius_km, k) from GET /causes/nearby query parameters; raises ValueError"""
+    try:
+        lat, lng = float(args['lat']), float(args['lng'])
+        radius_km = float(args['radiusKm']) if args.get('radiusKm') else None
+        k = int(args['k']) if args.get('k') else None
+    except KeyError:
+        raise ValueError('lat and lng are required')
+    except ValueError:
+        raise ValueError('lat, lng and radiusKm must be numbers and k an integer')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('lat or lng out of range')
+    if radius_km is None and k is None:
+        raise ValueError('Give radiusKm, k or both')
+    if (radius_km is not None and not 0 < radius_km < float('inf')) or (k is not None and k <= 0):
+        raise ValueError('radiusKm and k must be positive')
+    return lat, lng, radius_km, k
+
+
+class CauseIndex:
+    """The catalog's CauseMatrix, kept in sync with its snapshot on disk"""
+
+    def __init__(self, directory=CAUSE_INDEX_DIR, catalog_path=CAUSE_CATALOG_PATH, encoder=None,
+                 snapshot_grace=CAUSE_SNAPSHOT_GRACE_SECONDS):
+        self.directory = directory
+        self.catalog_path = catalog_path
+        self.encoder = encoder
+        self.snapshot_grace = snapshot_grace
+        self.index_path = os.path.join(directory, 'index.json')
+        self.matrix = CauseMatrix(encoder=encoder)
+        self.version = None
+        self.embedding_model = None
+        self._snapshot_id = None
+        self._lock = threading.RLock()
+        try:
+            self.refresh()
+            if self.version is None and catalog_path and os.path.exists(catalog_path):
+                with open(catalog_path, encoding='utf-8') as f:
+                    seeded = self.upsert(json.load(f))
+                print(f"📚 Seeded cause index with {seeded} causes from {catalog_path}")
+            elif encoder is not None and self.embedding_model != encoder.name:
+                self._embed_catalog()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Cause index unavailable: {e}")
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'index.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _embed_catalog(self):
+        """Encode the whole catalog with this index's encoder and save it, unless another worker just did"""
+        with self._lock, self._file_lock():
+            self.refresh()
+            if self.embedding_model == self.encoder.name:
+                return
+            print(f"🔄 Encoding {len(self.matrix)} causes with {self.encoder.name}...")
+            self.matrix.embed_all(self.encoder)
+            self._save()
+
+    def _current_snapshot(self):
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """
+        Map in the newest snapshot if another worker wrote one since the last check
+
+        A snapshot whose files disappear while they are loaded has been replaced
+        in the meantime, so the load is retried once with the newer index.json.
+        """
+        try:
+            self._load_snapshot()
+        except OSError:
+            self._load_snapshot()
+
+    def _refresh_for_reading(self):
+        """refresh() for requests: on failure keep answering from the snapshot already mapped"""
+        try:
+            self.refresh()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Cause index refresh failed, serving version {self.version}: {e}")
+
+    def _load_snapshot(self):
+        snapshot_id = self._current_snapshot()
+        if snapshot_id is None or snapshot_id == self._snapshot_id:
+            return
+        with self._lock:
+            if snapshot_id == self._snapshot_id:
+                return
+            with open(self.index_path, encoding='utf-8') as f:
+                meta = json.load(f)
+
+            embedding_model = meta.get('embedding_model')
+            encoded = self.encoder is not None and embedding_model == self.encoder.name
+            # Vectors from another model can't be compared with this encoder's queries
+            matrix = CauseMatrix(encoder=self.encoder if encoded else None)
+            matrix.ids = meta['ids']
+            matrix.causes = meta['causes']
+            matrix.vocabulary = {term: term_id for term_id, term in enumerate(meta['vocabulary'])}
+            matrix.category_codes = {category: code for code, category in enumerate(meta['categories'])}
+            for name in SNAPSHOT_ARRAYS:
+                # Copy-on-write: pages are shared until this worker changes them
+                path = os.path.join(self.directory, f"{name}.{meta['version']}.npy")
+                setattr(matrix, name, np.load(path, mmap_mode='c'))
+            if encoded:
+                matrix.embeddings = np.load(
+                    os.path.join(self.directory, f"{EMBEDDINGS_ARRAY}.{meta['version']}.npy"), mmap_mode='c'
+                )
+            matrix.rows = {str(cause_id): row for row, cause_id in enumerate(matrix.ids) if cause_id is not None}
+
+            self.matrix = matrix
+            self.version = meta['version']
+            self.embedding_model = embedding_model
+            self._snapshot_id = snapshot_id
+
+    def _save(self):
+        """Write the matrix as a new snapshot and drop the files of those replaced long enough ago"""
+        matrix = self.matrix
+        if not matrix.alive.all():
+            matrix.compact()
+        version = uuid.uuid4().hex
+        names = SNAPSHOT_ARRAYS + ((EMBEDDINGS_ARRAY,) if matrix.embeddings is not None else ())
+        for name in names:
+            np.save(os.path.join(self.directory, f"{name}.{version}.npy"), np.asarray(getattr(matrix, name)))
+        embedding_model = matrix.encoder.name if matrix.embeddings is not None else None
+
+        vocabulary = sorted(matrix.vocabulary, key=matrix.vocabulary.get)
+        categories = sorted(matrix.category_codes, key=matrix.category_codes.get)
+        temporary_path = f"{self.index_path}.{version}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': version,
+                'ids': matrix.ids,
+                'causes': matrix.causes,
+                'vocabulary': vocabulary,
+                'categories': categories,
+                'embedding_model': embedding_model
+            }, f)
+        os.replace(temporary_path, self.index_path)
+
+        previous, self.version = self.version, version
+        self.embedding_model = embedding_model
+        self._snapshot_id = self._current_snapshot()
+        self._drop_old_snapshots(previous)
+
+    def _drop_old_snapshots(self, previous):
+        """
+        Start the grace period of the snapshot just replaced and delete older ones past it
+
+        A replaced snapshot's files get their mtime set to the time of the
+        replacement. Workers that already mapped them keep them until they refresh.
+        """
+        expired = time.time() - self.snapshot_grace
+        for filename in os.listdir(self.directory):
+            parts = filename.split('.')
+            if len(parts) != 3 or parts[2] != 'npy' or parts[1] == self.version:
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                if parts[1] == previous:
+                    os.utime(path)
+                elif os.stat(path).st_mtime < expired:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def upsert(self, causes):
+        """Add or replace causes (matched by id); returns the number stored"""
+        if not isinstance(causes, list) or not all(isinstance(cause, dict) for cause in causes):
+            raise ValueError('causes must be a list of objects')
+        if len(causes) > CAUSE_UPSERT_MAX:
+            raise ValueError(f"At most {CAUSE_UPSERT_MAX} causes per request")
+        if any(cause.get('id', cause.get('_id')) is None for cause in causes):
+            raise ValueError('Every cause needs an id')
+        with self._lock, self._file_lock():
+            self.refresh()
+            stored = self.matrix.upsert(causes)
+            self._save()
+        return stored
+
+    def delete(self, cause_ids):
+        """Remove causes by id; returns the number removed"""
+        with self._lock, self._file_lock():
+            self.refresh()
+            removed = self.matrix.delete(cause_ids)
+            if removed:
+                self._save()
+        return removed
+
+    def recommend(self, profile, cause_filter=None):
+        """Rank the catalog (or the part matching a parsed cause_filter) for a parsed profile"""
+        self._refresh_for_reading()
+        with self._lock:
+            if not len(self.matrix):
+                raise ValueError('No causes given and the cause index is empty')
+            return rank(self.matrix, profile, select_rows(self.matrix, profile, cause_filter or {}))
+
+    def nearby(self, lat, lng, radius_km=None, k=None):
+        """Causes within radius_km of (lat, lng), or the k nearest (within radius_km if both are given)"""
+        self._refresh_for_reading()
+        with self._lock:
+            matrix = self.matrix
+            if k is None:
+                rows, distances = matrix.geo.within(lat, lng, radius_km, matrix.alive)
+            else:
+                rows, distances = matrix.geo.nearest(lat, lng, k, matrix.alive)
+                if radius_km is not None:
+                    inside = distances <= radius_km
+                    rows, distances = rows[inside], distances[inside]
+            return [
+                {'causeId': matrix.ids[row], 'distanceKm': round(float(distance), 2), 'cause': matrix.causes[row]}
+                for row, distance in zip(rows.tolist(), distances.tolist())
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'causes': len(self.matrix),
+                'terms': len(self.matrix.vocabulary),
+                'embedding_model': self.embedding_model,
+                'version': self.version
+            }
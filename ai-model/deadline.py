@@ -0,0 +1,106 @@
+"""
+Latency budgets for /verify_ngo
+
+A request may pass deadline_ms. The pipeline then checks the time left before
+each stage and plans around it instead of running every stage to completion:
+the web search is abandoned once the budget is spent, scraping fetches fewer
+links (or is replaced by the search result snippets), and the sentiment model
+is skipped when its recent run time no longer fits. The response lists what was
+skipped, and results that skipped a stage are not cached, so a later request
+without a budget still gets the full pipeline.
+"""
+
+import math
+import os
+import threading
+import time
+
+# Least time worth spending on scraping; below it search snippets are used instead
+DEADLINE_SCRAPE_MIN_MS = int(os.getenv('DEADLINE_SCRAPE_MIN_MS', 1000))
+# Assumed scraping and sentiment model run times until real runs have been measured
+DEADLINE_SCRAPE_ESTIMATE_MS = int(os.getenv('DEADLINE_SCRAPE_ESTIMATE_MS', 2000))
+DEADLINE_SENTIMENT_ESTIMATE_MS = int(os.getenv('DEADLINE_SENTIMENT_ESTIMATE_MS', 500))
+
+
+def parse_deadline_ms(value):
+    """Validate the optional deadline_ms of a request (None means no budget)"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        raise ValueError('deadline_ms must be a positive number of milliseconds')
+    return value
+
+
+class Deadline:
+    """Time budget of one verification, and the stages it made the pipeline skip"""
+
+    def __init__(self, budget_ms=None):
+        self.budget_ms = budget_ms
+        self.started = time.monotonic()
+        self.expires = None if budget_ms is None else self.started + budget_ms / 1000
+        self.skipped = []
+
+    @property
+    def bounded(self):
+        return self.expires is not None
+
+    def remaining(self):
+        """Seconds left (infinite without a budget)"""
+        if self.expires is None:
+            return math.inf
+        return max(0.0, self.expires - time.monotonic())
+
+    def timeout(self):
+        """Seconds left as a wait() timeout: None without a budget"""
+        return None if self.expires is None else self.remaining()
+
+    def skip(self, stage):
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+
+    def annotate(self, result):
+        """Add deadline_ms, elapsed_ms, skipped_stages and a note to a result computed under a budget"""
+        if self.expires is None:
+            return result
+        result.update({
+            'deadline_ms': self.budget_ms,
+            'elapsed_ms': round((time.monotonic() - self.started) * 1000, 1),
+            'skipped_stages': list(self.skipped)
+        })
+        if self.skipped:
+            result['notes'] = result['notes'] + [
+                f"Skipped {', '.join(self.skipped)} to answer within {self.budget_ms:g}ms"
+            ]
+        return result
+
+
+class StageEstimate:
+    """Moving average of how long a stage takes, used to decide whether it fits"""
+
+    def __init__(self, initial_seconds, alpha=0.2):
+        self.seconds = initial_seconds
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.seconds += self.alpha * (seconds - self.seconds)
+
+    def fits(self, deadline):
+        return self.seconds <= deadline.remaining()
+
+
+def plan_scrape(deadline, reserve_seconds, max_links, stage_seconds, estimate):
+    """
+    Links to fetch and seconds to spend scraping, or None to skip scraping
+
+    reserve_seconds is kept back for the stages after scraping. When the time
+    left is shorter than scraping usually takes (estimate), proportionally fewer
+    links are fetched, which also leaves less text for the model to score.
+    """
+    seconds = min(stage_seconds, deadline.remaining() - reserve_seconds)
+    if seconds < DEADLINE_SCRAPE_MIN_MS / 1000:
+        return None
+    if seconds < estimate.seconds:
+        max_links = max(1, int(max_links * seconds / estimate.seconds))
+    return max_links, seconds
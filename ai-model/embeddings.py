@@ -0,0 +1,164 @@
+"""
+Sentence embeddings for /predict
+
+With EMBEDDING_MODEL_DIR pointing at a local sentence encoder (a Hugging Face
+model directory such as sentence-transformers/all-MiniLM-L6-v2 saved with
+save_pretrained), /predict can match on meaning instead of shared words, so
+"coding" finds a cause that asks to "teach programming". The model runs on CPU;
+its token embeddings are mean-pooled over the attention mask and L2-normalized,
+so a dot product is the cosine similarity.
+
+Cause vectors are kept as float16 by recommender.CauseMatrix and memory-mapped
+from the cause index snapshot; only new or changed causes are encoded. Query
+vectors are cached per profile (the phrases of a user's interests or skills),
+and cause texts sent with a /predict request are cached so the same causes are
+not encoded again on the next request.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+EMBEDDING_MODEL_DIR = os.getenv('EMBEDDING_MODEL_DIR')
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 32))
+EMBEDDING_MAX_LENGTH = int(os.getenv('EMBEDDING_MAX_LENGTH', 128))
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv('EMBEDDING_QUERY_CACHE_SIZE', 1024))
+EMBEDDING_TEXT_CACHE_SIZE = int(os.getenv('EMBEDDING_TEXT_CACHE_SIZE', 10000))
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters"""
+
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._items), 'hits': self.hits, 'misses': self.misses}
+
+
+class SentenceEncoder:
+    """Mean-pooled, normalized sentence embeddings from a local model directory"""
+
+    def __init__(self, model_dir, batch_size=EMBEDDING_BATCH_SIZE, max_length=EMBEDDING_MAX_LENGTH):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.name = os.path.basename(os.path.normpath(model_dir))
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+        self.model = AutoModel.from_pretrained(model_dir, local_files_only=True)
+        self.model.eval()
+        self.dimension = self.model.config.hidden_size
+        self._torch = torch
+        self._lock = threading.Lock()
+        self.queries = LRUCache(EMBEDDING_QUERY_CACHE_SIZE)
+        self.texts = LRUCache(EMBEDDING_TEXT_CACHE_SIZE)
+
+    def encode(self, texts):
+        """float32 array (len(texts), dimension) of unit-length embeddings"""
+        torch = self._torch
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = [text or ' ' for text in texts[start:start + self.batch_size]]
+            inputs = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_length, return_tensors='pt')
+            # One forward pass at a time; torch already uses every core for it
+            with self._lock, torch.no_grad():
+                hidden = self.model(**inputs).last_hidden_state
+            mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            vectors[start:start + len(batch)] = torch.nn.functional.normalize(pooled, dim=-1).numpy()
+        return vectors
+
+    def encode_texts(self, texts):
+        """float16 embeddings of cause texts, encoding only those not seen recently"""
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float16)
+        keys = [hashlib.sha1(text.encode('utf-8')).hexdigest() for text in texts]
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.texts.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                vectors[i] = cached
+        if missing:
+            encoded = self.encode([texts[i] for i in missing]).astype(np.float16)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+                self.texts.put(keys[i], vector)
+        return vectors
+
+    def encode_query(self, phrases):
+        """float32 embedding of a profile's interest or skill phrases (None without phrases), cached"""
+        if not phrases:
+            return None
+        key = tuple(sorted(phrases))
+        vector = self.queries.get(key)
+        if vector is None:
+            vector = self.encode([', '.join(key)])[0]
+            self.queries.put(key, vector)
+        return vector
+
+    def dot(self, vectors, query):
+        """float32 dot products of float16 vectors (n, dimension) with a float32 query"""
+        # torch widens float16 with SIMD; numpy's astype(float32) is several times slower
+        torch = self._torch
+        return (torch.from_numpy(np.ascontiguousarray(vectors)).float() @ torch.from_numpy(query)).numpy()
+
+    def stats(self):
+        return {
+            'model': self.name,
+            'dimension': self.dimension,
+            'query_cache': self.queries.stats(),
+            'text_cache': self.texts.stats()
+        }
+
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """The process's SentenceEncoder, loaded on first use; None when not configured or not loadable"""
+    global _encoder, _encoder_loaded
+    if _encoder_loaded:
+        return _encoder
+    with _encoder_lock:
+        if not _encoder_loaded:
+            if EMBEDDING_MODEL_DIR:
+                try:
+                    print(f"🔄 Loading sentence encoder from {EMBEDDING_MODEL_DIR}...")
+                    _encoder = SentenceEncoder(EMBEDDING_MODEL_DIR)
+                    print(f"✅ Sentence encoder loaded ({_encoder.dimension} dimensions)")
+                except Exception as e:
+                    print(f"⚠️ Sentence encoder unavailable, /predict will use TF-IDF only: {e}")
+            _encoder_loaded = True
+    return _encoder
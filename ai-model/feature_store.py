@@ -0,0 +1,163 @@
+"""
+Persistent store of the raw scoring features behind each verification
+
+Every verification saves the inputs its trust score was computed from (link
+count, Wikipedia/.org flags, sentiment, indicator counts, text length, ...) as
+one float64 vector per NGO. /rescore loads all vectors of an engine into a
+single numpy matrix and reapplies the scoring rules with array operations, so
+new weights can be tried on the whole roster without fetching anything.
+
+Rows live in the same SQLite file as the verification cache by default, in
+their own table.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from verification_cache import CACHE_PATH, ngo_name_key
+
+FEATURE_STORE_PATH = os.getenv('FEATURE_STORE_PATH', CACHE_PATH)
+SQLITE_MAX_VARIABLES = 500
+
+
+class FeatureStore:
+    """SQLite-backed table of per-NGO feature vectors for one engine"""
+
+    def __init__(self, namespace, columns, path=FEATURE_STORE_PATH):
+        self.namespace = namespace
+        self.columns = list(columns)
+        self.signature = ','.join(self.columns)
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS features (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    ngo_name TEXT NOT NULL,
+                    columns TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    trust_score REAL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS features_namespace ON features (namespace, columns)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, ngo_name):
+        return f"{self.namespace}:{ngo_name_key(ngo_name)}"
+
+    def put(self, ngo_name, features, trust_score=None):
+        """Save the feature dict of one verification (missing columns are stored as 0)"""
+        vector = np.array([float(features.get(column, 0)) for column in self.columns], dtype=np.float64)
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO features (key, namespace, ngo_name, columns, vector, trust_score, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self._key(ngo_name), self.namespace, ngo_name, self.signature, vector.tobytes(), trust_score, time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Feature store write error: {e}")
+
+    def load(self, ngo_names=None):
+        """
+        Return (names, matrix, trust_scores) for stored NGOs, optionally only the given ones
+
+        matrix has one row per NGO and one float64 column per feature. Rows saved
+        with a different column layout (before a feature was added) are skipped
+        until the NGO is verified again.
+        """
+        conn = self._connect()
+        query = 'SELECT ngo_name, vector, trust_score FROM features WHERE namespace = ? AND columns = ?'
+        if ngo_names is None:
+            rows = conn.execute(query, (self.namespace, self.signature)).fetchall()
+        else:
+            keys = list(dict.fromkeys(self._key(name) for name in ngo_names))
+            rows = []
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+                rows.extend(conn.execute(
+                    f"{query} AND key IN ({','.join('?' * len(chunk))})",
+                    (self.namespace, self.signature, *chunk)
+                ).fetchall())
+
+        names = [row[0] for row in rows]
+        matrix = np.frombuffer(b''.join(row[1] for row in rows), dtype=np.float64).reshape(len(rows), len(self.columns))
+        trust_scores = np.array([np.nan if row[2] is None else row[2] for row in rows], dtype=np.float64)
+        return names, matrix, trust_scores
+
+    def update_scores(self, ngo_names, trust_scores):
+        """Record the scores the stored features now produce"""
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN')
+            try:
+                conn.executemany(
+                    'UPDATE features SET trust_score = ? WHERE key = ?',
+                    [(float(score), self._key(name)) for name, score in zip(ngo_names, trust_scores)]
+                )
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"⚠️ Feature store write error: {e}")
+
+    def count(self):
+        try:
+            return self._connect().execute(
+                'SELECT COUNT(*) FROM features WHERE namespace = ? AND columns = ?',
+                (self.namespace, self.signature)
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"⚠️ Feature store read error: {e}")
+            return 0
+
+
+def merge_weights(defaults, overrides):
+    """Apply weight overrides from a /rescore request, rejecting unknown or non-numeric ones"""
+    if not overrides:
+        return dict(defaults)
+    if not isinstance(overrides, dict):
+        raise ValueError('weights must be an object')
+
+    unknown = sorted(set(overrides) - set(defaults))
+    if unknown:
+        raise ValueError(f"Unknown weights: {', '.join(unknown)} (known: {', '.join(defaults)})")
+    for name, value in overrides.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Weight {name} must be a number")
+    return {**defaults, **overrides}
+
+
+def parse_ngo_names(ngo_names):
+    """Validate the optional ngo_names filter of a /rescore request"""
+    if ngo_names is None:
+        return None
+    if not isinstance(ngo_names, list) or not all(isinstance(name, str) for name in ngo_names):
+        raise ValueError('ngo_names must be a list of names')
+    return [name.strip() for name in ngo_names if name.strip()]
+
+
+def trust_levels(scores, thresholds):
+    """
+    Vectorized trust level lookup
+
+    thresholds is a list of (minimum_score, level) from highest to lowest; scores
+    below every minimum get the last level.
+    """
+    conditions = [scores >= minimum for minimum, _ in thresholds[:-1]]
+    return np.select(conditions, [level for _, level in thresholds[:-1]], default=thresholds[-1][1])
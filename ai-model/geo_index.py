@@ -0,0 +1,126 @@
+"""
+Spatial index over cause coordinates
+
+Answers "causes within R km" and "the k nearest causes" without measuring the
+distance to every cause. Coordinates are bucketed into a grid of
+GEO_CELL_DEGREES x GEO_CELL_DEGREES cells (0.1 degrees is about 11 km north to
+south). A radius query only measures the causes in the cells overlapping the
+circle's bounding box, then keeps those whose haversine distance is within R.
+A nearest query runs radius queries with a doubling radius until it has k
+causes.
+
+Rows are appended with extend() as causes are added; removed causes stay in
+their cells and are skipped with the caller's mask (recommender.CauseMatrix
+rebuilds the index when it compacts). Rows without coordinates are never
+returned.
+"""
+
+import math
+import os
+from itertools import chain
+
+import numpy as np
+
+GEO_CELL_DEGREES = float(os.getenv('GEO_CELL_DEGREES', 0.1))
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distances from one point to arrays of points (NaN where unknown)"""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class GeoIndex:
+    """Grid of rows by (lat, lng) cell; row i is the i-th coordinate pair added"""
+
+    def __init__(self, lats=(), lngs=(), cell_degrees=GEO_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.columns = int(math.ceil(360 / cell_degrees))
+        self.lats = np.zeros(0)
+        self.lngs = np.zeros(0)
+        self.cells = {}  # cell key -> rows in that cell
+        self.extend(lats, lngs)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _keys(self, lats, lngs):
+        lat_index = np.floor((np.clip(lats, -90, 90) + 90) / self.cell_degrees).astype(np.int64)
+        lng_index = np.floor((lngs + 180) / self.cell_degrees).astype(np.int64) % self.columns
+        return lat_index * self.columns + lng_index
+
+    def extend(self, lats, lngs):
+        """Append rows len(self) .. len(self) + len(lats) - 1"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        first_row = len(self.lats)
+        self.lats = np.concatenate([self.lats, lats])
+        self.lngs = np.concatenate([self.lngs, lngs])
+
+        located = np.flatnonzero(~(np.isnan(lats) | np.isnan(lngs)))
+        keys = self._keys(lats[located], lngs[located])
+        order = np.argsort(keys, kind='stable')
+        keys, rows = keys[order], located[order] + first_row
+        cell_keys, starts = np.unique(keys, return_index=True)
+        for key, cell_rows in zip(cell_keys.tolist(), np.split(rows, starts[1:])):
+            self.cells.setdefault(key, []).extend(cell_rows.tolist())
+
+    def _candidates(self, lat, lng, radius_km):
+        """Rows in the cells overlapping the circle's bounding box, or None when scanning all rows is cheaper"""
+        if radius_km >= HALF_CIRCUMFERENCE_KM:
+            return None
+        angular = radius_km / EARTH_RADIUS_KM
+        lat_span = math.degrees(angular)
+        low, high = lat - lat_span, lat + lat_span
+        if low <= -90 or high >= 90:
+            lng_span = 180.0  # the circle contains a pole
+        else:
+            ratio = math.sin(angular) / math.cos(math.radians(lat))
+            lng_span = math.degrees(math.asin(ratio)) if ratio < 1 else 180.0
+
+        lat_indices = range(
+            int((max(low, -90) + 90) // self.cell_degrees),
+            int((min(high, 90) + 90) // self.cell_degrees) + 1
+        )
+        first = int((lng - lng_span + 180) // self.cell_degrees)
+        last = int((lng + lng_span + 180) // self.cell_degrees)
+        if lng_span >= 180 or last - first + 1 >= self.columns:
+            lng_indices = range(self.columns)
+        else:
+            lng_indices = [index % self.columns for index in range(first, last + 1)]
+
+        if len(lat_indices) * len(lng_indices) > len(self.cells):
+            return None
+        cells = self.cells
+        found = [cells[key] for key in (
+            lat_index * self.columns + lng_index for lat_index in lat_indices for lng_index in lng_indices
+        ) if key in cells]
+        return np.fromiter(chain.from_iterable(found), dtype=np.int64)
+
+    def within(self, lat, lng, radius_km, mask=None):
+        """(rows, distances_km) of the rows within radius_km, nearest first; mask[row] False excludes a row"""
+        rows = self._candidates(lat, lng, radius_km)
+        if rows is None:
+            rows = np.flatnonzero(~(np.isnan(self.lats) | np.isnan(self.lngs)))
+        if mask is not None:
+            rows = rows[mask[rows]]
+        distances = haversine_km(lat, lng, self.lats[rows], self.lngs[rows])
+        inside = distances <= radius_km
+        rows, distances = rows[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return rows[order], distances[order]
+
+    def nearest(self, lat, lng, k, mask=None):
+        """(rows, distances_km) of the k nearest rows, nearest first"""
+        radius_km = self.cell_degrees * KM_PER_DEGREE
+        while True:
+            rows, distances = self.within(lat, lng, radius_km, mask)
+            if len(rows) >= k or radius_km >= HALF_CIRCUMFERENCE_KM:
+                return rows[:k], distances[:k]
+            radius_km *= 2
@@ -0,0 +1,68 @@
+"""
+Gunicorn settings for the NGO verification service
+
+The app module (and with MODEL_LOAD_MODE=eager, the sentiment model) is loaded
+once in the master process. Workers are forked from it afterwards, so they
+share the model weights copy-on-write instead of each loading their own copy.
+A SENTIMENT_BACKEND other than pytorch is built in each worker after the fork.
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = 120
+preload_app = True
+
+# Workers write Prometheus samples here so /metrics can aggregate them; this
+# has to be set before the app (and prometheus_client) is imported
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'ngo-prometheus'))
+# The master must not start ONNX Runtime or quantized kernel thread pools before
+# forking; app.py then leaves the backend (and its agreement check) to post_fork
+os.environ['SENTIMENT_BACKEND_AFTER_FORK'] = '1'
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be summed into the new one
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the garbage collector's reach so
+    # collections in the workers don't touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import sys
+
+    torch_threads = os.getenv('TORCH_THREADS_PER_WORKER')
+    if torch_threads and 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(int(torch_threads))
+
+    # Build the sentiment backend the master left to the workers. With
+    # MODEL_LOAD_MODE=background the master may not have finished loading the
+    # model before forking; start loading it in this worker in that case
+    app_module = sys.modules.get('app')
+    if app_module is not None and hasattr(app_module, 'ensure_model_loading'):
+        app_module.ensure_backend()
+        app_module.ensure_model_loading()
+
+    # Each worker runs its own share of async verification jobs and resumes the
+    # ones a previous worker left queued or died running
+    for name in ('app', 'app_simple'):
+        app_module = sys.modules.get(name)
+        if app_module is not None and hasattr(app_module, 'job_runner'):
+            app_module.job_runner.ensure_started()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,162 @@
+"""
+Streaming visible-text extraction from HTML
+
+Produces the same text as the BeautifulSoup path it replaces (get_text() with
+script/style removed, split into lines and double-space separated phrases,
+stripped and joined with single spaces, then truncated) without building a
+parse tree. Like get_text(), it leaves out <template> contents and ruby
+annotations (<rt>, <rp>). The page can be fed in pieces as it downloads;
+extraction stops as soon as enough text has been collected or the byte limit
+is reached, so the rest of a multi-megabyte page is never downloaded or parsed.
+"""
+
+import codecs
+import os
+import re
+from html.parser import HTMLParser
+
+PAGE_MAX_BYTES = int(os.getenv('SCRAPE_MAX_BYTES', 1024 * 1024))
+# Tags whose contents are not visible text; BeautifulSoup's get_text() skips the
+# last three too, as template and ruby strings
+SKIPPED_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+# Elements that never have contents, so BeautifulSoup does not keep them open
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+    'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer'
+}
+ASCII_SPACES = ' \n\t\f\r'
+
+# Text is split into phrases on line breaks (as str.splitlines does) and on
+# double spaces; phrases are stripped and empty ones dropped
+PHRASE_SEPARATOR = re.compile('\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]|  ')
+
+
+class VisibleTextExtractor(HTMLParser):
+    """Incremental HTML parser collecting the first max_chars of visible text"""
+
+    def __init__(self, max_chars=1000, encoding=None, max_bytes=PAGE_MAX_BYTES):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.done = False
+        self._decoder = self._make_decoder(encoding)
+        self._open = []  # names of the open elements, nested as BeautifulSoup nests them
+        self._skipping = None
+        self._skip_level = 0  # len(self._open) when the skipped element opened
+        self._preserving = 0
+        self._node = ''  # whitespace seen so far in the current text node
+        self._node_visible = False
+        self._pending = ''  # text after the last phrase separator
+        self._phrases = []
+        self._length = -1  # length of ' '.join(self._phrases)
+
+    @staticmethod
+    def _make_decoder(encoding):
+        try:
+            return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def feed_bytes(self, chunk):
+        """Feed a chunk of the raw response body; returns True once no more is needed"""
+        self.bytes_read += len(chunk)
+        self.feed(self._decoder.decode(chunk))
+        if self.bytes_read >= self.max_bytes:
+            self.done = True
+        return self.done
+
+    def feed(self, data):
+        if not self.done:
+            super().feed(data)
+
+    def handle_starttag(self, tag, attrs):
+        self._end_node()
+        if tag in VOID_TAGS:
+            return
+        if tag in SKIPPED_TAGS and self._skipping is None:
+            self._skipping = tag
+            self._skip_level = len(self._open)
+        self._open.append(tag)
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserving += 1
+
+    def handle_endtag(self, tag):
+        self._end_node()
+        if tag not in self._open:
+            return  # stray end tag, ignored
+        # Closes the innermost open element of that name and any left open inside it
+        del self._open[len(self._open) - 1 - self._open[::-1].index(tag):]
+        if self._skipping is not None and len(self._open) <= self._skip_level:
+            self._skipping = None
+        if self._preserving:
+            self._preserving = sum(name in PRESERVE_WHITESPACE_TAGS for name in self._open)
+
+    def handle_comment(self, data):
+        self._end_node()
+
+    def handle_decl(self, decl):
+        self._end_node()
+
+    def handle_pi(self, data):
+        self._end_node()
+
+    def unknown_decl(self, data):
+        self._end_node()
+        if data.startswith('CDATA[') and not self._skipping and not self.done:
+            self._add_text(data[len('CDATA['):])
+
+    def handle_data(self, data):
+        if self._skipping or self.done:
+            return
+
+        if self._node_visible:
+            self._add_text(data)
+            return
+
+        # Like BeautifulSoup, a text node made only of whitespace collapses to a
+        # single newline or space, so hold whitespace until the node shows text
+        self._node += data
+        if self._preserving or self._node.strip(ASCII_SPACES):
+            self._node_visible = True
+            self._add_text(self._node)
+            self._node = ''
+
+    def _end_node(self):
+        if self._node and not self._skipping and not self.done:
+            self._add_text('\n' if '\n' in self._node else ' ')
+        self._node = ''
+        self._node_visible = False
+
+    def _add_text(self, data):
+        pieces = PHRASE_SEPARATOR.split(self._pending + data)
+        self._pending = pieces.pop()  # may continue in the next piece of data
+        self._add_phrases(pieces)
+
+    def _add_phrases(self, pieces):
+        for piece in pieces:
+            phrase = piece.strip()
+            if phrase:
+                self._phrases.append(phrase)
+                self._length += len(phrase) + 1
+                if self._length >= self.max_chars:
+                    self.done = True
+                    return
+
+    def get_text(self):
+        """Finish parsing and return the collected text"""
+        if not self.done:
+            super().feed(self._decoder.decode(b'', final=True))
+            self.close()
+            self._end_node()
+            self._add_phrases([self._pending])
+        return ' '.join(self._phrases)[:self.max_chars]
+
+
+def extract_visible_text(html, max_chars=1000):
+    """Return the first max_chars of visible text in an already downloaded page"""
+    extractor = VisibleTextExtractor(max_chars, max_bytes=float('inf'))
+    extractor.feed(html)
+    return extractor.get_text()
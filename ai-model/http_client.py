@@ -0,0 +1,572 @@
+"""
+Managed outbound HTTP
+
+Every request the services make to other hosts (page scrapes, domain probes,
+DuckDuckGo searches, job callbacks) goes through this module instead of a bare
+requests.get / DDGS() / httpx call:
+
+- Connection pooling: one requests.Session per process (HttpClient) or one
+  httpx.AsyncClient per event loop (AsyncHttpClient), keeping up to
+  HTTP_POOL_PER_HOST keep-alive connections per host, so repeated requests to a
+  host skip the DNS lookup and the TCP/TLS handshake
+- Retries: 429 and 5xx answers (and, for callers that ask for it, connection
+  errors) are retried HTTP_RETRIES times with full-jitter exponential backoff,
+  honouring Retry-After, but never past the caller's deadline
+- Per-domain rate limits: a token bucket per host (HTTP_RATE_LIMIT), with
+  overrides by domain (HTTP_DOMAIN_RATE_LIMITS, e.g. DuckDuckGo). A request
+  that would have to wait past its deadline fails with RateLimited instead
+- robots.txt: scrapes ask respect_robots=True; each host's robots.txt is
+  fetched once per ROBOTS_CACHE_SECONDS and the rules for our crawler token
+  (ROBOTS_USER_AGENT, also sent in SCRAPE_USER_AGENT) are honoured. A fetch
+  the rate limit or the deadline kept from completing is not cached
+- Statistics: stats() reports requests, retries by reason, rate limit waits,
+  robots refusals and connection pool reuse (/health "outbound")
+
+Third-party clients that open their own connections (duckduckgo_search) run
+through call(), which applies the same rate limit and backoff to the whole call.
+"""
+
+import asyncio
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import OUTBOUND_RETRIES
+from singleflight import AsyncSingleFlight, SingleFlight
+
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', 100))
+HTTP_POOL_PER_HOST = int(os.getenv('HTTP_POOL_PER_HOST', 10))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.5))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 8))
+# "<requests per second>:<burst>" per host; 0 disables the default limit
+HTTP_RATE_LIMIT = os.getenv('HTTP_RATE_LIMIT', '5:10')
+# Comma-separated "<domain>=<rate>:<burst>"; a domain covers its subdomains, which share one bucket
+HTTP_DOMAIN_RATE_LIMITS = os.getenv('HTTP_DOMAIN_RATE_LIMITS', 'duckduckgo.com=2:4')
+# Buckets kept before the idle (full) ones are dropped
+HTTP_RATE_BUCKETS = int(os.getenv('HTTP_RATE_BUCKETS', 10000))
+# Crawler token robots.txt rules are matched against; the scrapers send it in
+# their User-Agent, which robots.txt is fetched with too
+ROBOTS_USER_AGENT = os.getenv('ROBOTS_USER_AGENT', 'ImpactMatchBot')
+SCRAPE_USER_AGENT = f"Mozilla/5.0 (compatible; {ROBOTS_USER_AGENT}/1.0)"
+ROBOTS_CACHE_SECONDS = int(os.getenv('ROBOTS_CACHE_SECONDS', 24 * 60 * 60))
+ROBOTS_ERROR_SECONDS = int(os.getenv('ROBOTS_ERROR_SECONDS', 60 * 60))
+ROBOTS_CACHE_HOSTS = int(os.getenv('ROBOTS_CACHE_HOSTS', 10000))
+ROBOTS_TIMEOUT = 3
+ROBOTS_MAX_BYTES = 512 * 1024
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class RateLimited(requests.RequestException):
+    """The host's rate limit would delay the request past its deadline"""
+
+
+class RobotsDisallowed(requests.RequestException):
+    """The host's robots.txt disallows the URL"""
+
+
+def parse_rate(value):
+    """(rate, burst) from "<rate>:<burst>" (burst defaults to the rate, at least 1); None when rate is 0"""
+    rate, _, burst = str(value).partition(':')
+    rate = float(rate)
+    if rate <= 0:
+        return None
+    return rate, max(1.0, float(burst) if burst else rate)
+
+
+def parse_domain_rates(value):
+    """{domain: (rate, burst)} from HTTP_DOMAIN_RATE_LIMITS"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        domain, _, rate = item.partition('=')
+        rates[domain.strip().lower()] = parse_rate(rate)
+    return rates
+
+
+def backoff_delay(attempt, retry_after=None, base=HTTP_BACKOFF_BASE, cap=HTTP_BACKOFF_MAX):
+    """Seconds to wait before retry number attempt + 1: Retry-After if given, else full jitter"""
+    if retry_after:
+        try:
+            seconds = float(retry_after)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return min(cap, max(0.0, seconds))
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_retryable_error(error):
+    """Whether a third-party client's exception is a rate limit or server error worth retrying"""
+    text = f"{type(error).__name__} {error}".lower()
+    return 'ratelimit' in text or re.search(r'\b(429|50[0-4])\b', text) is not None
+
+
+def host_of(url):
+    return (urlparse(url).hostname or '').lower()
+
+
+def fits(deadline, seconds):
+    """Whether seconds of waiting still end before the (monotonic) deadline"""
+    return deadline is None or time.monotonic() + seconds < deadline
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations: how long a caller must wait for its token"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def idle(self):
+        """Whether the bucket has refilled, so dropping it changes nothing"""
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.burst
+
+    def reserve(self, max_wait=math.inf):
+        """Take a token, returning the seconds until it is due; None (nothing taken) if that exceeds max_wait"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self.tokens -= 1  # may go negative: later callers queue behind this one
+            return wait
+
+
+class RateLimits:
+    """Token buckets per host, or per configured domain"""
+
+    def __init__(self, default=HTTP_RATE_LIMIT, domains=HTTP_DOMAIN_RATE_LIMITS, max_buckets=HTTP_RATE_BUCKETS):
+        self.default = parse_rate(default)
+        self.domains = parse_domain_rates(domains)
+        self.max_buckets = max_buckets
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        """The bucket limiting requests to host, or None when it is not limited"""
+        key, rate = host, self.default
+        for domain, domain_rate in self.domains.items():
+            if host == domain or host.endswith(f".{domain}"):
+                key, rate = domain, domain_rate
+                break
+        if rate is None:
+            return None
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= self.max_buckets:
+                    self.buckets = {k: b for k, b in self.buckets.items() if not b.idle()}
+                bucket = self.buckets[key] = TokenBucket(*rate)
+            return bucket
+
+    def reserve(self, host, deadline=None):
+        """Seconds to wait before a request to host (0 when unlimited); None if that passes the deadline"""
+        bucket = self.bucket(host)
+        if bucket is None:
+            return 0.0
+        return bucket.reserve(math.inf if deadline is None else max(0.0, deadline - time.monotonic()))
+
+
+class RobotsCache:
+    """Parsed robots.txt per host, kept for ROBOTS_CACHE_SECONDS (ROBOTS_ERROR_SECONDS when unavailable)"""
+
+    def __init__(self, max_hosts=ROBOTS_CACHE_HOSTS, user_agent=ROBOTS_USER_AGENT):
+        self.max_hosts = max_hosts
+        self.user_agent = user_agent
+        self._entries = OrderedDict()   # origin -> (parser or None, expires)
+        self._lock = threading.Lock()
+        self.disallowed = 0
+
+    def get(self, origin):
+        """(found, parser) for origin; parser None means everything is allowed"""
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry is None or entry[1] < time.monotonic():
+                return False, None
+            self._entries.move_to_end(origin)
+            return True, entry[0]
+
+    def put(self, origin, status, text):
+        """Store a robots.txt answer; anything but a 200 (or no answer, status 0) allows everything"""
+        parser = None
+        if status == 200:
+            parser = RobotFileParser()
+            parser.parse(text[:ROBOTS_MAX_BYTES].splitlines())
+        ttl = ROBOTS_ERROR_SECONDS if status == 0 or status >= 500 else ROBOTS_CACHE_SECONDS
+        with self._lock:
+            self._entries[origin] = (parser, time.monotonic() + ttl)
+            self._entries.move_to_end(origin)
+            while len(self._entries) > self.max_hosts:
+                self._entries.popitem(last=False)
+        return parser
+
+    def allows(self, parser, url):
+        allowed = parser is None or parser.can_fetch(self.user_agent, url)
+        if not allowed:
+            with self._lock:
+                self.disallowed += 1
+        return allowed
+
+    def stats(self):
+        with self._lock:
+            return {'hosts': len(self._entries), 'disallowed': self.disallowed}
+
+
+def robots_origin(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+class OutboundStats:
+    """Thread-safe request, retry and rate limit counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = Counter()
+        self.exhausted = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.rate_limited = 0
+
+    def request(self):
+        with self._lock:
+            self.requests += 1
+
+    def retry(self, reason):
+        with self._lock:
+            self.retries[reason] += 1
+        OUTBOUND_RETRIES.labels(reason=reason).inc()
+
+    def give_up(self):
+        with self._lock:
+            self.exhausted += 1
+
+    def throttle(self, seconds):
+        with self._lock:
+            if seconds is None:
+                self.rate_limited += 1
+            elif seconds > 0:
+                self.throttled += 1
+                self.throttled_seconds += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': dict(self.retries),
+                'retries_exhausted': self.exhausted,
+                'throttled': self.throttled,
+                'throttled_seconds': round(self.throttled_seconds, 3),
+                'rate_limited': self.rate_limited
+            }
+
+
+class HttpClient:
+    """Pooled requests.Session with retries, per-domain rate limits and robots.txt checks"""
+
+    def __init__(self, limits=None, robots=None, pool_hosts=HTTP_POOL_HOSTS, pool_per_host=HTTP_POOL_PER_HOST):
+        self.limits = limits or RateLimits()
+        self.robots = robots or RobotsCache()
+        self.pool_hosts = pool_hosts
+        self.pool_per_host = pool_per_host
+        self.counters = OutboundStats()
+        self._robots_flights = SingleFlight()
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def session(self):
+        """This process's session, recreated after a fork so workers never share sockets"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    session = requests.Session()
+                    # Retries are done here, where they can respect rate limits and deadlines
+                    adapter = HTTPAdapter(pool_connections=self.pool_hosts, pool_maxsize=self.pool_per_host, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session, self._pid = session, os.getpid()
+        return self._session
+
+    def _throttle(self, host, deadline):
+        wait = self.limits.reserve(host, deadline)
+        self.counters.throttle(wait)
+        if wait is None:
+            raise RateLimited(f"Rate limit for {host} would pass the deadline")
+        if wait > 0:
+            time.sleep(wait)
+
+    def request(self, method, url, deadline=None, retries=HTTP_RETRIES, retry_errors=False,
+                respect_robots=False, **kwargs):
+        """
+        requests.Session.request with pooling, rate limiting and retries
+
+        deadline is a time.monotonic() value: no wait or retry goes past it and
+        the timeout of each attempt is cut to the time left. Connection errors
+        are only retried with retry_errors. With respect_robots the URL is
+        checked against the host's robots.txt first (RobotsDisallowed).
+        """
+        host = host_of(url)
+        if respect_robots and not self.allowed(url, deadline):
+            raise RobotsDisallowed(f"robots.txt disallows {url}")
+
+        timeout = kwargs.pop('timeout', None)
+        for attempt in range(retries + 1):
+            self._throttle(host, deadline)
+            if deadline is not None:
+                remaining = max(0.001, deadline - time.monotonic())
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            self.counters.request()
+            response = error = None
+            try:
+                response = self.session().request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not retry_errors:
+                    raise
+                error, reason, retry_after = e, type(e).__name__, None
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                reason, retry_after = str(response.status_code), response.headers.get('Retry-After')
+
+            delay = backoff_delay(attempt, retry_after)
+            if attempt == retries or not fits(deadline, delay):
+                self.counters.give_up()
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            self.counters.retry(reason)
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def call(self, host, func, *args, deadline=None, retries=HTTP_RETRIES, **kwargs):
+        """Run a third-party client call against host under its rate limit, retrying rate limit errors"""
+        for attempt in range(retries + 1):
+            self._throttle(host, deadline)
+            self.counters.request()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_error(e):
+                    raise
+                delay = backoff_delay(attempt)
+                if attempt == retries or not fits(deadline, delay):
+                    self.counters.give_up()
+                    raise
+                self.counters.retry(type(e).__name__)
+                time.sleep(delay)
+
+    def allowed(self, url, deadline=None):
+        """Whether robots.txt lets us fetch url (fetched once per host and cached)"""
+        origin = robots_origin(url)
+        found, parser = self.robots.get(origin)
+        if not found:
+            parser, _ = self._robots_flights.do(origin, self._fetch_robots, origin, deadline)
+        return self.robots.allows(parser, url)
+
+    def _fetch_robots(self, origin, deadline):
+        """
+        Fetch and cache origin's robots.txt
+
+        A fetch that was never sent (RateLimited) or that timed out only because
+        the deadline cut its timeout short says nothing about the host, so it is
+        not cached as "unavailable": the error is raised to the caller instead.
+        """
+        cut_short = not fits(deadline, ROBOTS_TIMEOUT)
+        try:
+            response = self.request(
+                'GET', f"{origin}/robots.txt", deadline=deadline, retries=0, timeout=ROBOTS_TIMEOUT,
+                headers={'User-Agent': SCRAPE_USER_AGENT}
+            )
+            return self.robots.put(origin, response.status_code, response.text)
+        except RateLimited:
+            raise
+        except requests.Timeout:
+            if cut_short:
+                raise
+            return self.robots.put(origin, 0, '')
+        except requests.RequestException:
+            return self.robots.put(origin, 0, '')
+
+    def pool_stats(self):
+        """Host pools open in this process and how often their connections were reused"""
+        hosts = connections = served = 0
+        if self._session is not None and self._pid == os.getpid():
+            pools = self._session.get_adapter('https://').poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                hosts += 1
+                connections += pool.num_connections
+                served += pool.num_requests
+        return {
+            'hosts': hosts,
+            'connections_opened': connections,
+            'requests': served,
+            'reused': max(0, served - connections),
+            'max_per_host': self.pool_per_host
+        }
+
+    def stats(self):
+        return {**self.counters.snapshot(), 'pool': self.pool_stats(), 'robots': self.robots.stats()}
+
+
+class AsyncHttpClient:
+    """Asyncio twin of HttpClient on a pooled httpx.AsyncClient (create it on the running loop)"""
+
+    def __init__(self, limits=None, robots=None, max_connections=None, **options):
+        self.limits = limits or RateLimits()
+        self.robots = robots or RobotsCache()
+        self.counters = OutboundStats()
+        self._robots_flights = AsyncSingleFlight()
+        self.max_connections = max_connections
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            **options
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _throttle(self, host, deadline):
+        wait = self.limits.reserve(host, deadline)
+        self.counters.throttle(wait)
+        if wait is None:
+            raise RateLimited(f"Rate limit for {host} would pass the deadline")
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def request(self, method, url, deadline=None, retries=HTTP_RETRIES, retry_errors=False,
+                      respect_robots=False, stream=False, follow_redirects=httpx.USE_CLIENT_DEFAULT, **kwargs):
+        """
+        Send a request like HttpClient.request; with stream=True the caller reads
+        the body and must close the response (await response.aclose())
+        """
+        host = host_of(url)
+        if respect_robots and not await self.allowed(url, deadline):
+            raise RobotsDisallowed(f"robots.txt disallows {url}")
+
+        timeout = kwargs.pop('timeout', None)
+        for attempt in range(retries + 1):
+            await self._throttle(host, deadline)
+            if deadline is not None:
+                remaining = max(0.001, deadline - time.monotonic())
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            self.counters.request()
+            response = error = None
+            try:
+                request = self.client.build_request(
+                    method, url, timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout, **kwargs
+                )
+                response = await self.client.send(request, stream=stream, follow_redirects=follow_redirects)
+            except httpx.TransportError as e:
+                if not retry_errors:
+                    raise
+                error, reason, retry_after = e, type(e).__name__, None
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                reason, retry_after = str(response.status_code), response.headers.get('Retry-After')
+
+            delay = backoff_delay(attempt, retry_after)
+            if attempt == retries or not fits(deadline, delay):
+                self.counters.give_up()
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                await response.aclose()
+            self.counters.retry(reason)
+            await asyncio.sleep(delay)
+
+    async def call(self, host, coro_fn, *args, deadline=None, retries=HTTP_RETRIES, **kwargs):
+        """Await a third-party client call against host under its rate limit, retrying rate limit errors"""
+        for attempt in range(retries + 1):
+            await self._throttle(host, deadline)
+            self.counters.request()
+            try:
+                return await coro_fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_error(e):
+                    raise
+                delay = backoff_delay(attempt)
+                if attempt == retries or not fits(deadline, delay):
+                    self.counters.give_up()
+                    raise
+                self.counters.retry(type(e).__name__)
+                await asyncio.sleep(delay)
+
+    async def allowed(self, url, deadline=None):
+        origin = robots_origin(url)
+        found, parser = self.robots.get(origin)
+        if not found:
+            parser, _ = await self._robots_flights.do(origin, self._fetch_robots, origin, deadline)
+        return self.robots.allows(parser, url)
+
+    async def _fetch_robots(self, origin, deadline):
+        """Fetch and cache origin's robots.txt, like HttpClient._fetch_robots"""
+        cut_short = not fits(deadline, ROBOTS_TIMEOUT)
+        try:
+            response = await self.request(
+                'GET', f"{origin}/robots.txt", deadline=deadline, retries=0, timeout=ROBOTS_TIMEOUT,
+                headers={'User-Agent': SCRAPE_USER_AGENT}
+            )
+            return self.robots.put(origin, response.status_code, response.text)
+        except RateLimited:
+            raise
+        except httpx.TimeoutException:
+            if cut_short:
+                raise
+            return self.robots.put(origin, 0, '')
+        except (httpx.HTTPError, requests.RequestException):
+            return self.robots.put(origin, 0, '')
+
+    def pool_stats(self):
+        # httpx keeps its pool private; report what it exposes and fall back to the limits
+        pool = getattr(getattr(self.client, '_transport', None), '_pool', None)
+        connections = getattr(pool, 'connections', None)
+        return {
+            'connections': len(connections) if connections is not None else None,
+            'max_connections': self.max_connections
+        }
+
+    def stats(self):
+        return {**self.counters.snapshot(), 'pool': self.pool_stats(), 'robots': self.robots.stats()}
+
+
+# Shared by everything in a process that makes synchronous requests
+rate_limits = RateLimits()
+robots_cache = RobotsCache()
+outbound = HttpClient(rate_limits, robots_cache)
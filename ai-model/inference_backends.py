@@ -0,0 +1,278 @@
+"""
+CPU inference backends for the sentiment model
+
+- pytorch: eager fp32 PyTorch (the reference)
+- int8:    PyTorch with Linear layers dynamically quantized to int8
+- onnx:    ONNX Runtime over a graph exported once and cached on disk, under a
+           fingerprint of the weights so new weights are exported again
+
+Every backend takes the tokenizer output (PyTorch tensors) and returns softmax
+probabilities as a (batch, 3) tensor, so callers don't care which one is used.
+
+Command line:
+    python inference_backends.py export               # export + cache the ONNX graph
+    python inference_backends.py check                # label agreement vs pytorch
+    python inference_backends.py bench                # latency + memory per backend
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'pytorch')
+ONNX_CACHE_DIR = os.getenv('ONNX_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'onnx_cache'))
+AGREEMENT_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'sentiment_corpus.json')
+MIN_AGREEMENT = float(os.getenv('SENTIMENT_BACKEND_MIN_AGREEMENT', 0.95))
+
+BACKENDS = ('pytorch', 'int8', 'onnx')
+
+
+class TorchBackend:
+    """Eager fp32 PyTorch inference"""
+
+    name = 'pytorch'
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict_proba(self, inputs):
+        import torch
+
+        with torch.no_grad():
+            outputs = self.model(**inputs)
+        return torch.nn.functional.softmax(outputs.logits, dim=-1)
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch inference with Linear layers dynamically quantized to int8"""
+
+    name = 'int8'
+
+    def __init__(self, model):
+        import torch
+
+        super().__init__(torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8))
+
+
+class OnnxBackend:
+    """ONNX Runtime inference over an exported graph"""
+
+    name = 'onnx'
+
+    def __init__(self, model, tokenizer, model_name, cache_dir=ONNX_CACHE_DIR):
+        import onnxruntime
+
+        self.path = onnx_path(model, model_name, cache_dir)
+        if not os.path.exists(self.path):
+            export_onnx(model, tokenizer, self.path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def predict_proba(self, inputs):
+        import torch
+
+        feed = {name: tensor.numpy() for name, tensor in inputs.items() if name in self.input_names}
+        logits = self.session.run(['logits'], feed)[0]
+        return torch.nn.functional.softmax(torch.from_numpy(logits), dim=-1)
+
+
+def weights_fingerprint(model, model_name):
+    """
+    Short hash that changes with a model's weights
+
+    For a local model directory it covers the names, sizes and modification
+    times of its weight files; for a hub model the resolved commit, and when
+    neither is known the weights themselves.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    weight_files = sorted(
+        entry for entry in (os.listdir(model_name) if os.path.isdir(model_name) else [])
+        if entry.endswith(('.safetensors', '.bin', '.pt', '.pth'))
+    )
+    commit = getattr(getattr(model, 'config', None), '_commit_hash', None)
+    if weight_files:
+        for entry in weight_files:
+            stat = os.stat(os.path.join(model_name, entry))
+            digest.update(f"{entry}:{stat.st_size}:{stat.st_mtime_ns};".encode('utf-8'))
+    elif commit:
+        digest.update(commit.encode('utf-8'))
+    else:
+        for key, tensor in model.state_dict().items():
+            digest.update(key.encode('utf-8'))
+            digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()
+
+
+def onnx_path(model, model_name, cache_dir=ONNX_CACHE_DIR):
+    """Location of the cached ONNX graph for a model, named after the model and its weights"""
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+    return os.path.join(cache_dir, f"{slug}.{weights_fingerprint(model, model_name)}.onnx")
+
+
+def export_onnx(model, tokenizer, path):
+    """Export the model to ONNX with dynamic batch and sequence axes"""
+    import torch
+
+    print(f"📦 Exporting sentiment model to {path}...")
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    sample = tokenizer(["sample text for export", "another"], return_tensors="pt", padding=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.onnx.export(
+        model,
+        (sample['input_ids'], sample['attention_mask']),
+        tmp_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'}
+        },
+        opset_version=14
+    )
+    os.replace(tmp_path, path)  # other workers never see a half-written graph
+    print(f"✅ ONNX export finished in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def load_backend(name, model, tokenizer, model_name):
+    """Build the named backend around an already loaded PyTorch model"""
+    if name == 'pytorch':
+        return TorchBackend(model)
+    if name == 'int8':
+        return QuantizedTorchBackend(model)
+    if name == 'onnx':
+        return OnnxBackend(model, tokenizer, model_name)
+    raise ValueError(f"Unknown sentiment backend '{name}' (expected one of {', '.join(BACKENDS)})")
+
+
+def select_backend(name, model, tokenizer, model_name, check=True):
+    """
+    Load the requested backend, falling back to PyTorch when it fails to load or
+    (with check=True) disagrees with the PyTorch reference on the fixture corpus
+    """
+    reference = TorchBackend(model)
+    if name == 'pytorch':
+        return reference
+
+    try:
+        backend = load_backend(name, model, tokenizer, model_name)
+        if check:
+            result = agreement_check(backend, reference, tokenizer, load_corpus())
+            print(f"🔎 Backend agreement check: {result}")
+            if result['agreement'] < MIN_AGREEMENT:
+                print(f"⚠️ Backend '{name}' agreement below {MIN_AGREEMENT}, using pytorch")
+                return reference
+        return backend
+    except Exception as e:
+        print(f"⚠️ Could not load sentiment backend '{name}', using pytorch: {e}")
+        return reference
+
+
+def load_corpus(path=AGREEMENT_CORPUS_PATH):
+    with open(path) as f:
+        return json.load(f)['texts']
+
+
+def agreement_check(backend, reference, tokenizer, texts):
+    """Compare a backend's labels and probabilities with the reference backend"""
+    inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True, max_length=512)
+    expected = reference.predict_proba(inputs)
+    actual = backend.predict_proba(inputs)
+
+    matches = (expected.argmax(dim=-1) == actual.argmax(dim=-1)).sum().item()
+    return {
+        'backend': backend.name,
+        'agreement': round(matches / len(texts), 4),
+        'max_abs_prob_diff': round((expected - actual).abs().max().item(), 5),
+        'texts': len(texts)
+    }
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def benchmark(backend, tokenizer, texts, batch_size, repeats):
+    """Latency of predict_proba over the corpus split into batches"""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    encoded = [tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=512) for batch in batches]
+
+    backend.predict_proba(encoded[0])  # warm-up
+    timings = []
+    for _ in range(repeats):
+        for inputs in encoded:
+            started = time.perf_counter()
+            backend.predict_proba(inputs)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    return {
+        'backend': backend.name,
+        'batch_size': batch_size,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[max(0, int(len(timings) * 0.95) - 1)], 2),
+        'texts_per_second': round(len(texts) * repeats / (sum(timings) / 1000), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export, check and benchmark sentiment inference backends')
+    parser.add_argument('command', choices=['export', 'check', 'bench'])
+    parser.add_argument('--model', default=os.getenv('SENTIMENT_MODEL_PATH', 'cardiffnlp/twitter-roberta-base-sentiment-latest'))
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    parser.add_argument('--corpus', default=AGREEMENT_CORPUS_PATH)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model)
+    model.eval()
+
+    if args.command == 'export':
+        export_onnx(model, tokenizer, onnx_path(model, args.model))
+        return 0
+
+    texts = load_corpus(args.corpus)
+    reference = TorchBackend(model)
+    failed = False
+
+    for name in args.backends.split(','):
+        before = rss_mb()
+        started = time.perf_counter()
+        backend = load_backend(name, model, tokenizer, args.model)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        if args.command == 'check':
+            result = agreement_check(backend, reference, tokenizer, texts)
+            failed = failed or result['agreement'] < MIN_AGREEMENT
+        else:
+            result = benchmark(backend, tokenizer, texts, args.batch_size, args.repeats)
+            result['load_ms'] = round(load_ms, 1)
+            result['rss_delta_mb'] = round(rss_mb() - before, 1)
+
+        print(json.dumps(result))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Asynchronous verification jobs
+
+POST /verify_ngo with "async": true stores a job and returns its ID at once.
+Jobs run on a small bounded worker pool; their state and result can be polled
+at GET /jobs/<id>, and when the request gave a callback_url the finished job is
+POSTed there as well.
+
+Jobs are kept in SQLite (the verification cache file by default), so they
+survive a worker restart: when a worker starts it picks up jobs that were still
+queued, and jobs whose worker died while running them.
+"""
+
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+
+from http_client import outbound
+from verification_cache import CACHE_PATH
+
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', CACHE_PATH)
+JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', 2))
+JOB_MAX_QUEUED = int(os.getenv('JOB_MAX_QUEUED', 500))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 600))
+JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', 7 * 24 * 60 * 60))
+JOB_CALLBACK_TIMEOUT = float(os.getenv('JOB_CALLBACK_TIMEOUT', 10))
+JOB_CALLBACK_RETRIES = int(os.getenv('JOB_CALLBACK_RETRIES', 3))
+# Comma-separated hosts callbacks may go to. Unset, any host is accepted as long
+# as it resolves only to public addresses; listed hosts may be internal.
+JOB_CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.getenv('JOB_CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()
+}
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+def validate_callback_url(url, allowed_hosts=None):
+    """Return a usable callback URL (or None), raising ValueError for bad ones"""
+    if url is None or url == '':
+        return None
+    if not isinstance(url, str):
+        raise ValueError('callback_url must be a string')
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError('callback_url must be an http(s) URL')
+    check_callback_host(parsed.hostname, allowed_hosts)
+    return url
+
+
+def check_callback_host(host, allowed_hosts=None):
+    """
+    Raise ValueError unless callbacks may be sent to host
+
+    With an allowlist only the listed hosts pass. Otherwise every address the
+    host resolves to must be public, so a callback cannot reach loopback,
+    private, link-local (cloud metadata) or reserved addresses. Callbacks are
+    checked again right before they are sent, as DNS may have changed since.
+    """
+    allowed_hosts = JOB_CALLBACK_ALLOWED_HOSTS if allowed_hosts is None else allowed_hosts
+    host = host.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError(f"callback_url host {host} is not in JOB_CALLBACK_ALLOWED_HOSTS")
+        return
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"callback_url host {host} does not resolve")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%', 1)[0])  # drop an IPv6 zone
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"callback_url host {host} resolves to a non-public address")
+
+
+def iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+def process_alive(pid):
+    """True when a process with this pid exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed job table for one engine"""
+
+    def __init__(self, namespace, path=JOB_STORE_PATH, max_queued=JOB_MAX_QUEUED,
+                 lease_seconds=JOB_LEASE_SECONDS, retention=JOB_RETENTION_SECONDS):
+        self.namespace = namespace
+        self.path = path
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.retention = retention
+        self.host = socket.gethostname()
+        self._local = threading.local()
+
+    def _connect(self):
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    ngo_name TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    callback_url TEXT,
+                    callback_status TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    owner_host TEXT,
+                    owner_pid INTEGER,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (namespace, status)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, ngo_name, params=None, callback_url=None):
+        """Store a new queued job and return its public view"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (now - self.retention,)
+        )
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE namespace = ? AND status IN ('queued', 'running')",
+            (self.namespace,)
+        ).fetchone()[0]
+        if pending >= self.max_queued:
+            raise JobQueueFull(f"{pending} verification jobs are already pending")
+
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            'INSERT INTO jobs (id, namespace, ngo_name, params, status, callback_url, created_at) '
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, self.namespace, ngo_name, json.dumps(params or {}), callback_url, now)
+        )
+        return self.get(job_id)
+
+    def claim(self, job_id):
+        """Atomically mark a queued job as running in this process; returns the job row or None"""
+        conn = self._connect()
+        now = time.time()
+        claimed = conn.execute(
+            "UPDATE jobs SET status = 'running', owner_host = ?, owner_pid = ?, lease_until = ?, "
+            'started_at = ?, attempts = attempts + 1 '
+            "WHERE id = ? AND status = 'queued'",
+            (self.host, os.getpid(), now + self.lease_seconds, now, job_id)
+        ).rowcount
+        if not claimed:
+            return None
+        row = conn.execute('SELECT ngo_name, params, callback_url FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return {'job_id': job_id, 'ngo_name': row[0], 'params': json.loads(row[1]), 'callback_url': row[2]}
+
+    def finish(self, job_id, result=None, error=None):
+        """Record the outcome of a job"""
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?',
+            ('failed' if error is not None else 'done',
+             None if result is None else json.dumps(result),
+             None if error is None else str(error),
+             time.time(), job_id)
+        )
+
+    def set_callback_status(self, job_id, status):
+        self._connect().execute('UPDATE jobs SET callback_status = ? WHERE id = ?', (status, job_id))
+
+    def get(self, job_id):
+        """Public view of a job (what GET /jobs/<id> returns), or None"""
+        row = self._connect().execute(
+            'SELECT id, ngo_name, status, result, error, callback_url, callback_status, attempts, '
+            'created_at, started_at, finished_at FROM jobs WHERE id = ? AND namespace = ?',
+            (job_id, self.namespace)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row[0],
+            'ngo_name': row[1],
+            'status': row[2],
+            'attempts': row[7],
+            'created_at': iso_time(row[8]),
+            'started_at': iso_time(row[9]),
+            'finished_at': iso_time(row[10])
+        }
+        if row[3] is not None:
+            job['result'] = json.loads(row[3])
+        if row[4] is not None:
+            job['error'] = row[4]
+        if row[5]:
+            job['callback'] = {'url': row[5], 'status': row[6] or 'pending'}
+        return job
+
+    def recover(self, max_attempts=JOB_MAX_ATTEMPTS):
+        """
+        Requeue jobs left behind by a dead worker and return the IDs of all queued jobs
+
+        A running job is orphaned when its worker process on this host is gone or
+        its lease has run out. Jobs that already used max_attempts are failed
+        instead of being retried again.
+        """
+        conn = self._connect()
+        now = time.time()
+        running = conn.execute(
+            "SELECT id, owner_host, owner_pid, lease_until, attempts FROM jobs WHERE namespace = ? AND status = 'running'",
+            (self.namespace,)
+        ).fetchall()
+
+        for job_id, owner_host, owner_pid, lease_until, attempts in running:
+            owner_dead = owner_host == self.host and owner_pid is not None and not process_alive(owner_pid)
+            if not owner_dead and (lease_until or 0) > now:
+                continue
+            if attempts >= max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                    (f"Abandoned after {attempts} interrupted attempts", now, job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', owner_pid = NULL, lease_until = NULL "
+                    "WHERE id = ? AND status = 'running' AND owner_pid IS ?",
+                    (job_id, owner_pid)
+                )
+
+        return [row[0] for row in conn.execute(
+            "SELECT id FROM jobs WHERE namespace = ? AND status = 'queued' ORDER BY created_at",
+            (self.namespace,)
+        ).fetchall()]
+
+    def stats(self):
+        try:
+            counts = dict(self._connect().execute(
+                'SELECT status, COUNT(*) FROM jobs WHERE namespace = ? GROUP BY status',
+                (self.namespace,)
+            ).fetchall())
+        except sqlite3.Error as e:
+            print(f"⚠️ Job store error: {e}")
+            return {'error': str(e)}
+        return {status: counts.get(status, 0) for status in ('queued', 'running', 'done', 'failed')}
+
+
+def send_callback(url, job, timeout=JOB_CALLBACK_TIMEOUT, retries=JOB_CALLBACK_RETRIES):
+    """
+    POST a finished job to its callback URL; returns a status string
+
+    Makes up to retries attempts: 429, 5xx and connection errors are retried
+    with backoff (http_client.py); other answers mean the receiver rejected it.
+    Redirects are not followed, as they could point anywhere.
+    """
+    try:
+        check_callback_host(urlparse(url).hostname)
+    except ValueError as e:
+        return f"refused: {e}"
+    try:
+        response = outbound.post(
+            url, json=job, timeout=timeout, headers={'X-Job-Id': job['job_id']},
+            retries=retries - 1, retry_errors=True, allow_redirects=False
+        )
+    except requests.RequestException as e:
+        return f"failed: {type(e).__name__}"
+    return 'delivered' if response.ok else f"failed: HTTP {response.status_code}"
+
+
+class JobRunner:
+    """Runs stored jobs on a bounded thread pool with run_job(ngo_name, params) -> result"""
+
+    def __init__(self, store, run_job, max_workers=JOB_MAX_WORKERS):
+        self.store = store
+        self.run_job = run_job
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """
+        Create the worker pool in this process and pick up queued or orphaned jobs
+
+        Called from gunicorn's post_fork and lazily on first use, never in the
+        preloading master, which must not run jobs itself.
+        """
+        if self._executor is not None and self._executor_pid == os.getpid():
+            return
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            self._executor_pid = os.getpid()
+
+        try:
+            recovered = self.store.recover()
+        except sqlite3.Error as e:
+            print(f"⚠️ Job recovery failed: {e}")
+            return
+        if recovered:
+            print(f"♻️ Resuming {len(recovered)} queued verification job(s)")
+        for job_id in recovered:
+            self._executor.submit(self._execute, job_id)
+
+    def submit(self, ngo_name, params=None, callback_url=None):
+        """Store a job, schedule it and return its public view"""
+        self.ensure_started()
+        job = self.store.create(ngo_name, params, callback_url)
+        self._executor.submit(self._execute, job['job_id'])
+        return job
+
+    def _execute(self, job_id):
+        job = self.store.claim(job_id)
+        if job is None:
+            return  # already taken by another worker
+
+        print(f"🧾 Job {job_id} started for {job['ngo_name']}")
+        try:
+            self.store.finish(job_id, result=self.run_job(job['ngo_name'], job['params']))
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            self.store.finish(job_id, error=e)
+
+        if job['callback_url']:
+            self.store.set_callback_status(job_id, send_callback(job['callback_url'], self.store.get(job_id)))
@@ -0,0 +1,103 @@
+"""
+Compiled keyword lexicons for app_simple.py
+
+All terms of a LexiconMatcher are compiled into a single regular expression
+shaped like a trie (terms sharing a prefix share a branch), so a text is scanned
+once no matter how many terms the lexicons hold. Terms only match whole words:
+"ngo" no longer matches inside "mongo". A trailing * in a term matches any word
+ending ("help*" matches help, helping and helpers).
+
+The lexicons live in lexicons.json (LEXICON_PATH) and are loaded once at import.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+
+LEXICON_PATH = os.getenv('LEXICON_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons.json'))
+
+WILDCARD = '*'
+END = ''
+
+
+def load_lexicons(path=LEXICON_PATH):
+    """Load {category: [terms]} from a JSON file, ignoring keys starting with _"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {category: terms for category, terms in data.items() if not category.startswith('_')}
+
+
+def _trie_pattern(node):
+    """Regex source matching every term stored below a trie node"""
+    if WILDCARD in node:
+        return r'\w*'  # covers the exact term and every longer one
+
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != END]
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if END in node:
+        pattern = '(?:' + pattern + ')?'
+    return pattern
+
+
+class LexiconMatcher:
+    """Counts whole-word occurrences of every lexicon term in a single pass"""
+
+    def __init__(self, lexicons):
+        self.categories = list(lexicons)
+        self.exact = {}      # term -> categories it belongs to
+        self.prefixes = {}   # wildcard prefix -> categories
+        trie = {}
+
+        for category, terms in lexicons.items():
+            for term in terms:
+                term = term.strip().lower()
+                is_prefix = term.endswith(WILDCARD)
+                term = term.rstrip(WILDCARD)
+                if not term:
+                    continue
+
+                target = self.prefixes if is_prefix else self.exact
+                target.setdefault(term, [])
+                if category not in target[term]:
+                    target[term].append(category)
+
+                node = trie
+                for char in term:
+                    node = node.setdefault(char, {})
+                node[WILDCARD if is_prefix else END] = {}
+
+        self.pattern = re.compile(r'\b' + _trie_pattern(trie) + r'\b', re.IGNORECASE) if trie else None
+
+    def _resolve(self, word):
+        """Return (term, categories) for a matched word"""
+        if word in self.exact:
+            return word, self.exact[word]
+        for length in range(len(word), 0, -1):
+            prefix = word[:length]
+            if prefix in self.prefixes:
+                return prefix + WILDCARD, self.prefixes[prefix]
+        return word, []
+
+    def count(self, text):
+        """Return {category: {term: occurrences}} for every term found in text"""
+        if self.pattern is None or not text:
+            return {category: {} for category in self.categories}
+
+        counts = {category: Counter() for category in self.categories}
+        words = Counter(match.lower() for match in self.pattern.findall(text))
+        for word, occurrences in words.items():
+            term, categories = self._resolve(word)
+            for category in categories:
+                counts[category][term] += occurrences
+        return {category: dict(terms) for category, terms in counts.items()}
+
+    def matches_any(self, text, category=None):
+        """True when text contains a term (of the given category, if any)"""
+        if self.pattern is None or not text:
+            return False
+        if category is None:
+            return self.pattern.search(text) is not None
+        return any(category in self._resolve(match.lower())[1] for match in self.pattern.findall(text))
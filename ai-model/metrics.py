@@ -0,0 +1,102 @@
+"""
+Prometheus metrics for the NGO verification services
+
+Under gunicorn every worker is a separate process, so metrics are collected in
+prometheus_client's multiprocess mode whenever PROMETHEUS_MULTIPROC_DIR is set
+(gunicorn.conf.py sets it up): each worker writes its samples to mmap-ed files
+in that directory and /metrics aggregates them. Without it (python app.py)
+the default in-process registry is used.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+INFERENCE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+STAGE_SECONDS = Histogram(
+    'ngo_verification_stage_seconds',
+    'Time spent in each stage of the verification pipeline',
+    ['engine', 'stage'],
+    buckets=STAGE_BUCKETS
+)
+VERIFICATIONS = Counter(
+    'ngo_verifications_total',
+    'Verification requests by outcome (computed, cached, coalesced, error)',
+    ['engine', 'outcome']
+)
+IN_FLIGHT = Gauge(
+    'ngo_verifications_in_flight',
+    'Verifications currently running',
+    ['engine'],
+    multiprocess_mode='livesum'
+)
+LINK_FETCHES = Counter(
+    'ngo_link_fetches_total',
+    'Page fetches and domain probes by outcome (ok, cached, not_modified, timeout, http_error, connection_error, rate_limited, robots_disallowed, parse_error, skipped)',
+    ['engine', 'outcome']
+)
+OUTBOUND_RETRIES = Counter(
+    'ngo_outbound_retries_total',
+    'Outbound requests retried after a 429, 5xx or connection error, by reason (status code or error)',
+    ['reason']
+)
+BYTES_DOWNLOADED = Counter(
+    'ngo_bytes_downloaded_total',
+    'Response body bytes downloaded while scraping',
+    ['engine']
+)
+SEARCH_QUERIES = Counter(
+    'ngo_search_queries_total',
+    'DuckDuckGo queries by outcome (ok, empty, rate_limited, error)',
+    ['engine', 'outcome']
+)
+INFERENCE_SECONDS = Histogram(
+    'ngo_model_inference_seconds',
+    'Sentiment model forward pass time',
+    ['mode'],
+    buckets=INFERENCE_BUCKETS
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    'ngo_model_batch_size',
+    'Texts or windows per sentiment forward pass',
+    ['mode'],
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+
+def stage_timer(engine, stage):
+    """Context manager observing the duration of one pipeline stage"""
+    return STAGE_SECONDS.labels(engine=engine, stage=stage).time()
+
+
+def fetch_outcome(error):
+    """Classify a requests/httpx exception raised while fetching a link"""
+    name = type(error).__name__.lower()
+    if 'timeout' in name:
+        return 'timeout'
+    if 'ratelimit' in name:
+        return 'rate_limited'
+    if 'robots' in name:
+        return 'robots_disallowed'
+    if 'http' in name and 'status' in name:
+        return 'http_error'
+    return 'connection_error'
+
+
+def render_metrics():
+    """Return (body, content_type) for the /metrics endpoint"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,198 @@
+"""
+Canonical NGO names
+
+Every NGO whose verification was cached is recorded here under its canonical
+key (verification_cache.ngo_name_key), with the name and registration ID it
+was verified with. A new submission is resolved against these records before
+the pipeline runs:
+
+- exact: its canonical key is already recorded ("The Akshaya Patra
+  Foundation" and "akshaya patra foundation" share the key "akshaya patra
+  foundation"; "Akshaya Patra Trust" does not)
+- fuzzy: its key is close to a recorded one ("Akshya Patra Foundation"),
+  measured as the Dice similarity of their character trigram sets, which must
+  reach NAME_MATCH_THRESHOLD
+- new: nothing close enough
+
+The caller verifies (or reads the cache for) the name resolve() returns: the
+record's name on an exact match, so spellings of one key share a cached result
+and pipeline run, and otherwise the submission itself, which becomes its own
+record once verified. A close name may well belong to a different NGO, so a
+fuzzy match only reuses the record when it is a near-duplicate: similarity of
+at least NAME_REUSE_THRESHOLD, the same legal suffix and the same registration
+ID (or none on either side). Otherwise the record is only returned as a
+suggestion. Records live in SQLite next to the cache so all workers share them;
+each worker keeps a trigram index of them in memory and reads only records
+added since its last lookup.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from verification_cache import CACHE_PATH, legal_suffix, ngo_name_key, normalize_registration_id
+
+NAME_INDEX_PATH = os.getenv('NAME_INDEX_PATH', CACHE_PATH)
+NAME_MATCH_THRESHOLD = float(os.getenv('NAME_MATCH_THRESHOLD', 0.8))
+# A fuzzy match this close (with the same legal suffix and registration ID) reuses the record
+NAME_REUSE_THRESHOLD = float(os.getenv('NAME_REUSE_THRESHOLD', 0.88))
+# Shorter keys only match exactly; a typo changes too large a share of their trigrams
+NAME_MATCH_MIN_LENGTH = int(os.getenv('NAME_MATCH_MIN_LENGTH', 6))
+
+
+def trigrams(key):
+    """Character trigrams of a canonical key, padded so word starts and ends count"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Verified NGO names by canonical key, with trigram lookup of near-duplicates"""
+
+    def __init__(self, namespace, path=NAME_INDEX_PATH, threshold=NAME_MATCH_THRESHOLD,
+                 min_length=NAME_MATCH_MIN_LENGTH, reuse_threshold=NAME_REUSE_THRESHOLD):
+        self.namespace = namespace
+        self.path = path
+        self.threshold = threshold
+        self.reuse_threshold = reuse_threshold
+        self.min_length = min_length
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self.keys = []            # canonical key per record
+        self.names = []           # verified name per record
+        self.ids = []             # normalized registration ID per record ('' if none was given)
+        self.sizes = []           # trigram count per record
+        self.records = {}         # canonical key -> record number
+        self.postings = {}        # trigram -> record numbers
+        self.last_rowid = 0
+        self.matches = Counter()
+
+    def _connect(self):
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            # Replaces the ngo_names table, whose keys dropped the legal suffix
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS verified_names (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    ngo_name TEXT NOT NULL,
+                    registration_id TEXT NOT NULL DEFAULT '',
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _load(self):
+        """Index the records other workers (or this one) added since the last call"""
+        if self._pid != os.getpid():
+            self._reset()
+            self._pid = os.getpid()
+        rows = self._connect().execute(
+            'SELECT rowid, key, ngo_name, registration_id FROM verified_names '
+            'WHERE namespace = ? AND rowid > ? ORDER BY rowid',
+            (self.namespace, self.last_rowid)
+        ).fetchall()
+        for rowid, key, ngo_name, registration_id in rows:
+            self.last_rowid = rowid
+            if key in self.records:
+                continue
+            record = len(self.keys)
+            grams = trigrams(key)
+            self.keys.append(key)
+            self.names.append(ngo_name)
+            self.ids.append(registration_id)
+            self.sizes.append(len(grams))
+            self.records[key] = record
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(record)
+
+    def _closest(self, key):
+        """(record, similarity) of the recorded key most similar to key, or (None, 0.0)"""
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        best, best_similarity = None, 0.0
+        for record, count in shared.items():
+            similarity = 2 * count / (len(grams) + self.sizes[record])
+            if similarity > best_similarity:
+                best, best_similarity = record, similarity
+        return best, best_similarity
+
+    def resolve(self, ngo_name, registration_id=None):
+        """
+        Which recorded NGO a submitted name refers to
+
+        Returns {"name", "key", "match", "similarity"}: name and key are what to
+        verify, the recorded ones on an exact match or a reused fuzzy match and
+        the submission's otherwise. A fuzzy match adds "suggestion", the recorded
+        name it is close to (similarity is theirs), and "reused".
+        """
+        key = ngo_name_key(ngo_name)
+        try:
+            with self._lock:
+                self._load()
+                record = self.records.get(key)
+                similarity = 1.0
+                if record is None and len(key) >= self.min_length:
+                    record, similarity = self._closest(key)
+                    if similarity < self.threshold:
+                        record = None
+                if record is None:
+                    match = {'name': ngo_name, 'key': key, 'match': 'new', 'similarity': 1.0}
+                elif self.keys[record] == key:
+                    match = {'name': self.names[record], 'key': key, 'match': 'exact', 'similarity': 1.0}
+                else:
+                    reused = (
+                        similarity >= self.reuse_threshold
+                        and legal_suffix(key) == legal_suffix(self.keys[record])
+                        and normalize_registration_id(registration_id) == self.ids[record]
+                    )
+                    match = {
+                        'name': self.names[record] if reused else ngo_name,
+                        'key': self.keys[record] if reused else key,
+                        'match': 'fuzzy',
+                        'similarity': round(similarity, 3),
+                        'suggestion': self.names[record],
+                        'reused': reused
+                    }
+                    if reused:
+                        self.matches['reused'] += 1
+                self.matches[match['match']] += 1
+        except sqlite3.Error as e:
+            print(f"⚠️ Name index error: {e}")
+            match = {'name': ngo_name, 'key': key, 'match': 'new', 'similarity': 1.0}
+        return match
+
+    def add(self, ngo_name, registration_id=None):
+        """Record a verified NGO (the first name verified for a key stays its name)"""
+        key = ngo_name_key(ngo_name)
+        if not key:
+            return
+        try:
+            self._connect().execute(
+                'INSERT OR IGNORE INTO verified_names (namespace, key, ngo_name, registration_id, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (self.namespace, key, ngo_name, normalize_registration_id(registration_id), time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Name index write error: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {'names': len(self.keys), 'threshold': self.threshold, 'reuse_threshold': self.reuse_threshold, **{
+                match: self.matches[match] for match in ('exact', 'fuzzy', 'reused', 'new')
+            }}
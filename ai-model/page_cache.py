@@ -0,0 +1,155 @@
+"""
+URL-level cache of fetched pages with conditional GET revalidation
+
+Stores what the pipeline kept from each URL (the extracted text, or just the
+status for domain probes) together with the ETag / Last-Modified validators the
+server sent. Within the freshness window an entry is used as is; after that the
+URL is requested again with If-None-Match / If-Modified-Since, and a 304 only
+refreshes the entry. Failed URLs are remembered for a shorter window. Entries
+are evicted least recently used first once the cache outgrows its size limit.
+
+Lives in the same SQLite file as the verification cache by default, in its own
+table, so all workers share it.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from verification_cache import CACHE_PATH
+
+PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH', CACHE_PATH)
+PAGE_CACHE_FRESH_SECONDS = int(os.getenv('PAGE_CACHE_FRESH_SECONDS', 6 * 60 * 60))
+PAGE_CACHE_NEGATIVE_SECONDS = int(os.getenv('PAGE_CACHE_NEGATIVE_SECONDS', 60 * 60))
+PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+
+CachedPage = namedtuple('CachedPage', ['text', 'status', 'etag', 'last_modified', 'age', 'fresh'])
+
+
+class PageCache:
+    """SQLite-backed cache of per-URL results with HTTP validators"""
+
+    def __init__(self, namespace, path=PAGE_CACHE_PATH, fresh_seconds=PAGE_CACHE_FRESH_SECONDS,
+                 negative_seconds=PAGE_CACHE_NEGATIVE_SECONDS, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.namespace = namespace
+        self.path = path
+        self.fresh_seconds = fresh_seconds
+        self.negative_seconds = negative_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connect(self):
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    validated_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, url):
+        return f"{self.namespace}:{url}"
+
+    def _window(self, status):
+        return self.fresh_seconds if 200 <= status < 400 else self.negative_seconds
+
+    def get(self, url):
+        """Return the CachedPage for url (fresh or in need of revalidation), or None"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT text, status, etag, last_modified, validated_at FROM pages WHERE key = ?',
+                (self._key(url),)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE pages SET accessed_at = ? WHERE key = ?', (now, self._key(url)))
+        except sqlite3.Error as e:
+            print(f"⚠️ Page cache read error: {e}")
+            return None
+
+        text, status, etag, last_modified, validated_at = row
+        age = now - validated_at
+        return CachedPage(text, status, etag, last_modified, age, age < self._window(status))
+
+    def put(self, url, text='', status=200, etag=None, last_modified=None):
+        """Store the result of a full fetch and evict least recently used entries"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO pages '
+                '(key, text, status, etag, last_modified, size, validated_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (self._key(url), text, status, etag, last_modified,
+                 len(text.encode('utf-8')) + len(url), now, now)
+            )
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            conn.execute(
+                'DELETE FROM pages WHERE key IN ('
+                'SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS total FROM pages) '
+                'WHERE total > ?)',
+                (self.max_bytes,)
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Page cache write error: {e}")
+
+    def revalidated(self, url):
+        """Mark an entry fresh again after the server answered 304 Not Modified"""
+        try:
+            self._connect().execute('UPDATE pages SET validated_at = ? WHERE key = ?', (time.time(), self._key(url)))
+        except sqlite3.Error as e:
+            print(f"⚠️ Page cache write error: {e}")
+
+    def stats(self):
+        try:
+            entries, size = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages WHERE key LIKE ?',
+                (f"{self.namespace}:%",)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Page cache stats error: {e}")
+            return {'error': str(e)}
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'fresh_seconds': self.fresh_seconds
+        }
+
+
+def conditional_headers(cached):
+    """If-None-Match / If-Modified-Since headers for revalidating a cached entry"""
+    headers = {}
+    if cached is None or not 200 <= cached.status < 400:
+        return headers
+    if cached.etag:
+        headers['If-None-Match'] = cached.etag
+    if cached.last_modified:
+        headers['If-Modified-Since'] = cached.last_modified
+    return headers
+
+
+def is_cacheable(headers):
+    """False when the server asked for the response not to be stored"""
+    return 'no-store' not in (headers.get('Cache-Control') or '').lower()
@@ -0,0 +1,566 @@
+"""
+Cause recommendations for /predict
+
+Ranks causes for a volunteer from their interests, skills and location. Every
+cause is turned into a unit-length TF-IDF vector over the words of its title,
+description, category, impact area and required skills, stored as per-term
+postings (the documents containing each term, with their weights). A profile
+only touches the postings of its own few terms, so a request costs about the
+same for ten causes or ten thousand:
+
+    score = interests * cosine(interest terms, cause)
+          + category  * (cause category is one of the interests)
+          + skills    * cosine(skill terms, cause)
+          + distance  * exp(-km / PREDICT_DISTANCE_SCALE_KM)
+
+Distances are computed with a vectorized haversine and the top-k causes are
+picked with a partial sort (np.argpartition) before only those are ordered.
+A filter can restrict ranking to causes within maxDistanceKm of the volunteer
+or to their nearest causes; those are found with the matrix's spatial index
+(geo_index.py), and only the causes left are scored.
+
+With the embedding matcher (PREDICT_MATCHER=embedding or "matcher":
+"embedding" in the request, see embeddings.py) the two cosines are taken
+between sentence embeddings of the profile phrases and of the cause texts
+instead of their TF-IDF vectors.
+Causes accept both the /predict shape ({"id", "title", "location": {"lat",
+"lng"}, "requiredSkills"}) and the catalog shape of causes.json ({"id", "name",
+"lat", "lng"}).
+"""
+
+import math
+import os
+import re
+import time
+
+import numpy as np
+
+from embeddings import get_encoder
+from geo_index import GeoIndex, haversine_km
+
+PREDICT_TOP_K = int(os.getenv('PREDICT_TOP_K', 10))
+PREDICT_MAX_CAUSES = int(os.getenv('PREDICT_MAX_CAUSES', 20000))
+PREDICT_DISTANCE_SCALE_KM = float(os.getenv('PREDICT_DISTANCE_SCALE_KM', 25))
+PREDICT_MATCHER = os.getenv('PREDICT_MATCHER', 'tfidf')
+# Embedding similarity from which a reason says a cause is close to the interests or skills
+PREDICT_SEMANTIC_REASON_MIN = float(os.getenv('PREDICT_SEMANTIC_REASON_MIN', 0.5))
+
+RECOMMENDATION_WEIGHTS = {
+    'interests': 0.35,  # times the cosine between interests and the cause text
+    'category': 0.20,   # cause category is one of the interests
+    'skills': 0.30,     # times the cosine between skills and the cause text
+    'distance': 0.15    # times exp(-km / PREDICT_DISTANCE_SCALE_KM); 0 without coordinates
+}
+
+CAUSE_FILTER_FIELDS = ('categories', 'ids', 'maxDistanceKm', 'nearest')
+MATCHERS = ('tfidf', 'embedding')
+# Rows per float16 -> float32 block when scoring embeddings
+EMBEDDING_SCORE_BLOCK = 1024
+
+TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lowercase word tokens; underscores and punctuation separate words"""
+    return TOKEN.findall(str(text).lower()) if text else []
+
+
+def terms_of(phrases):
+    """Tokens of a list of phrases (interests, skills)"""
+    return [token for phrase in phrases for token in tokenize(phrase)]
+
+
+def _phrases(values):
+    """Normalized list of interest or skill phrases from a request field"""
+    if isinstance(values, str):
+        values = [values]
+    return [str(value).strip().lower() for value in values or [] if str(value).strip()]
+
+
+def cause_fields(cause):
+    """(id, text, category, lat, lng) of a cause in either accepted shape"""
+    location = cause.get('location') if isinstance(cause.get('location'), dict) else cause
+    skills = cause.get('requiredSkills') or []
+    if isinstance(skills, str):
+        skills = [skills]
+    text = ' '.join(str(part) for part in [
+        cause.get('title') or cause.get('name') or '',
+        cause.get('description') or '',
+        cause.get('category') or '',
+        cause.get('impactArea') or '',
+        *skills
+    ])
+    return (
+        cause.get('id', cause.get('_id')),
+        text,
+        str(cause.get('category') or '').strip().lower(),
+        _coordinate(location.get('lat')),
+        _coordinate(location.get('lng', location.get('lon')))
+    )
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class CauseMatrix:
+    """
+    Cause TF-IDF vectors as term postings, plus categories and coordinates
+
+    Causes can be added, replaced and removed without re-tokenizing the others.
+    Every row keeps its (term, term frequency) entries in insertion order;
+    before the next query the live entries are weighted with the current IDF,
+    normalized and re-sorted by term into postings:
+    postings_docs[term_ptr[t]:term_ptr[t + 1]] are the rows containing term t
+    and postings_weights the matching entries of their unit-length vectors.
+    The weighted entries are also kept in row order (entries only ever go in
+    with rows appended at the end), so a small set of rows can be scored from
+    their own entries instead of the postings.
+    Removed rows are dropped once they make up a quarter of the matrix.
+
+    With an encoder, every row also has a float16 sentence embedding; a
+    replaced cause whose text did not change keeps its vector.
+    """
+
+    COMPACT_RATIO = 0.25
+
+    def __init__(self, causes=(), encoder=None):
+        self.ids = []                 # cause id per row
+        self.causes = []              # cause object per row, None once removed
+        self.rows = {}                # str(cause id) -> live row
+        self.vocabulary = {}          # term -> term id
+        self.category_codes = {}      # category -> code
+        self.alive = np.zeros(0, dtype=bool)
+        self.lats = np.zeros(0)
+        self.lngs = np.zeros(0)
+        self.categories = np.zeros(0, dtype=np.int32)
+        self.entry_rows = np.zeros(0, dtype=np.int32)
+        self.entry_terms = np.zeros(0, dtype=np.int32)
+        self.entry_tf = np.zeros(0)
+        self._postings = None
+        self._rows_entries = None
+        self._geo = None
+        self.encoder = encoder
+        self.embeddings = None if encoder is None else np.zeros((0, encoder.dimension), dtype=np.float16)
+        if causes:
+            self.upsert(causes)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def live_rows(self):
+        return np.flatnonzero(self.alive)
+
+    @property
+    def geo(self):
+        """Spatial index over the rows' coordinates, built on first use and then kept up to date"""
+        if self._geo is None:
+            self._geo = GeoIndex(self.lats, self.lngs)
+        return self._geo
+
+    def upsert(self, causes):
+        """Add causes, replacing live ones with the same id; returns the number stored"""
+        batch = {}
+        for cause in causes:
+            fields = cause_fields(cause)
+            # A cause without an id can't be replaced later, but is still ranked
+            batch[object() if fields[0] is None else str(fields[0])] = (cause, fields)
+        if not batch:
+            return 0
+        vectors = self._embed(batch) if self.embeddings is not None else None
+
+        replaced = [self.rows[key] for key in batch if key in self.rows]
+        if replaced:
+            self.alive[replaced] = False
+            for row in replaced:
+                self.causes[row] = None
+
+        first_row = len(self.ids)
+        new_causes = [cause for cause, _ in batch.values()]
+        ids, texts, categories, lats, lngs = zip(*(fields for _, fields in batch.values()))
+        for offset, key in enumerate(batch):
+            if isinstance(key, str):
+                self.rows[key] = first_row + offset
+        self.ids.extend(ids)
+        self.causes.extend(new_causes)
+        self.alive = np.concatenate([self.alive, np.ones(len(batch), dtype=bool)])
+        self.lats = np.concatenate([self.lats, np.array(lats, dtype=np.float64)])
+        self.lngs = np.concatenate([self.lngs, np.array(lngs, dtype=np.float64)])
+        if self._geo is not None:
+            self._geo.extend(lats, lngs)
+        if vectors is not None:
+            self.embeddings = np.concatenate([self.embeddings, vectors])
+        self.categories = np.concatenate([self.categories, np.array(
+            [self.category_codes.setdefault(category, len(self.category_codes)) for category in categories],
+            dtype=np.int32
+        )])
+
+        token_lists = [tokenize(text) for text in texts]
+        tokens = np.array([token for token_list in token_lists for token in token_list], dtype=str)
+        batch_terms, inverse = np.unique(tokens, return_inverse=True)
+        term_ids = np.array(
+            [self.vocabulary.setdefault(term, len(self.vocabulary)) for term in batch_terms.tolist()],
+            dtype=np.int64
+        )
+        doc_index = np.repeat(np.arange(len(token_lists)), [len(token_list) for token_list in token_lists])
+        # Count each (row, term) pair once
+        width = max(len(self.vocabulary), 1)
+        pairs, counts = np.unique(doc_index * width + term_ids[inverse], return_counts=True)
+        rows, terms = pairs // width, pairs % width
+        doc_lengths = np.bincount(doc_index, minlength=len(token_lists))
+
+        self.entry_rows = np.concatenate([self.entry_rows, (rows + first_row).astype(np.int32)])
+        self.entry_terms = np.concatenate([self.entry_terms, terms.astype(np.int32)])
+        self.entry_tf = np.concatenate([self.entry_tf, counts / doc_lengths[rows]])
+        self._changed()
+        return len(batch)
+
+    def _embed(self, batch):
+        """Embeddings of a batch of causes, reusing the vectors of live causes whose text is unchanged"""
+        vectors = np.zeros((len(batch), self.encoder.dimension), dtype=np.float16)
+        texts, missing = [], []
+        for i, (key, (_, fields)) in enumerate(batch.items()):
+            row = self.rows.get(key) if isinstance(key, str) else None
+            if row is not None and cause_fields(self.causes[row])[1] == fields[1]:
+                vectors[i] = self.embeddings[row]
+            else:
+                texts.append(fields[1])
+                missing.append(i)
+        if missing:
+            vectors[missing] = self.encoder.encode_texts(texts)
+        return vectors
+
+    def embed_all(self, encoder):
+        """Encode every cause with encoder (after a model change)"""
+        if not self.alive.all():
+            self.compact()
+        texts = [cause_fields(cause)[1] for cause in self.causes]
+        self.encoder = encoder
+        self.embeddings = encoder.encode(texts).astype(np.float16)
+
+    def delete(self, cause_ids):
+        """Remove causes by id; returns the number removed"""
+        removed = [self.rows.pop(str(cause_id)) for cause_id in cause_ids if str(cause_id) in self.rows]
+        if removed:
+            self.alive[removed] = False
+            for row in removed:
+                self.causes[row] = None
+            self._changed()
+        return len(removed)
+
+    def _changed(self):
+        self._postings = None
+        if len(self.alive) and 1 - self.alive.mean() > self.COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        """Drop removed rows and renumber the rest"""
+        keep = self.alive
+        new_row = np.cumsum(keep) - 1
+        live_entries = keep[self.entry_rows]
+        self.entry_rows = new_row[self.entry_rows[live_entries]].astype(np.int32)
+        self.entry_terms = self.entry_terms[live_entries]
+        self.entry_tf = self.entry_tf[live_entries]
+        self.ids = [cause_id for cause_id, live in zip(self.ids, keep) if live]
+        self.causes = [cause for cause, live in zip(self.causes, keep) if live]
+        self.lats, self.lngs, self.categories = self.lats[keep], self.lngs[keep], self.categories[keep]
+        if self.embeddings is not None:
+            self.embeddings = self.embeddings[keep]
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self.rows = {str(cause_id): row for row, cause_id in enumerate(self.ids) if cause_id is not None}
+        self._postings = None
+        self._geo = None
+
+    def _ensure_postings(self):
+        """(idf, postings_docs, postings_weights, term_ptr) for the live rows"""
+        if self._postings is not None:
+            return self._postings
+        terms_count = len(self.vocabulary)
+        live = self.alive[self.entry_rows]
+        rows, terms, tf = self.entry_rows[live], self.entry_terms[live], self.entry_tf[live]
+
+        doc_frequency = np.bincount(terms, minlength=terms_count).astype(np.float64)
+        idf = np.log((1 + int(self.alive.sum())) / (1 + doc_frequency)) + 1
+        weights = tf * idf[terms]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(self.alive)))
+        weights /= np.where(norms[rows] > 0, norms[rows], 1)
+
+        order = np.argsort(terms, kind='stable')
+        term_ptr = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=terms_count))]).astype(np.int64)
+        row_ptr = np.searchsorted(rows, np.arange(len(self.alive) + 1))
+        self._rows_entries = (terms, weights, row_ptr)
+        self._postings = (idf, rows[order], weights[order], term_ptr)
+        return self._postings
+
+    def cosine(self, terms, rows=None):
+        """
+        Cosine similarity of every row with a query made of terms (idf-weighted)
+
+        With rows, only those rows are scored (the others stay 0), from their own
+        entries when that touches fewer entries than the query terms' postings.
+        """
+        scores = np.zeros(len(self.alive))
+        term_ids = sorted({self.vocabulary[term] for term in terms if term in self.vocabulary})
+        if not term_ids:
+            return scores
+        idf, postings_docs, postings_weights, term_ptr = self._ensure_postings()
+        query_weights = idf[term_ids]
+        query_weights = query_weights / np.linalg.norm(query_weights)
+
+        if rows is not None:
+            entry_terms, entry_weights, row_ptr = self._rows_entries
+            starts = row_ptr[rows]
+            lengths = row_ptr[np.asarray(rows) + 1] - starts
+            postings_length = int((term_ptr[np.array(term_ids) + 1] - term_ptr[term_ids]).sum())
+            if lengths.sum() < postings_length:
+                query = np.zeros(len(idf))
+                query[term_ids] = query_weights
+                offsets = np.cumsum(lengths) - lengths
+                entries = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+                scores[rows] = np.bincount(
+                    np.repeat(np.arange(len(lengths)), lengths),
+                    weights=entry_weights[entries] * query[entry_terms[entries]],
+                    minlength=len(lengths)
+                )
+                return scores
+
+        for term_id, query_weight in zip(term_ids, query_weights):
+            start, end = term_ptr[term_id], term_ptr[term_id + 1]
+            # A row appears at most once in a term's postings
+            scores[postings_docs[start:end]] += postings_weights[start:end] * query_weight
+        return scores
+
+    def semantic(self, vector, rows=None):
+        """Embedding cosine of the live rows (or only rows) with a unit query vector, negatives clipped to 0"""
+        scores = np.zeros(len(self.alive))
+        rows = self.live_rows() if rows is None else np.asarray(rows)
+        for start in range(0, len(rows), EMBEDDING_SCORE_BLOCK):
+            block = rows[start:start + EMBEDDING_SCORE_BLOCK]
+            scores[block] = self.encoder.dot(self.embeddings[block], vector)
+        return np.clip(scores, 0, None)
+
+    def category_match(self, interests):
+        codes = [self.category_codes[interest] for interest in interests if interest in self.category_codes]
+        return np.isin(self.categories, codes).astype(np.float64)
+
+    def cause_terms(self, row):
+        """Distinct terms of one cause (for building a reason)"""
+        _, text, _, _, _ = cause_fields(self.causes[row])
+        return set(tokenize(text))
+
+
+def parse_profile(data):
+    """Validate the user part of a /predict request"""
+    if not data or not isinstance(data, dict):
+        raise ValueError('No data provided')
+    for field in ('interests', 'skills'):
+        values = data.get(field)
+        if values is not None and not isinstance(values, (list, str)):
+            raise ValueError(f"{field} must be a list of strings")
+
+    location = data.get('location') if isinstance(data.get('location'), dict) else {}
+    top_k = data.get('topK', PREDICT_TOP_K)
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k <= 0:
+        raise ValueError('topK must be a positive integer')
+    matcher = data.get('matcher', PREDICT_MATCHER)
+    if matcher not in MATCHERS:
+        raise ValueError(f"matcher must be one of: {', '.join(MATCHERS)}")
+    return {
+        'user_id': data.get('userId'),
+        'interests': _phrases(data.get('interests')),
+        'skills': _phrases(data.get('skills')),
+        'lat': _coordinate(location.get('lat')),
+        'lng': _coordinate(location.get('lng', location.get('lon'))),
+        'top_k': top_k,
+        'matcher': matcher
+    }
+
+
+def parse_cause_filter(value):
+    """Validate the optional /predict filter: {"categories", "ids", "maxDistanceKm", "nearest"}"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError('filter must be an object')
+    unknown = sorted(set(value) - set(CAUSE_FILTER_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown filter fields: {', '.join(unknown)}")
+    for field in ('categories', 'ids'):
+        if field in value and not isinstance(value[field], list):
+            raise ValueError(f"filter.{field} must be a list")
+    max_km = value.get('maxDistanceKm')
+    if max_km is not None and (isinstance(max_km, bool) or not isinstance(max_km, (int, float))
+                               or not math.isfinite(max_km) or max_km <= 0):
+        raise ValueError('filter.maxDistanceKm must be a positive number')
+    nearest = value.get('nearest')
+    if nearest is not None and (isinstance(nearest, bool) or not isinstance(nearest, int) or nearest <= 0):
+        raise ValueError('filter.nearest must be a positive integer')
+    return value
+
+
+def select_rows(matrix, profile, cause_filter):
+    """
+    Live rows of matrix passing a parsed filter
+
+    maxDistanceKm and nearest are answered by the spatial index, so only the
+    causes around the volunteer are looked at; causes without coordinates never
+    pass them.
+    """
+    mask = matrix.alive
+    categories = cause_filter.get('categories')
+    if categories is not None:
+        codes = [matrix.category_codes[c] for c in (str(c).strip().lower() for c in categories) if c in matrix.category_codes]
+        mask = mask & np.isin(matrix.categories, codes)
+    ids = cause_filter.get('ids')
+    if ids is not None:
+        wanted = np.zeros(len(mask), dtype=bool)
+        wanted[[matrix.rows[str(cause_id)] for cause_id in ids if str(cause_id) in matrix.rows]] = True
+        mask = mask & wanted
+
+    max_km, nearest = cause_filter.get('maxDistanceKm'), cause_filter.get('nearest')
+    if max_km is None and nearest is None:
+        return np.flatnonzero(mask)
+    if np.isnan(profile['lat']) or np.isnan(profile['lng']):
+        raise ValueError('filter.maxDistanceKm and filter.nearest need the user location')
+    if nearest is None:
+        rows, _ = matrix.geo.within(profile['lat'], profile['lng'], max_km, mask)
+    else:
+        rows, distances = matrix.geo.nearest(profile['lat'], profile['lng'], nearest, mask)
+        if max_km is not None:
+            rows = rows[distances <= max_km]
+    return np.sort(rows)
+
+
+def text_similarities(matrix, profile, rows=None):
+    """(interest, skill) similarities of the causes: embedding cosines with the embedding matcher, else TF-IDF"""
+    if profile['matcher'] != 'embedding':
+        return matrix.cosine(terms_of(profile['interests']), rows), matrix.cosine(terms_of(profile['skills']), rows)
+    if matrix.embeddings is None:
+        raise ValueError('The embedding matcher is not available for these causes')
+    similarities = []
+    for field in ('interests', 'skills'):
+        vector = matrix.encoder.encode_query(profile[field])
+        similarities.append(np.zeros(len(matrix.alive)) if vector is None else matrix.semantic(vector, rows))
+    return tuple(similarities)
+
+
+def score_causes(matrix, profile, rows=None, weights=RECOMMENDATION_WEIGHTS):
+    """
+    Vectorized scores of the causes in matrix
+
+    Returns (scores, distances_km, similarities), similarities being the
+    interest and skill components by name. With rows, only those causes are
+    scored and the other entries are left at 0 (NaN for distances).
+    """
+    interest_scores, skill_scores = text_similarities(matrix, profile, rows)
+    category_scores = matrix.category_match(profile['interests'])
+
+    distances = np.full(len(matrix.alive), np.nan)
+    if not (np.isnan(profile['lat']) or np.isnan(profile['lng'])):
+        subset = slice(None) if rows is None else rows
+        distances[subset] = haversine_km(profile['lat'], profile['lng'], matrix.lats[subset], matrix.lngs[subset])
+    distance_scores = np.nan_to_num(np.exp(-distances / PREDICT_DISTANCE_SCALE_KM), nan=0.0)
+
+    scores = (
+        weights['interests'] * interest_scores
+        + weights['category'] * category_scores
+        + weights['skills'] * skill_scores
+        + weights['distance'] * distance_scores
+    )
+    return scores, distances, {'interests': interest_scores, 'skills': skill_scores}
+
+
+def top_k(scores, k, rows):
+    """Indices of the k highest scores among rows, best first"""
+    candidates = np.asarray(rows, dtype=np.int64)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def build_reason(matrix, row, profile, distance_km, similarities=None):
+    """Human-readable explanation for one recommended cause"""
+    terms = matrix.cause_terms(row)
+    parts = []
+    category = matrix.causes[row].get('category')
+    if category and str(category).strip().lower() in profile['interests']:
+        parts.append(f"Matches your interest in {category}")
+    else:
+        interests = [i for i in profile['interests'] if set(tokenize(i)) & terms]
+        if interests:
+            parts.append(f"Related to your interest in {', '.join(interests)}")
+        elif semantic_match(profile, similarities, 'interests', row):
+            parts.append(f"Close to your interest in {', '.join(profile['interests'])}")
+    skills = [s for s in profile['skills'] if set(tokenize(s)) & terms]
+    if skills:
+        parts.append(f"Uses your skills: {', '.join(skills)}")
+    elif semantic_match(profile, similarities, 'skills', row):
+        parts.append(f"Close to your skills: {', '.join(profile['skills'])}")
+    if not np.isnan(distance_km):
+        parts.append(f"{distance_km:.1f} km from you")
+    return '; '.join(parts) or 'No direct match with your profile'
+
+
+def semantic_match(profile, similarities, field, row):
+    return (profile['matcher'] == 'embedding' and similarities is not None
+            and similarities[field][row] >= PREDICT_SEMANTIC_REASON_MIN)
+
+
+def rank(matrix, profile, rows=None, weights=RECOMMENDATION_WEIGHTS):
+    """Top-k recommendations of a profile over matrix (optionally only the given rows)"""
+    started = time.perf_counter()
+    scores, distances, similarities = score_causes(matrix, profile, rows, weights)
+    if rows is None:
+        rows = matrix.live_rows()
+    best = top_k(scores, profile['top_k'], rows)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    recommendations = []
+    for row in best:
+        recommendation = {
+            'causeId': matrix.ids[row],
+            'score': round(float(scores[row]), 4),
+            'reason': build_reason(matrix, row, profile, distances[row], similarities)
+        }
+        if not np.isnan(distances[row]):
+            recommendation['distanceKm'] = round(float(distances[row]), 2)
+        recommendations.append(recommendation)
+
+    return {
+        'success': True,
+        'userId': profile['user_id'],
+        'recommendations': recommendations,
+        'considered': len(rows),
+        'matcher': profile['matcher'],
+        'elapsed_ms': round(elapsed_ms, 2)
+    }
+
+
+def recommend(data, cause_index=None):
+    """
+    Handle a /predict request; raises ValueError for bad input
+
+    Requests without "causes" are ranked against the resident cause_index
+    (cause_index.py). Either way the causes can be narrowed by a "filter".
+    """
+    profile = parse_profile(data)
+    cause_filter = parse_cause_filter(data.get('filter'))
+    encoder = get_encoder() if profile['matcher'] == 'embedding' else None
+    if profile['matcher'] == 'embedding' and encoder is None:
+        if 'matcher' in data:
+            raise ValueError('The embedding matcher is not configured (EMBEDDING_MODEL_DIR)')
+        profile['matcher'] = 'tfidf'
+    causes = data.get('causes')
+    if causes is None and cause_index is not None:
+        return cause_index.recommend(profile, cause_filter)
+    if not isinstance(causes, list) or not causes:
+        raise ValueError('causes must be a non-empty list')
+    if len(causes) > PREDICT_MAX_CAUSES:
+        raise ValueError(f"At most {PREDICT_MAX_CAUSES} causes per request")
+    if not all(isinstance(cause, dict) for cause in causes):
+        raise ValueError('Every cause must be an object')
+    matrix = CauseMatrix(causes, encoder)
+    return rank(matrix, profile, select_rows(matrix, profile, cause_filter) if cause_filter else None)
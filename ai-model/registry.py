@@ -0,0 +1,337 @@
+"""
+Offline NGO registry lookup
+
+Loads a registry export (e.g. the NGO Darpan CSV, NGO_REGISTRY_PATH) so both
+engines can check an NGO against it without any network access. A match counts
+towards the trust score as "registry_match". A match on the registration ID
+(with the same name) confirms the NGO, and both engines then answer without
+any network access. A match on the canonical name alone is not proof on its
+own, as legal suffixes are dropped ("Helping Hands Trust" and "Helping Hands
+Society" share a key), so the web checks still run.
+
+The CSV is compiled once into a snapshot in NGO_REGISTRY_DIR:
+
+- name_hashes / name_rows: 64-bit hashes of the canonical names
+  (verification_cache.normalize_ngo_name), sorted, with the record each belongs to
+- id_hashes / id_rows: the same for registration IDs (Darpan unique ID and
+  registration number, ignoring case, spaces and punctuation)
+- records / offsets: every record as JSON, concatenated
+
+All of it is memory-mapped read-only, so a lookup is two binary searches over
+shared pages. Every NGO_REGISTRY_CHECK_SECONDS a lookup looks at the CSV; when
+it changed, a background thread of one worker rebuilds the snapshot and swaps
+current.json (lookups keep using the mapped snapshot meanwhile), and the others
+map the new one on their next lookup, so a new export is picked up without a
+restart. A replaced snapshot's files are only deleted once
+NGO_REGISTRY_SNAPSHOT_GRACE_SECONDS have passed, so a worker that read
+current.json just before the swap still finds them; should they be gone
+anyway, the worker retries with the newer snapshot.
+"""
+
+import csv
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from name_index import NAME_MATCH_THRESHOLD, trigrams
+from verification_cache import normalize_ngo_name, normalize_registration_id
+
+NGO_REGISTRY_PATH = os.getenv('NGO_REGISTRY_PATH')
+NGO_REGISTRY_DIR = os.getenv('NGO_REGISTRY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'registry_index'))
+NGO_REGISTRY_CHECK_SECONDS = float(os.getenv('NGO_REGISTRY_CHECK_SECONDS', 30))
+# Records returned for a name shared by several registered NGOs
+NGO_REGISTRY_MAX_MATCHES = int(os.getenv('NGO_REGISTRY_MAX_MATCHES', 5))
+NGO_REGISTRY_SNAPSHOT_GRACE_SECONDS = float(os.getenv('NGO_REGISTRY_SNAPSHOT_GRACE_SECONDS', 300))
+
+SNAPSHOT_ARRAYS = ('name_hashes', 'name_rows', 'id_hashes', 'id_rows', 'offsets', 'records')
+
+# Record field -> accepted CSV headers (compared lowercase, alphanumerics only)
+COLUMN_ALIASES = {
+    'name': ('nameofthevongo', 'ngoname', 'name', 'nameofngo', 'organisationname', 'organizationname'),
+    'darpan_id': ('uniqueidofvongo', 'darpanid', 'uniqueid', 'ngoid'),
+    'registration_no': ('registrationno', 'registrationnumber', 'regno'),
+    'registered_with': ('registeredwith', 'registrationauthority'),
+    'type': ('typeofngo', 'ngotype', 'type'),
+    'state': ('state', 'statename'),
+    'district': ('district', 'city'),
+}
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def read_registry_csv(path):
+    """Records of a registry CSV export, with the fields of COLUMN_ALIASES"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        headers = {re.sub(r'[^0-9a-z]', '', header.lower()): header for header in reader.fieldnames or []}
+        columns = {
+            field: next((headers[alias] for alias in aliases if alias in headers), None)
+            for field, aliases in COLUMN_ALIASES.items()
+        }
+        if columns['name'] is None:
+            raise ValueError(f"No NGO name column in {path} (headers: {', '.join(reader.fieldnames or [])})")
+        for row in reader:
+            record = {field: (row.get(column) or '').strip() for field, column in columns.items() if column}
+            if record['name']:
+                yield record
+
+
+def sorted_index(keys):
+    """(hashes, rows) sorted by hash for (key, row) pairs"""
+    hashes = np.array([key_hash(key) for key, _ in keys], dtype=np.uint64)
+    rows = np.array([row for _, row in keys], dtype=np.uint32)
+    order = np.argsort(hashes, kind='stable')
+    return hashes[order], rows[order]
+
+
+class Registry:
+    """Memory-mapped registry snapshot, rebuilt when the source CSV changes"""
+
+    def __init__(self, source_path=NGO_REGISTRY_PATH, directory=NGO_REGISTRY_DIR,
+                 check_seconds=NGO_REGISTRY_CHECK_SECONDS, snapshot_grace=NGO_REGISTRY_SNAPSHOT_GRACE_SECONDS):
+        self.source_path = source_path
+        self.directory = directory
+        self.check_seconds = check_seconds
+        self.snapshot_grace = snapshot_grace
+        self.current_path = os.path.join(directory, 'current.json')
+        self.meta = None
+        self.arrays = None
+        self._snapshot_id = None
+        self._checked_at = 0.0
+        self._builder = None
+        self._lock = threading.Lock()
+        if source_path:
+            self.refresh(force=True, background=False)
+
+    @property
+    def loaded(self):
+        return self.arrays is not None
+
+    def _source_signature(self):
+        stat = os.stat(self.source_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def refresh(self, force=False, background=True):
+        """
+        Map the newest snapshot, rebuilding it if the CSV changed (at most every check_seconds)
+
+        Lookups call this with background=True: the rebuild then runs on a
+        thread and the snapshot already mapped keeps answering until it is done.
+        """
+        now = time.monotonic()
+        if not self.source_path or (not force and now - self._checked_at < self.check_seconds):
+            return
+        self._checked_at = now
+        try:
+            meta = self._read_current()
+            if meta is None or meta.get('source_signature') != self._source_signature():
+                if not background:
+                    self._build()
+                elif self._builder is None or not self._builder.is_alive():
+                    self._builder = threading.Thread(target=self._build_and_map, name='registry-build', daemon=True)
+                    self._builder.start()
+            self._map_current()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ NGO registry unavailable: {e}")
+
+    def _build_and_map(self):
+        try:
+            self._build()
+            self._map_current()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ NGO registry rebuild failed: {e}")
+
+    def _map_current(self):
+        """
+        _map(), retried once
+
+        A snapshot whose files disappear while they are mapped has been replaced
+        in the meantime, so current.json then points to a newer one.
+        """
+        try:
+            self._map()
+        except OSError:
+            self._map()
+
+    def _read_current(self):
+        try:
+            with open(self.current_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _build(self):
+        """Compile the CSV into a new snapshot, unless another worker is already doing it"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'build.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # keep serving the current snapshot meanwhile
+            try:
+                signature = self._source_signature()
+                previous = self._read_current()
+                if previous is not None and previous.get('source_signature') == signature:
+                    return
+
+                started = time.perf_counter()
+                blobs, name_keys, id_keys = [], [], []
+                for row, record in enumerate(read_registry_csv(self.source_path)):
+                    record['key'] = normalize_ngo_name(record['name'])
+                    record['ids'] = sorted({
+                        normalize_registration_id(record.get(field)) for field in ('darpan_id', 'registration_no')
+                    } - {''})
+                    blobs.append(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+                    name_keys.append((record['key'], row))
+                    id_keys.extend((registration_id, row) for registration_id in record['ids'])
+
+                name_hashes, name_rows = sorted_index(name_keys)
+                id_hashes, id_rows = sorted_index(id_keys)
+                arrays = {
+                    'name_hashes': name_hashes, 'name_rows': name_rows,
+                    'id_hashes': id_hashes, 'id_rows': id_rows,
+                    'offsets': np.concatenate([[0], np.cumsum([len(blob) for blob in blobs])]).astype(np.uint64),
+                    'records': np.frombuffer(b''.join(blobs), dtype=np.uint8)
+                }
+                version = uuid.uuid4().hex
+                for name, array in arrays.items():
+                    np.save(os.path.join(self.directory, f"{name}.{version}.npy"), array)
+
+                meta = {
+                    'version': version,
+                    'source': os.path.abspath(self.source_path),
+                    'source_signature': signature,
+                    'records': len(blobs),
+                    'built_at': time.time()
+                }
+                temporary_path = f"{self.current_path}.{version}.tmp"
+                with open(temporary_path, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+                os.replace(temporary_path, self.current_path)
+                self._drop_old_snapshots(version, previous and previous['version'])
+                print(f"📒 Built NGO registry snapshot: {len(blobs)} records in {time.perf_counter() - started:.1f}s")
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _drop_old_snapshots(self, version, previous):
+        """
+        Start the grace period of the snapshot just replaced and delete older ones past it
+
+        A replaced snapshot's files get their mtime set to the time of the
+        replacement. Workers that already mapped them keep them until they remap.
+        """
+        expired = time.time() - self.snapshot_grace
+        for filename in os.listdir(self.directory):
+            parts = filename.split('.')
+            if len(parts) != 3 or parts[2] != 'npy' or parts[1] == version:
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                if parts[1] == previous:
+                    os.utime(path)
+                elif os.stat(path).st_mtime < expired:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _map(self):
+        """Map the snapshot current.json points to, if it is not the mapped one"""
+        try:
+            stat = os.stat(self.current_path)
+        except FileNotFoundError:
+            return
+        snapshot_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if snapshot_id == self._snapshot_id:
+            return
+        meta = self._read_current()
+        # Plain ndarray views of the maps: indexing np.memmap itself is several times slower
+        arrays = {
+            name: np.asarray(np.load(os.path.join(self.directory, f"{name}.{meta['version']}.npy"), mmap_mode='r'))
+            for name in SNAPSHOT_ARRAYS
+        }
+        with self._lock:
+            self.meta, self.arrays, self._snapshot_id = meta, arrays, snapshot_id
+        print(f"📒 NGO registry snapshot {meta['version'][:8]} mapped ({meta['records']} records)")
+
+    @staticmethod
+    def _records(arrays, hashes, rows, key):
+        """Records whose key hashes like key (the caller checks the key itself)"""
+        hashed = key_hash(key)
+        offsets, blob = arrays['offsets'], arrays['records']
+        found = []
+        position = int(np.searchsorted(hashes, np.uint64(hashed)))
+        while position < len(hashes) and int(hashes[position]) == hashed:
+            row = int(rows[position])
+            found.append(json.loads(blob[int(offsets[row]):int(offsets[row + 1])].tobytes()))
+            position += 1
+        return found
+
+    def lookup(self, ngo_name, registration_id=None):
+        """
+        Registry records confirming an NGO, and what matched ("registration_id" or "name")
+
+        A registration ID counts only when the record it belongs to has (nearly)
+        the same name; otherwise the NGO is looked up by name. Returns
+        ([], None) on a miss or when no registry is loaded.
+        """
+        self.refresh()
+        with self._lock:
+            arrays = self.arrays
+        if arrays is None:
+            return [], None
+
+        key = normalize_ngo_name(ngo_name)
+        registration_key = normalize_registration_id(registration_id)
+        if registration_key:
+            records = [
+                record for record in self._records(arrays, arrays['id_hashes'], arrays['id_rows'], registration_key)
+                if registration_key in record['ids'] and names_match(record['key'], key)
+            ]
+            if records:
+                return records[:NGO_REGISTRY_MAX_MATCHES], 'registration_id'
+        records = [
+            record for record in self._records(arrays, arrays['name_hashes'], arrays['name_rows'], key)
+            if record['key'] == key
+        ]
+        return records[:NGO_REGISTRY_MAX_MATCHES], ('name' if records else None)
+
+    def stats(self):
+        if self.meta is None:
+            return {'loaded': False, 'source': self.source_path}
+        return {
+            'loaded': True,
+            'source': self.meta['source'],
+            'records': self.meta['records'],
+            'version': self.meta['version'],
+            'built_at': self.meta['built_at']
+        }
+
+
+def registry_result(records, matched_by):
+    """The "registry" field of a verification: the matched records, or None"""
+    if not records:
+        return None
+    return {
+        'matched_by': matched_by,
+        'records': [
+            {field: value for field, value in record.items() if field not in ('key', 'ids')}
+            for record in records
+        ]
+    }
+
+
+def names_match(a, b):
+    """Same canonical name, or close enough to be a spelling variant"""
+    if a == b:
+        return True
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b)) >= NAME_MATCH_THRESHOLD
@@ -0,0 +1,130 @@
+"""
+Dynamic micro-batching for sentiment inference
+
+Inputs submitted by concurrent requests are queued and collected for up to
+max_wait_ms (or until max_batch_size inputs are waiting), then run through the
+model as a single padded batch. A request may submit several inputs at once
+(all token windows of its pages); they stay together in one batch, and the
+caller gets back one result per input.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+SENTIMENT_BATCH_MAX_SIZE = int(os.getenv('SENTIMENT_BATCH_MAX_SIZE', 16))
+SENTIMENT_BATCH_WAIT_MS = float(os.getenv('SENTIMENT_BATCH_WAIT_MS', 5))
+
+
+class SentimentBatcher:
+    """Collects pending inputs and runs them through run_batch(inputs) -> [result per input] together"""
+
+    def __init__(self, run_batch, max_batch_size=SENTIMENT_BATCH_MAX_SIZE, max_wait_ms=SENTIMENT_BATCH_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        # Metrics
+        self.batches = 0
+        self.requests = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.last_batch_size = 0
+        self.total_inference_ms = 0.0
+        self.last_inference_ms = 0.0
+
+    def _ensure_worker(self):
+        """Start the batching thread on first use (and again in forked workers)"""
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._loop, name='sentiment-batcher', daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def submit(self, inputs):
+        """Queue a list of inputs for inference and return a Future for their list of results"""
+        self._ensure_worker()
+        future = Future()
+        if not inputs:
+            future.set_result([])
+            return future
+        self._queue.put((list(inputs), future))
+        return future
+
+    def predict(self, text, timeout=None):
+        """Submit a single input and wait for its result"""
+        return self.submit([text]).result(timeout=timeout)[0]
+
+    def _collect(self):
+        """Block for the first pending request, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        window_end = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = window_end - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending[0])
+
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            batch = [(inputs, future) for inputs, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            flat = [item for inputs, _ in batch for item in inputs]
+            started = time.perf_counter()
+            try:
+                results = list(self.run_batch(flat))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            start = 0
+            for inputs, future in batch:
+                future.set_result(results[start:start + len(inputs)])
+                start += len(inputs)
+
+            self.batches += 1
+            self.requests += len(batch)
+            self.items += len(flat)
+            self.last_batch_size = len(flat)
+            self.max_batch_seen = max(self.max_batch_seen, len(flat))
+            self.last_inference_ms = elapsed_ms
+            self.total_inference_ms += elapsed_ms
+
+    def metrics(self):
+        """Queue depth, batch sizes and inference time for this worker"""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batches': self.batches,
+            'requests': self.requests,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'last_batch_size': self.last_batch_size,
+            'max_batch_size_seen': self.max_batch_seen,
+            'avg_inference_ms': round(self.total_inference_ms / self.batches, 2) if self.batches else 0.0,
+            'last_inference_ms': round(self.last_inference_ms, 2),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
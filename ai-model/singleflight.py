@@ -0,0 +1,80 @@
+"""
+Single-flight coalescing of duplicate work
+
+When a call for a key is already running, later calls for the same key wait
+for its result instead of starting their own. Used to make concurrent
+/verify_ngo requests for the same NGO (registration triggers several within
+seconds) share one search/scrape/inference run. Coalescing is per process:
+gunicorn workers do not see each other's calls.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key across threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) unless a call for key is already running
+
+        Returns (result, shared); shared is True when the result came from a call
+        started by another thread. Exceptions are raised in every waiting caller.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'coalesced': self.coalesced}
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls with the same key on one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        """Await coro_fn(*args, **kwargs) once per key; returns (result, shared)"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = self._calls[key] = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        # A caller that goes away must not cancel the run the others are waiting on
+        return await asyncio.shield(task), shared
+
+    def stats(self):
+        return {'in_flight': len(self._calls), 'coalesced': self.coalesced}
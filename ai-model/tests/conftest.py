@@ -0,0 +1,30 @@
+"""
+Shared setup for the ai-model tests
+
+The service modules are imported from the parent directory. Every SQLite file
+and snapshot directory they open at import time is pointed at a temporary
+directory first, and the sentiment model path at one that does not exist, so
+importing app.py fails the model load at once instead of downloading it.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STATE_DIR = tempfile.mkdtemp(prefix='ai-model-tests-')
+os.environ.update({
+    'VERIFY_CACHE_PATH': os.path.join(STATE_DIR, 'verification_cache.db'),
+    'CAUSE_INDEX_DIR': os.path.join(STATE_DIR, 'cause_index'),
+    'NGO_REGISTRY_DIR': os.path.join(STATE_DIR, 'registry_index'),
+    'ONNX_CACHE_DIR': os.path.join(STATE_DIR, 'onnx_cache'),
+    'SENTIMENT_MODEL_PATH': os.path.join(STATE_DIR, 'no-model'),
+    'MODEL_LOAD_MODE': 'eager',
+    'HF_HUB_OFFLINE': '1',
+})
+os.environ.pop('NGO_REGISTRY_PATH', None)
+os.environ.pop('CAUSE_CATALOG_PATH', None)
+os.environ.pop('EMBEDDING_MODEL_DIR', None)
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip('quart')
+pytest.importorskip('quart_cors')
+httpx = pytest.importorskip('httpx')
+from prometheus_client import REGISTRY  # noqa: E402
+
+import app  # noqa: E402
+import app_async  # noqa: E402
+import app_simple  # noqa: E402
+from deadline import Deadline  # noqa: E402
+from page_cache import PageCache  # noqa: E402
+
+
+@pytest.fixture
+def simple(monkeypatch):
+    """app_async running the app_simple pipeline"""
+    monkeypatch.setattr(app_async, 'engine', app_simple)
+    monkeypatch.setattr(app_async, 'VERIFY_ENGINE', 'simple')
+    return app_async
+
+
+@pytest.fixture
+def full(monkeypatch):
+    """app_async running the app.py pipeline"""
+    monkeypatch.setattr(app_async, 'engine', app)
+    monkeypatch.setattr(app_async, 'VERIFY_ENGINE', 'full')
+    return app_async
+
+
+def web(monkeypatch, query_seconds=0, query_results=(), official_site=None):
+    """Replace DuckDuckGo and the domain probes; returns the URLs probed"""
+    probed = []
+
+    async def run_search_query(query, deadline=None):
+        await asyncio.sleep(query_seconds)
+        return list(query_results)
+
+    async def probe_url(url):
+        probed.append(url)
+        return url == official_site
+
+    monkeypatch.setattr(app_async, 'run_search_query', run_search_query)
+    monkeypatch.setattr(app_async, 'probe_url', probe_url)
+    return probed
+
+
+def test_slow_duckduckgo_queries_do_not_hold_back_the_domain_probes(simple, monkeypatch):
+    monkeypatch.setattr(app_simple, 'SEARCH_PROBE_GRACE', 0.05)
+    web(monkeypatch, query_seconds=5, official_site='https://www.goonj.org')
+    deadline = Deadline(500)
+
+    results = asyncio.run(simple.perform_web_search('Goonj', deadline=deadline))
+
+    assert results == [app_simple.official_site_result('Goonj', 'https://www.goonj.org')]
+    assert deadline.skipped == ['search_queries']
+
+
+def test_duckduckgo_results_leave_the_domains_unprobed(simple, monkeypatch):
+    result = {'title': 'Goonj', 'url': 'https://goonj.org', 'snippet': 'registered charity'}
+    probed = web(monkeypatch, query_results=[result])
+
+    assert asyncio.run(simple.perform_web_search('Goonj')) == [result]
+    assert probed == []
+
+
+def stage_count(engine, stage):
+    return REGISTRY.get_sample_value(
+        'ngo_verification_stage_seconds_count', {'engine': engine, 'stage': stage}
+    ) or 0
+
+
+def test_the_simple_pipeline_is_timed_as_a_whole(simple, monkeypatch):
+    web(monkeypatch)
+    before = stage_count('simple', 'total')
+
+    result = asyncio.run(simple.run_simple_verification('Goonj'))
+
+    assert stage_count('simple', 'total') == before + 1
+    assert result['success'] and result['num_links'] == 0
+    expected = app_simple.calculate_trust_score('Goonj', [], app_simple.analyze_ngo_presence('Goonj', []))
+    assert result['trust_score'] == expected['trust_score']
+
+
+class RefusingClient:
+    """http_client stand-in that records the deadline of each request and fails it"""
+
+    def __init__(self):
+        self.deadlines = []
+
+    async def request(self, method, url, deadline=None, **kwargs):
+        self.deadlines.append(deadline)
+        raise httpx.ConnectError('refused')
+
+
+def test_page_fetches_are_bounded_by_the_scrape_deadline(full, monkeypatch, tmp_path):
+    client = RefusingClient()
+    monkeypatch.setattr(app_async, 'http_client', client)
+    monkeypatch.setattr(app, 'page_cache', PageCache('page', path=str(tmp_path / 'pages.db')))
+    monkeypatch.setattr(app_async, 'host_semaphores', {})
+
+    started = time.monotonic()
+    pages = asyncio.run(full.scrape_pages(['https://a.org/', 'https://b.org/'], deadline_seconds=2))
+
+    assert pages == []
+    assert len(client.deadlines) == 2
+    assert all(started + 2 <= deadline <= time.monotonic() + 2 for deadline in client.deadlines)
+
+
+def test_the_batch_endpoint_streams_a_line_per_position(simple, monkeypatch):
+    async def get_verification(ngo_name, max_age=None, force_refresh=False, **kwargs):
+        if ngo_name == 'Bad':
+            raise RuntimeError('search down')
+        return {'ngo_name': ngo_name, 'trust_score': 70}
+
+    monkeypatch.setattr(app_async, 'get_verification', get_verification)
+
+    async def post():
+        response = await simple.app.test_client().post(
+            '/verify_ngo/batch', json={'ngo_names': ['Goonj', 'Bad', 'goonj']}
+        )
+        return response.status_code, response.mimetype, await response.get_data(as_text=True)
+
+    status, mimetype, body = asyncio.run(post())
+
+    lines = sorted((json.loads(line) for line in body.splitlines()), key=lambda line: line['index'])
+    assert (status, mimetype) == (200, 'application/x-ndjson')
+    assert [(line['index'], line['ngo_name'], line['trust_score']) for line in lines] == [
+        (0, 'Goonj', 70), (1, 'Bad', 50), (2, 'Goonj', 70)
+    ]
+    assert lines[1]['error'] == 'search down'
+
+
+@pytest.mark.parametrize('data', [{'ngo_names': []}, {'ngo_names': ['Goonj'], 'max_age': 'abc'}])
+def test_the_batch_endpoint_rejects_bad_input(simple, data):
+    async def post():
+        response = await simple.app.test_client().post('/verify_ngo/batch', json=data)
+        return response.status_code, await response.get_json()
+
+    status, body = asyncio.run(post())
+
+    assert status == 400
+    assert body['success'] is False
+
+
+def test_health_probes_are_answered_by_the_engine_views(simple):
+    async def get(path):
+        response = await simple.app.test_client().get(path)
+        return response.status_code, await response.get_json()
+
+    assert asyncio.run(get('/livez')) == (200, {'status': 'alive'})
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from batch_verification import parse_batch_names, stream_batch_results, stream_batch_results_async
+
+
+def collect(ngo_names, verify):
+    lines = [json.loads(line) for line in stream_batch_results(ngo_names, verify, error_result)]
+    return sorted(lines, key=lambda line: line['index'])
+
+
+def error_result(ngo_name, error):
+    return {'ngo_name': ngo_name, 'error': str(error)}
+
+
+def test_duplicates_are_verified_once_but_keep_every_position():
+    assert parse_batch_names({'ngo_names': ['A', 'a', ' B ', '', None, 'A']}) == [('A', [0, 1, 5]), ('B', [2])]
+
+
+def test_non_list_input_gives_no_names():
+    assert parse_batch_names({'ngo_names': 'Goonj'}) == []
+    assert parse_batch_names(None) == []
+
+
+def test_every_requested_position_gets_a_line():
+    calls = []
+
+    def verify(ngo_name):
+        calls.append(ngo_name)
+        return {'ngo_name': ngo_name}
+
+    lines = collect(parse_batch_names({'ngo_names': ['A', 'a', 'B']}), verify)
+
+    assert sorted(calls) == ['A', 'B']
+    assert [(line['index'], line['ngo_name']) for line in lines] == [(0, 'A'), (1, 'A'), (2, 'B')]
+
+
+def test_a_failing_verification_is_reported_on_its_own_lines():
+    def verify(ngo_name):
+        if ngo_name == 'Bad':
+            raise RuntimeError('search down')
+        return {'ngo_name': ngo_name}
+
+    lines = collect([('Good', [0]), ('Bad', [1, 2])], verify)
+
+    assert [(line['index'], line.get('error')) for line in lines] == [
+        (0, None), (1, 'search down'), (2, 'search down')
+    ]
+
+
+def test_the_async_stream_reports_every_position_and_failure():
+    async def verify(ngo_name):
+        await asyncio.sleep(0.01)
+        if ngo_name == 'Bad':
+            raise RuntimeError('search down')
+        return {'ngo_name': ngo_name}
+
+    async def collect_async(ngo_names):
+        return [json.loads(line) async for line in stream_batch_results_async(ngo_names, verify, error_result)]
+
+    lines = sorted(asyncio.run(collect_async([('Good', [0, 2]), ('Bad', [1])])), key=lambda line: line['index'])
+
+    assert [(line['index'], line['ngo_name'], line.get('error')) for line in lines] == [
+        (0, 'Good', None), (1, 'Bad', 'search down'), (2, 'Good', None)
+    ]
@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+import cause_index as cause_index_module
+from cause_index import CauseIndex, parse_nearby_query
+from recommender import parse_profile
+
+CAUSES = [
+    {'id': 1, 'title': 'Teach children to read', 'category': 'education', 'location': {'lat': 12.97, 'lng': 77.59}},
+    {'id': 2, 'title': 'Clean the river banks', 'category': 'environment', 'location': {'lat': 13.0, 'lng': 77.6}},
+    {'id': 3, 'title': 'Free health camp', 'category': 'health', 'location': {'lat': 19.07, 'lng': 72.87}},
+]
+PROFILE = parse_profile({'interests': ['education'], 'location': {'lat': 12.97, 'lng': 77.59}})
+
+
+def snapshot_versions(directory):
+    return {filename.split('.')[1] for filename in os.listdir(directory) if filename.endswith('.npy')}
+
+
+def recommended_ids(index):
+    return [r['causeId'] for r in index.recommend(PROFILE)['recommendations']]
+
+
+def test_other_workers_pick_up_a_new_snapshot(tmp_path):
+    writer = CauseIndex(str(tmp_path), catalog_path=None)
+    reader = CauseIndex(str(tmp_path), catalog_path=None)
+    writer.upsert(CAUSES[:2])
+
+    assert recommended_ids(reader) == [1, 2]
+    writer.upsert(CAUSES[2:])
+    writer.delete([2])
+    assert sorted(recommended_ids(reader)) == [1, 3]
+    assert reader.version == writer.version
+
+
+def test_replaced_snapshots_are_kept_for_the_grace_period(tmp_path):
+    index = CauseIndex(str(tmp_path), catalog_path=None, snapshot_grace=3600)
+    for cause in CAUSES:
+        index.upsert([cause])
+
+    assert len(snapshot_versions(tmp_path)) == 3
+
+
+def test_snapshots_past_the_grace_period_are_deleted(tmp_path):
+    index = CauseIndex(str(tmp_path), catalog_path=None, snapshot_grace=0)
+    versions = []
+    for cause in CAUSES:
+        index.upsert([cause])
+        versions.append(index.version)
+
+    # The snapshot just replaced starts its grace period; older ones are gone
+    assert snapshot_versions(tmp_path) == set(versions[-2:])
+
+
+def test_a_snapshot_removed_while_loading_is_retried_with_the_newer_one(tmp_path, monkeypatch):
+    writer = CauseIndex(str(tmp_path), catalog_path=None)
+    writer.upsert(CAUSES[:1])
+    reader = CauseIndex(str(tmp_path), catalog_path=None)
+    writer.upsert(CAUSES[1:])
+    load = np.load
+    calls = []
+
+    def racing_load(path, *args, **kwargs):
+        calls.append(path)
+        if len(calls) == 1:
+            raise FileNotFoundError(path)  # the writer's _save removed it just now
+        return load(path, *args, **kwargs)
+
+    monkeypatch.setattr(cause_index_module.np, 'load', racing_load)
+
+    assert sorted(recommended_ids(reader)) == [1, 2, 3]
+    assert reader.version == writer.version
+
+
+def test_requests_keep_the_mapped_snapshot_when_the_new_one_cannot_be_loaded(tmp_path, monkeypatch):
+    writer = CauseIndex(str(tmp_path), catalog_path=None)
+    writer.upsert(CAUSES[:1])
+    reader = CauseIndex(str(tmp_path), catalog_path=None)
+    served = reader.version
+    writer.upsert(CAUSES[1:])
+
+    def missing(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(cause_index_module.np, 'load', missing)
+
+    assert recommended_ids(reader) == [1]
+    assert [c['causeId'] for c in reader.nearby(12.97, 77.59, radius_km=10)] == [1]
+    assert reader.version == served
+
+
+def test_nearby_lists_causes_nearest_first(tmp_path):
+    index = CauseIndex(str(tmp_path), catalog_path=None)
+    index.upsert(CAUSES)
+
+    assert [c['causeId'] for c in index.nearby(12.97, 77.59, radius_km=10)] == [1, 2]
+    assert [c['causeId'] for c in index.nearby(19.0, 72.8, k=1)] == [3]
+
+
+@pytest.mark.parametrize('args', [{'lat': '1'}, {'lat': 'x', 'lng': '2', 'k': '1'}, {'lat': '1', 'lng': '2'},
+                                  {'lat': '95', 'lng': '2', 'k': '1'}, {'lat': '1', 'lng': '2', 'k': '0'}])
+def test_bad_nearby_queries_raise_value_errors(args):
+    with pytest.raises(ValueError):
+        parse_nearby_query(args)
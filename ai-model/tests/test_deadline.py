@@ -0,0 +1,69 @@
+import math
+import time
+
+import pytest
+
+from deadline import DEADLINE_SCRAPE_MIN_MS, Deadline, StageEstimate, parse_deadline_ms, plan_scrape
+
+
+@pytest.mark.parametrize('value', [0, -5, True, '3000', float('inf'), float('nan')])
+def test_invalid_budgets_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_deadline_ms(value)
+
+
+def test_valid_budgets():
+    assert parse_deadline_ms(None) is None
+    assert parse_deadline_ms(2500) == 2500
+    assert parse_deadline_ms(0.5) == 0.5
+
+
+def test_an_unbounded_deadline_never_runs_out():
+    deadline = Deadline()
+
+    assert not deadline.bounded
+    assert deadline.remaining() == math.inf
+    assert deadline.timeout() is None
+    assert deadline.annotate({'notes': []}) == {'notes': []}
+
+
+def test_a_bounded_deadline_counts_down_to_zero():
+    deadline = Deadline(50)
+
+    assert 0 < deadline.timeout() <= 0.05
+    time.sleep(0.06)
+    assert deadline.remaining() == 0
+
+
+def test_annotate_lists_the_skipped_stages_once():
+    deadline = Deadline(3000)
+    deadline.skip('search')
+    deadline.skip('search')
+    deadline.skip('sentiment')
+
+    result = deadline.annotate({'notes': ['Neutral sentiment (no change)']})
+
+    assert result['deadline_ms'] == 3000
+    assert result['skipped_stages'] == ['search', 'sentiment']
+    assert result['elapsed_ms'] >= 0
+    assert result['notes'][-1] == 'Skipped search, sentiment to answer within 3000ms'
+
+
+def test_stage_estimate_moves_towards_observed_times():
+    estimate = StageEstimate(1.0, alpha=0.5)
+    estimate.observe(3.0)
+
+    assert estimate.seconds == 2.0
+    assert estimate.fits(Deadline())
+    assert not estimate.fits(Deadline(1000))
+
+
+def test_plan_scrape():
+    estimate = StageEstimate(4.0)
+    minimum = DEADLINE_SCRAPE_MIN_MS / 1000
+
+    assert plan_scrape(Deadline(), 0.5, 5, 8, estimate) == (5, 8)
+    max_links, seconds = plan_scrape(Deadline(2500), 0.5, 5, 8, estimate)
+    assert seconds == pytest.approx(2.0, abs=0.05)
+    assert max_links == 2  # half the usual scraping time, half the links
+    assert plan_scrape(Deadline((minimum + 0.5) * 1000 - 100), 0.5, 5, 8, estimate) is None
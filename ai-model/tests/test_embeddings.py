@@ -0,0 +1,129 @@
+import zlib
+
+import numpy as np
+
+from cause_index import CauseIndex
+from embeddings import LRUCache, SentenceEncoder
+from recommender import CauseMatrix, cause_fields
+
+CAUSES = [
+    {'id': 1, 'title': 'Teach children to read', 'category': 'education', 'location': {'lat': 12.97, 'lng': 77.59}},
+    {'id': 2, 'title': 'Clean the river banks', 'category': 'environment', 'location': {'lat': 13.0, 'lng': 77.6}},
+    {'id': 3, 'title': 'Free health camp', 'category': 'health', 'location': {'lat': 19.07, 'lng': 72.87}},
+]
+
+
+class FakeEncoder(SentenceEncoder):
+    """SentenceEncoder whose model hashes each text to a unit vector, recording the texts it encodes"""
+
+    def __init__(self, name='fake-model', dimension=8, query_cache_size=4, text_cache_size=4):
+        self.name = name
+        self.dimension = dimension
+        self.queries = LRUCache(query_cache_size)
+        self.texts = LRUCache(text_cache_size)
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        vectors = np.array([
+            np.random.default_rng(zlib.crc32(f"{self.name}:{text}".encode('utf-8'))).standard_normal(self.dimension)
+            for text in texts
+        ], dtype=np.float32).reshape(len(texts), self.dimension)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def dot(self, vectors, query):
+        return vectors.astype(np.float32) @ query
+
+
+def texts_of(causes):
+    return [cause_fields(cause)[1] for cause in causes]
+
+
+def test_the_lru_cache_evicts_the_least_recently_used_entry():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+
+    assert cache.get('a') == 1  # now the most recent
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats() == {'size': 2, 'hits': 3, 'misses': 1}
+
+
+def test_a_zero_size_cache_keeps_nothing():
+    cache = LRUCache(0)
+    cache.put('a', 1)
+
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_cause_texts_seen_recently_are_not_encoded_again():
+    encoder = FakeEncoder()
+
+    first = encoder.encode_texts(['teach', 'clean'])
+    second = encoder.encode_texts(['clean', 'heal'])
+
+    assert encoder.encoded == ['teach', 'clean', 'heal']
+    assert first.dtype == np.float16
+    assert np.array_equal(first[1], second[0])
+    assert encoder.stats()['text_cache'] == {'size': 3, 'hits': 1, 'misses': 3}
+
+
+def test_a_profile_is_encoded_once_whatever_the_order_of_its_phrases():
+    encoder = FakeEncoder()
+
+    vector = encoder.encode_query(['teaching', 'coding'])
+
+    assert np.array_equal(encoder.encode_query(['coding', 'teaching']), vector)
+    assert encoder.encoded == ['coding, teaching']
+    assert encoder.encode_query([]) is None
+    assert encoder.stats()['query_cache']['hits'] == 1
+
+
+def test_only_causes_whose_text_changed_are_encoded_again():
+    encoder = FakeEncoder(text_cache_size=0)  # so only the matrix can avoid encoding a text twice
+    matrix = CauseMatrix(CAUSES, encoder)
+    before = matrix.embeddings[matrix.rows['1']].copy()
+    encoder.encoded.clear()
+
+    moved = {**CAUSES[0], 'location': {'lat': 28.6, 'lng': 77.2}}
+    renamed = {**CAUSES[1], 'title': 'Plant trees on the river banks'}
+    matrix.upsert([moved, renamed])
+
+    assert encoder.encoded == texts_of([renamed])
+    assert np.array_equal(matrix.embeddings[matrix.rows['1']], before)
+    assert np.array_equal(matrix.embeddings[matrix.rows['2']], encoder.encode(texts_of([renamed]))[0].astype(np.float16))
+
+
+def test_embed_all_encodes_every_live_cause_with_the_new_model():
+    matrix = CauseMatrix(CAUSES, FakeEncoder('model-a'))
+    matrix.delete([2])
+    other = FakeEncoder('model-b')
+
+    matrix.embed_all(other)
+
+    assert sorted(other.encoded) == sorted(texts_of([CAUSES[0], CAUSES[2]]))
+    assert matrix.encoder is other
+    assert matrix.embeddings.shape == (2, other.dimension)
+    assert np.array_equal(matrix.embeddings, other.encode(texts_of([CAUSES[0], CAUSES[2]])).astype(np.float16))
+
+
+def test_a_snapshot_from_another_model_is_encoded_again(tmp_path):
+    CauseIndex(str(tmp_path), catalog_path=None, encoder=FakeEncoder('model-a')).upsert(CAUSES)
+
+    same = FakeEncoder('model-a')
+    assert CauseIndex(str(tmp_path), catalog_path=None, encoder=same).stats()['embedding_model'] == 'model-a'
+    assert same.encoded == []
+
+    changed = FakeEncoder('model-b')
+    index = CauseIndex(str(tmp_path), catalog_path=None, encoder=changed)
+
+    assert sorted(changed.encoded) == sorted(texts_of(CAUSES))
+    assert index.stats()['embedding_model'] == 'model-b'
+    reloaded = FakeEncoder('model-b')
+    assert CauseIndex(str(tmp_path), catalog_path=None, encoder=reloaded).matrix.embeddings.shape == (3, 8)
+    assert reloaded.encoded == []
+
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from feature_store import FeatureStore, merge_weights, parse_ngo_names, trust_levels
+
+COLUMNS = ['num_links', 'has_wikipedia', 'sentiment_score']
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore('full', COLUMNS, path=str(tmp_path / 'features.db'))
+
+
+def test_vectors_come_back_as_one_matrix_in_column_order(store):
+    store.put('Goonj', {'num_links': 5, 'has_wikipedia': True, 'sentiment_score': 0.75}, 81.5)
+    store.put('Seva', {'sentiment_score': 0.25})
+
+    names, matrix, scores = store.load()
+
+    rows = dict(zip(names, matrix.tolist()))
+    assert rows == {'Goonj': [5.0, 1.0, 0.75], 'Seva': [0.0, 0.0, 0.25]}
+    assert dict(zip(names, scores.tolist()))['Goonj'] == 81.5
+    assert np.isnan(dict(zip(names, scores))['Seva'])
+
+
+def test_names_are_filtered_and_keyed_by_canonical_name(store):
+    store.put('Goonj Trust', {'num_links': 1})
+    store.put('The Goonj Trust', {'num_links': 2})
+    store.put('Goonj Society', {'num_links': 3})
+
+    names, matrix, _ = store.load(['goonj trust', 'Unknown'])
+
+    assert names == ['The Goonj Trust']
+    assert matrix.tolist() == [[2.0, 0.0, 0.0]]
+    assert store.count() == 2
+
+
+def test_rows_saved_with_other_columns_or_engines_are_skipped(store):
+    store.put('Goonj', {'num_links': 1})
+    FeatureStore('full', COLUMNS + ['registry_match'], path=store.path).put('Seva', {'num_links': 1})
+    FeatureStore('simple', COLUMNS, path=store.path).put('Akshaya Patra', {'num_links': 1})
+
+    names, matrix, _ = store.load()
+
+    assert names == ['Goonj']
+    assert matrix.shape == (1, len(COLUMNS))
+
+
+def test_an_empty_store_loads_an_empty_matrix(store):
+    names, matrix, scores = store.load()
+
+    assert names == []
+    assert matrix.shape == (0, len(COLUMNS))
+    assert len(scores) == 0
+
+
+def test_update_scores(store):
+    store.put('Goonj', {'num_links': 1}, 50)
+
+    store.update_scores(['Goonj'], [72.5])
+
+    assert store.load()[2].tolist() == [72.5]
+
+
+def test_merge_weights():
+    defaults = {'base': 50, 'wikipedia': 15}
+
+    assert merge_weights(defaults, None) == defaults
+    assert merge_weights(defaults, {'wikipedia': 30}) == {'base': 50, 'wikipedia': 30}
+    with pytest.raises(ValueError, match='Unknown weights: typo'):
+        merge_weights(defaults, {'typo': 1})
+    with pytest.raises(ValueError, match='must be a number'):
+        merge_weights(defaults, {'base': True})
+    with pytest.raises(ValueError):
+        merge_weights(defaults, [1])
+
+
+def test_parse_ngo_names():
+    assert parse_ngo_names(None) is None
+    assert parse_ngo_names([' Goonj ', '']) == ['Goonj']
+    with pytest.raises(ValueError):
+        parse_ngo_names('Goonj')
+
+
+def test_trust_levels():
+    thresholds = [(80, 'HIGH'), (60, 'MEDIUM'), (40, 'LOW'), (0, 'VERY LOW')]
+
+    levels = trust_levels(np.array([100, 80, 79.9, 60, 40, 39.9, 0]), thresholds)
+
+    assert levels.tolist() == ['HIGH', 'HIGH', 'MEDIUM', 'MEDIUM', 'LOW', 'VERY LOW', 'VERY LOW']
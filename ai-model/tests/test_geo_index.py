@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+
+from geo_index import GeoIndex, haversine_km
+
+
+def random_points(rng, count):
+    """Points worldwide plus clusters at a pole, the antimeridian and a city"""
+    lats = np.concatenate([
+        np.degrees(np.arcsin(rng.uniform(-1, 1, count))), rng.uniform(88, 90, count // 10),
+        rng.uniform(-5, 5, count // 10), rng.normal(12.97, 0.3, count // 5)
+    ])
+    lngs = np.concatenate([
+        rng.uniform(-180, 180, count), rng.uniform(-180, 180, count // 10),
+        rng.choice([-1, 1], count // 10) * rng.uniform(179, 180, count // 10), rng.normal(77.59, 0.3, count // 5)
+    ])
+    return lats, lngs
+
+
+def brute_force_within(lats, lngs, lat, lng, radius_km, mask):
+    distances = haversine_km(lat, lng, lats, lngs)
+    rows = [row for row in range(len(lats)) if mask[row] and distances[row] <= radius_km]
+    return sorted(rows, key=lambda row: distances[row]), distances
+
+
+QUERIES = [
+    (12.97, 77.59, 5), (12.97, 77.59, 60), (0, 179.9, 300), (0, -179.95, 50), (89.5, 10, 200),
+    (-89.9, 0, 500), (45, 0, 2000), (30, 120, 12000), (0, 0, 25000)
+]
+
+
+@pytest.mark.parametrize('cell_degrees', [0.1, 1.0])
+def test_within_matches_a_brute_force_scan(cell_degrees):
+    rng = np.random.default_rng(0)
+    lats, lngs = random_points(rng, 5000)
+    lats[::97] = np.nan  # causes without coordinates
+    mask = rng.random(len(lats)) < 0.8
+    index = GeoIndex(lats, lngs, cell_degrees)
+
+    for lat, lng, radius_km in QUERIES:
+        rows, distances = index.within(lat, lng, radius_km, mask)
+        expected, all_distances = brute_force_within(lats, lngs, lat, lng, radius_km, mask)
+        assert list(rows) == expected, (lat, lng, radius_km)
+        np.testing.assert_allclose(distances, all_distances[expected])
+
+
+def test_nearest_matches_a_brute_force_sort():
+    rng = np.random.default_rng(1)
+    lats, lngs = random_points(rng, 3000)
+    mask = rng.random(len(lats)) < 0.5
+    index = GeoIndex(lats, lngs)
+
+    for lat, lng, _ in QUERIES:
+        for k in (1, 7, 100):
+            rows, distances = index.nearest(lat, lng, k, mask)
+            expected, all_distances = brute_force_within(lats, lngs, lat, lng, math.inf, mask)
+            assert list(rows) == expected[:k]
+            np.testing.assert_allclose(distances, all_distances[expected[:k]])
+
+
+def test_rows_added_with_extend_are_found():
+    rng = np.random.default_rng(2)
+    lats, lngs = random_points(rng, 1000)
+    index = GeoIndex(lats[:300], lngs[:300])
+    index.extend(lats[300:700], lngs[300:700])
+    index.extend(lats[700:], lngs[700:])
+
+    rows, _ = index.within(12.97, 77.59, 40)
+    expected, _ = brute_force_within(lats, lngs, 12.97, 77.59, 40, np.ones(len(lats), dtype=bool))
+    assert len(index) == len(lats)
+    assert list(rows) == expected
+
+
+def test_nearest_returns_fewer_rows_when_there_are_not_enough():
+    index = GeoIndex([12.97, np.nan], [77.59, 77.6])
+
+    rows, distances = index.nearest(-33.9, 18.4, 5)
+
+    assert list(rows) == [0]
+    assert distances[0] == pytest.approx(haversine_km(-33.9, 18.4, 12.97, 77.59))
+
+
+def test_haversine_known_distance():
+    # Bengaluru to Mumbai, about 845 km
+    assert haversine_km(12.9716, 77.5946, 19.0760, 72.8777) == pytest.approx(845, abs=5)
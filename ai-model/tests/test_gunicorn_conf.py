@@ -0,0 +1,115 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('transformers')
+pytest.importorskip('flask')
+from tokenizers import Tokenizer, models, pre_tokenizers, trainers  # noqa: E402
+from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaForSequenceClassification  # noqa: E402
+
+import app  # noqa: E402
+from inference_backends import TorchBackend  # noqa: E402
+
+CONF_PATH = os.path.join(os.path.dirname(app.__file__), 'gunicorn.conf.py')
+
+
+@pytest.fixture(scope='module')
+def model_dir(tmp_path_factory):
+    """A tiny RoBERTa sentiment model saved the way SENTIMENT_MODEL_PATH expects"""
+    path = str(tmp_path_factory.mktemp('model'))
+    word_tokenizer = Tokenizer(models.WordLevel(unk_token='<unk>'))
+    word_tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    word_tokenizer.train_from_iterator(['a registered charity'], trainers.WordLevelTrainer(
+        special_tokens=['<s>', '<pad>', '</s>', '<unk>']
+    ))
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=word_tokenizer, bos_token='<s>', eos_token='</s>', pad_token='<pad>', unk_token='<unk>'
+    )
+    tokenizer.save_pretrained(path)
+    RobertaForSequenceClassification(RobertaConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=32, max_position_embeddings=40, pad_token_id=tokenizer.pad_token_id, num_labels=3
+    )).save_pretrained(path)
+    return path
+
+
+class FakeRunner:
+    def __init__(self):
+        self.started = 0
+
+    def ensure_started(self):
+        self.started += 1
+
+
+@pytest.fixture
+def master(monkeypatch, model_dir, tmp_path):
+    """
+    app as gunicorn's preloading master sets it up for SENTIMENT_BACKEND=int8,
+    with select_backend recording the backends it builds; returns (conf, built)
+    """
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path / 'metrics'))
+    monkeypatch.setenv('SENTIMENT_BACKEND_AFTER_FORK', '')  # so loading the config sets it, and it is restored
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', CONF_PATH)
+    conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(conf)
+
+    built = []
+
+    def select_backend(name, model, tokenizer, model_name, check=True):
+        built.append((name, os.getpid()))
+        return type('Int8Backend', (TorchBackend,), {'name': name})(model)
+
+    for name in ('tokenizer', 'sentiment_model', 'sentiment_backend', 'backend_pending', 'model_state',
+                 'model_error', 'model_loader_pid'):
+        monkeypatch.setattr(app, name, getattr(app, name))
+    monkeypatch.setattr(app, 'defer_backend', os.environ['SENTIMENT_BACKEND_AFTER_FORK'] == '1')
+    monkeypatch.setattr(app, 'MODEL_NAME', model_dir)
+    monkeypatch.setattr(app, 'SENTIMENT_BACKEND', 'int8')
+    monkeypatch.setattr(app, 'select_backend', select_backend)
+    monkeypatch.setattr(app, 'job_runner', FakeRunner())
+    if 'app_simple' in sys.modules:
+        monkeypatch.setattr(sys.modules['app_simple'], 'job_runner', FakeRunner())
+    return conf, built
+
+
+def test_the_preloading_master_leaves_the_backend_to_the_workers(master):
+    conf, built = master
+
+    app.load_model()
+
+    assert app.defer_backend
+    assert app.model_state == 'loaded'
+    assert type(app.sentiment_backend) is TorchBackend
+    assert app.backend_pending
+    assert built == []  # no agreement check (nor thread pools) before the fork
+
+
+def test_each_worker_builds_the_backend_in_post_fork(master):
+    conf, built = master
+    app.load_model()
+
+    conf.post_fork(server=None, worker=None)
+
+    assert built == [('int8', os.getpid())]
+    assert app.sentiment_backend.name == 'int8'
+    assert not app.backend_pending
+    assert app.job_runner.started == 1
+
+    conf.post_fork(server=None, worker=None)
+    assert len(built) == 1
+
+
+def test_a_worker_loading_the_model_itself_builds_the_backend_with_it(master):
+    conf, built = master
+    app.model_state = 'loading'  # the master forked before its loader thread finished
+    app.model_loader_pid = -1
+
+    conf.post_fork(server=None, worker=None)
+
+    assert app.model_state == 'loaded'
+    assert built == [('int8', os.getpid())]
+    assert app.sentiment_backend.name == 'int8'
+    assert not app.backend_pending
@@ -0,0 +1,79 @@
+import os
+import random
+
+import pytest
+
+from html_text import VisibleTextExtractor, extract_visible_text
+
+bs4 = pytest.importorskip('bs4')
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures', 'pages')
+
+
+def beautifulsoup_text(html, max_chars=1000):
+    """The extract_text that html_text.py replaced"""
+    soup = bs4.BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)[:max_chars]
+
+
+@pytest.mark.parametrize('html', [
+    '<p>a</p><template><p>hidden</p></template><p>b</p>',
+    '<div>x<template>t<template>u</template>v</template>y</div>',
+    '<ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby> after',
+    '<ruby>a<rt>b<rt>c</ruby>d',
+    '<p>a<!-- comment -->b</p><script>var x = "</p>";</script><style>p {}</style>c',
+    '<pre>  keep\n  spaces  </pre><textarea>  x  </textarea>',
+    '<p>x<![CDATA[cd]]>y</p><p>&amp; &nbsp;z</p>',
+    '<div>\n  <span>one</span>\n  <span>two</span>  three\r\nfour</div></span></div>',
+])
+def test_matches_beautifulsoup(html):
+    assert extract_visible_text(html) == beautifulsoup_text(html)
+
+
+def test_matches_beautifulsoup_on_random_markup():
+    tags = ['p', 'div', 'span', 'template', 'rt', 'rp', 'ruby', 'pre', 'textarea', 'br', 'img', 'b', 'li']
+    texts = ['hello', '  ', '\n', ' world ', '&amp;', 'x  y', '\t', 'café', '<!-- c -->', '\r\n']
+    rng = random.Random(0)
+    for _ in range(2000):
+        html = ''.join(
+            rng.choice([f"<{rng.choice(tags)}>", f"</{rng.choice(tags)}>", rng.choice(texts), rng.choice(texts)])
+            for _ in range(rng.randint(1, 25))
+        )
+        assert extract_visible_text(html) == beautifulsoup_text(html), html
+
+
+FIXTURE_PAGES = sorted(
+    os.path.relpath(os.path.join(directory, name), PAGES_DIR)
+    for directory, _, names in os.walk(PAGES_DIR) for name in names
+)
+
+
+@pytest.mark.parametrize('page', FIXTURE_PAGES)
+def test_matches_beautifulsoup_on_fixture_pages(page):
+    with open(os.path.join(PAGES_DIR, page), encoding='utf-8') as f:
+        html = f.read()
+    assert extract_visible_text(html) == beautifulsoup_text(html)
+
+
+def test_streamed_chunks_give_the_same_text():
+    html = '<html><body>' + ''.join(f"<p>Paragraph {i} about café work</p>\n" for i in range(200)) + '</body></html>'
+    body = html.encode('utf-8')
+    extractor = VisibleTextExtractor(1000, encoding='utf-8')
+    for start in range(0, len(body), 7):  # splits multi-byte characters too
+        if extractor.feed_bytes(body[start:start + 7]):
+            break
+
+    assert extractor.get_text() == beautifulsoup_text(html)
+    assert extractor.bytes_read < len(body)  # stopped once it had enough text
+
+
+def test_reading_stops_at_the_byte_limit():
+    extractor = VisibleTextExtractor(1000, max_bytes=64)
+
+    assert not extractor.feed_bytes(b'<p>' + b' ' * 32)
+    assert extractor.feed_bytes(b' ' * 32)
@@ -0,0 +1,184 @@
+import time
+
+import pytest
+import requests
+
+from http_client import (
+    ROBOTS_USER_AGENT, SCRAPE_USER_AGENT, HttpClient, RateLimited, RateLimits, RobotsCache, RobotsDisallowed,
+    TokenBucket, backoff_delay, is_retryable_error, parse_rate
+)
+from page_cache import PageCache
+
+ROBOTS_TXT = 'User-agent: ImpactMatchBot\nDisallow: /private\n\nUser-agent: *\nDisallow:\n'
+
+
+def response(status, text='', headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = text.encode('utf-8')
+    r._content_consumed = True
+    r.headers.update(headers or {})
+    return r
+
+
+class FakeSession:
+    """Answers requests with the given responses (or raises the given errors) in turn, recording what was sent"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def request(self, method, url, **kwargs):
+        self.sent.append((method, url, kwargs))
+        answer = self.responses.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def client_with(session, robots=None):
+    client = HttpClient(RateLimits('0', ''), robots or RobotsCache())
+    client.session = lambda: session
+    return client
+
+
+def test_parse_rate():
+    assert parse_rate('2:4') == (2.0, 4.0)
+    assert parse_rate('0.5') == (0.5, 1.0)
+    assert parse_rate('0') is None
+
+
+def test_a_bucket_hands_out_its_burst_then_queues_callers():
+    bucket = TokenBucket(rate=10, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+    assert bucket.reserve(max_wait=0.1) is None  # nothing taken
+    assert bucket.reserve() == pytest.approx(0.3, abs=0.01)
+
+
+def test_domains_share_a_bucket_and_a_wait_past_the_deadline_is_refused():
+    limits = RateLimits('0', 'duckduckgo.com=1:1')
+
+    assert limits.bucket('example.org') is None
+    assert limits.bucket('html.duckduckgo.com') is limits.bucket('duckduckgo.com')
+    assert limits.reserve('duckduckgo.com', deadline=time.monotonic() + 5) == 0
+    assert limits.reserve('duckduckgo.com', deadline=time.monotonic() + 0.1) is None
+
+
+def test_backoff_honours_retry_after_up_to_the_cap():
+    assert backoff_delay(0, '3', cap=8) == 3
+    assert backoff_delay(0, '60', cap=8) == 8
+    assert backoff_delay(0, 'Wed, 01 Jan 2020 00:00:00 GMT') == 0
+    assert all(0 <= backoff_delay(3, base=0.5, cap=8) <= 4 for _ in range(100))
+    assert all(0 <= backoff_delay(10, 'soon', base=0.5, cap=8) <= 8 for _ in range(100))
+
+
+def test_retryable_errors():
+    assert is_retryable_error(Exception('202 Ratelimit'))
+    assert is_retryable_error(Exception('HTTP 503 from server'))
+    assert not is_retryable_error(Exception('HTTP 404 not found'))
+
+
+def test_5xx_answers_are_retried_and_other_answers_returned(monkeypatch):
+    monkeypatch.setattr('http_client.backoff_delay', lambda attempt, retry_after=None: 0)
+    session = FakeSession(response(503), response(429), response(404))
+    client = client_with(session)
+
+    assert client.get('https://a.org/', retries=2).status_code == 404
+    assert len(session.sent) == 3
+    assert client.stats()['retries'] == {'503': 1, '429': 1}
+
+
+def test_no_retry_is_made_past_the_deadline():
+    session = FakeSession(response(503, headers={'Retry-After': '5'}))
+    client = client_with(session)
+
+    assert client.get('https://a.org/', deadline=time.monotonic() + 1).status_code == 503
+    assert len(session.sent) == 1
+
+
+def test_robots_txt_is_fetched_with_the_scraper_user_agent_and_matched_with_the_bot_token():
+    session = FakeSession(response(200, ROBOTS_TXT))
+    client = client_with(session)
+
+    assert not client.allowed('https://a.org/private/report')
+    assert client.allowed('https://a.org/about')
+    assert len(session.sent) == 1
+    method, url, kwargs = session.sent[0]
+    assert (method, url) == ('GET', 'https://a.org/robots.txt')
+    assert kwargs['headers'] == {'User-Agent': SCRAPE_USER_AGENT}
+    assert client.stats()['robots'] == {'hosts': 1, 'disallowed': 1}
+    assert ROBOTS_USER_AGENT == 'ImpactMatchBot'
+    assert 'ImpactMatchBot/' in SCRAPE_USER_AGENT
+
+
+def test_a_robots_fetch_the_rate_limit_kept_back_is_not_cached():
+    session = FakeSession()
+    client = HttpClient(RateLimits('1:1', ''), RobotsCache())
+    client.session = lambda: session
+    client.limits.reserve('a.org')  # the only token
+
+    with pytest.raises(RateLimited):
+        client.get('https://a.org/page', respect_robots=True, deadline=time.monotonic() + 0.2)
+    assert session.sent == []
+    assert client.robots.get('https://a.org') == (False, None)
+
+
+def test_a_robots_timeout_is_cached_only_when_the_deadline_did_not_cut_it_short():
+    client = client_with(FakeSession(requests.Timeout('slow'), requests.Timeout('slow')))
+
+    with pytest.raises(requests.Timeout):
+        client.allowed('https://a.org/page', deadline=time.monotonic() + 1)
+    assert client.robots.get('https://a.org') == (False, None)
+
+    assert client.allowed('https://a.org/page')
+    assert client.robots.get('https://a.org') == (True, None)  # unreachable: allows everything for a while
+
+
+def test_the_generic_rules_apply_to_other_user_agents():
+    client = client_with(FakeSession(response(200, ROBOTS_TXT)), RobotsCache(user_agent='*'))
+
+    assert client.allowed('https://a.org/private/report')
+
+
+def test_a_disallowed_url_is_not_requested():
+    session = FakeSession(response(200, 'User-agent: *\nDisallow: /\n'))
+    client = client_with(session)
+
+    with pytest.raises(RobotsDisallowed):
+        client.get('https://a.org/page', respect_robots=True)
+    assert [url for _, url, _ in session.sent] == ['https://a.org/robots.txt']
+
+
+@pytest.fixture
+def probe(monkeypatch, tmp_path):
+    """app_simple.probe_url against a fresh probe cache and a HEAD that raises the given error"""
+    pytest.importorskip('flask')
+    import app_simple
+
+    cache = PageCache('probe', path=str(tmp_path / 'probes.db'))
+    monkeypatch.setattr(app_simple, 'probe_cache', cache)
+
+    def probe_with(error):
+        class Outbound:
+            def head(self, url, **kwargs):
+                raise error
+
+        monkeypatch.setattr(app_simple, 'outbound', Outbound())
+        return app_simple.probe_url('https://www.goonj.org'), cache.get('https://www.goonj.org')
+    return probe_with
+
+
+@pytest.mark.parametrize('error', [RateLimited('busy'), RobotsDisallowed('no')], ids=['rate_limited', 'robots'])
+def test_a_probe_that_was_never_sent_is_not_cached(probe, error):
+    assert probe(error) == (False, None)
+
+
+def test_an_unreachable_probe_is_cached_as_a_failure(probe):
+    found, cached = probe(requests.ConnectionError('refused'))
+
+    assert not found
+    assert cached.status == 0
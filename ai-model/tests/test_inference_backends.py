@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('transformers')
+from tokenizers import Tokenizer, models, pre_tokenizers, trainers  # noqa: E402
+from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaForSequenceClassification  # noqa: E402
+
+import inference_backends  # noqa: E402
+from inference_backends import TorchBackend, load_corpus, onnx_path, select_backend  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def tiny_model():
+    """A small randomly initialised RoBERTa and a word-level tokenizer trained on the agreement corpus"""
+    torch.manual_seed(0)
+    word_tokenizer = Tokenizer(models.WordLevel(unk_token='<unk>'))
+    word_tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    word_tokenizer.train_from_iterator(
+        load_corpus(), trainers.WordLevelTrainer(special_tokens=['<s>', '<pad>', '</s>', '<unk>'])
+    )
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=word_tokenizer, bos_token='<s>', eos_token='</s>', pad_token='<pad>', unk_token='<unk>'
+    )
+    model = RobertaForSequenceClassification(RobertaConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=520, pad_token_id=tokenizer.pad_token_id, num_labels=3
+    )).eval()
+    return model, tokenizer
+
+
+class CopiedBackend(TorchBackend):
+    """A 'compiled' backend that gives the reference's answers"""
+
+    name = 'int8'
+
+
+class ShiftedBackend(CopiedBackend):
+    """A 'compiled' backend that predicts the label after the reference's, so never agrees with it"""
+
+    def predict_proba(self, inputs):
+        return super().predict_proba(inputs).roll(1, dims=-1)
+
+
+def test_the_onnx_graph_is_named_after_the_weights_files(tiny_model, tmp_path):
+    model, _ = tiny_model
+    model_dir = str(tmp_path / 'model')
+    model.save_pretrained(model_dir)
+
+    first = onnx_path(model, model_dir, str(tmp_path / 'cache'))
+    assert onnx_path(model, model_dir, str(tmp_path / 'cache')) == first
+
+    weights = [os.path.join(model_dir, entry) for entry in os.listdir(model_dir) if entry.endswith('.safetensors')]
+    os.utime(weights[0], ns=(0, 0))  # new weights dropped in place
+
+    assert onnx_path(model, model_dir, str(tmp_path / 'cache')) != first
+    assert first.endswith('.onnx')
+
+
+def test_a_hub_model_without_local_files_is_named_after_its_weights(tiny_model, tmp_path):
+    model, _ = tiny_model
+    first = onnx_path(model, 'org/sentiment', str(tmp_path))
+
+    with torch.no_grad():
+        model.classifier.out_proj.bias[0] += 1
+    try:
+        assert onnx_path(model, 'org/sentiment', str(tmp_path)) != first
+    finally:
+        with torch.no_grad():
+            model.classifier.out_proj.bias[0] -= 1
+    assert onnx_path(model, 'org/sentiment', str(tmp_path)) == first
+    assert os.path.basename(first).startswith('org_sentiment.')
+
+
+def test_a_backend_that_fails_to_load_falls_back_to_pytorch(tiny_model, monkeypatch):
+    model, tokenizer = tiny_model
+
+    def load_backend(name, model, tokenizer, model_name):
+        raise ImportError('No module named onnxruntime')
+
+    monkeypatch.setattr(inference_backends, 'load_backend', load_backend)
+
+    backend = select_backend('onnx', model, tokenizer, 'tiny')
+
+    assert type(backend) is TorchBackend
+
+
+def test_a_backend_below_the_minimum_agreement_is_rejected(tiny_model, monkeypatch):
+    model, tokenizer = tiny_model
+    monkeypatch.setattr(inference_backends, 'load_backend', lambda name, model, tokenizer, model_name: ShiftedBackend(model))
+
+    assert type(select_backend('int8', model, tokenizer, 'tiny')) is TorchBackend
+    assert type(select_backend('int8', model, tokenizer, 'tiny', check=False)) is ShiftedBackend
+
+
+def test_a_backend_that_agrees_is_used(tiny_model, monkeypatch):
+    model, tokenizer = tiny_model
+    monkeypatch.setattr(inference_backends, 'load_backend', lambda name, model, tokenizer, model_name: CopiedBackend(model))
+    monkeypatch.setattr(inference_backends, 'MIN_AGREEMENT', 1.0)
+
+    assert type(select_backend('int8', model, tokenizer, 'tiny')) is CopiedBackend
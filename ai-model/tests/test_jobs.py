@@ -0,0 +1,175 @@
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import jobs
+from jobs import JobQueueFull, JobRunner, JobStore, check_callback_host, send_callback, validate_callback_url
+
+PUBLIC = '93.184.216.34'
+
+
+@pytest.fixture
+def resolve(monkeypatch):
+    """Make getaddrinfo answer from a host -> addresses table"""
+    table = {}
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host not in table:
+            raise socket.gaierror('unknown host')
+        return [(socket.AF_INET6 if ':' in a else socket.AF_INET, socket.SOCK_STREAM, 6, '', (a, 0)) for a in table[host]]
+
+    monkeypatch.setattr(jobs.socket, 'getaddrinfo', getaddrinfo)
+    return table
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore('test', path=str(tmp_path / 'jobs.db'), max_queued=3)
+
+
+def test_a_public_callback_url_is_accepted(resolve):
+    resolve['hooks.example'] = [PUBLIC, '2606:2800:220:1:248:1893:25c8:1946']
+
+    assert validate_callback_url('https://hooks.example/done') == 'https://hooks.example/done'
+    assert validate_callback_url('') is None
+    assert validate_callback_url(None) is None
+
+
+@pytest.mark.parametrize('address', [
+    '127.0.0.1', '10.1.2.3', '172.16.0.1', '192.168.1.1', '169.254.169.254', '0.0.0.0', '100.64.0.1',
+    '240.0.0.1', '224.0.0.1', '::1', 'fe80::1%eth0', 'fd00::1', '::ffff:127.0.0.1'
+])
+def test_callback_hosts_resolving_to_internal_addresses_are_rejected(resolve, address):
+    resolve['hooks.example'] = [PUBLIC, address]
+
+    with pytest.raises(ValueError, match='non-public'):
+        validate_callback_url('https://hooks.example/done')
+
+
+@pytest.mark.parametrize('url', ['ftp://hooks.example/', 'https:///path', 'hooks.example/done', 42])
+def test_malformed_callback_urls_are_rejected(url):
+    with pytest.raises(ValueError):
+        validate_callback_url(url)
+
+
+def test_unresolvable_callback_hosts_are_rejected(resolve):
+    with pytest.raises(ValueError, match='does not resolve'):
+        validate_callback_url('https://nowhere.example/')
+
+
+def test_an_allowlist_admits_only_its_hosts(resolve):
+    resolve['backend.internal'] = ['10.0.0.5']
+    resolve['hooks.example'] = [PUBLIC]
+
+    check_callback_host('Backend.Internal', {'backend.internal'})
+    with pytest.raises(ValueError, match='JOB_CALLBACK_ALLOWED_HOSTS'):
+        check_callback_host('hooks.example', {'backend.internal'})
+
+
+def test_callbacks_are_checked_again_when_sent(resolve, monkeypatch):
+    resolve['hooks.example'] = [PUBLIC]
+    validate_callback_url('https://hooks.example/done')
+    resolve['hooks.example'] = ['127.0.0.1']  # DNS changed since the job was submitted
+    posted = []
+    monkeypatch.setattr(jobs.outbound, 'post', lambda *args, **kwargs: posted.append(args))
+
+    status = send_callback('https://hooks.example/done', {'job_id': 'abc'})
+
+    assert status.startswith('refused:')
+    assert posted == []
+
+
+def test_callbacks_do_not_follow_redirects(resolve, monkeypatch):
+    resolve['hooks.example'] = [PUBLIC]
+    sent = {}
+
+    class Response:
+        ok, status_code = False, 302
+
+    def post(url, **kwargs):
+        sent.update(kwargs)
+        return Response()
+
+    monkeypatch.setattr(jobs.outbound, 'post', post)
+
+    assert send_callback('https://hooks.example/done', {'job_id': 'abc'}) == 'failed: HTTP 302'
+    assert sent['allow_redirects'] is False
+    assert sent['headers'] == {'X-Job-Id': 'abc'}
+
+
+def test_a_job_goes_from_queued_to_done(store):
+    job = store.create('Goonj', {'max_age': 60})
+    assert job['status'] == 'queued'
+
+    claimed = store.claim(job['job_id'])
+    assert claimed == {'job_id': job['job_id'], 'ngo_name': 'Goonj', 'params': {'max_age': 60}, 'callback_url': None}
+    assert store.claim(job['job_id']) is None  # only one worker gets it
+    assert store.get(job['job_id'])['status'] == 'running'
+
+    store.finish(job['job_id'], result={'trust_score': 80})
+
+    finished = store.get(job['job_id'])
+    assert (finished['status'], finished['result'], finished['attempts']) == ('done', {'trust_score': 80}, 1)
+    assert store.stats() == {'queued': 0, 'running': 0, 'done': 1, 'failed': 0}
+
+
+def test_failed_jobs_keep_their_error(store):
+    job_id = store.create('Goonj')['job_id']
+    store.claim(job_id)
+    store.finish(job_id, error=RuntimeError('search failed'))
+
+    assert store.get(job_id)['status'] == 'failed'
+    assert store.get(job_id)['error'] == 'search failed'
+
+
+def test_the_queue_is_bounded(store):
+    for _ in range(3):
+        store.create('Goonj')
+
+    with pytest.raises(JobQueueFull):
+        store.create('Goonj')
+
+
+def test_recover_requeues_jobs_of_dead_workers_and_fails_exhausted_ones(store):
+    orphan = store.create('Orphan')['job_id']
+    exhausted = store.create('Exhausted')['job_id']
+    alive = store.create('Alive')['job_id']
+    for job_id in (orphan, exhausted, alive):
+        store.claim(job_id)
+    finished_process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    finished_process.wait()
+    store._connect().execute(
+        'UPDATE jobs SET owner_pid = ? WHERE id IN (?, ?)', (finished_process.pid, orphan, exhausted)
+    )
+    store._connect().execute('UPDATE jobs SET attempts = 3 WHERE id = ?', (exhausted,))
+
+    assert store.recover(max_attempts=3) == [orphan]
+    assert store.get(orphan)['status'] == 'queued'
+    assert store.get(exhausted)['status'] == 'failed'
+    assert store.get(alive)['status'] == 'running'
+
+
+def test_recover_takes_over_jobs_whose_lease_ran_out(store):
+    job_id = store.create('Goonj')['job_id']
+    store.claim(job_id)
+    store._connect().execute("UPDATE jobs SET owner_host = 'elsewhere', lease_until = 0 WHERE id = ?", (job_id,))
+
+    assert store.recover() == [job_id]
+
+
+def test_the_runner_executes_submitted_jobs(store):
+    finished = threading.Event()
+
+    def run_job(ngo_name, params):
+        finished.set()
+        return {'ngo_name': ngo_name, **params}
+
+    runner = JobRunner(store, run_job, max_workers=1)
+    job_id = runner.submit('Goonj', {'max_age': 5})['job_id']
+    assert finished.wait(5)
+    runner._executor.shutdown(wait=True)
+
+    assert store.get(job_id)['result'] == {'ngo_name': 'Goonj', 'max_age': 5}
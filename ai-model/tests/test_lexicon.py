@@ -0,0 +1,59 @@
+import random
+import re
+from collections import Counter
+
+from lexicon import LexiconMatcher, load_lexicons
+
+LEXICONS = load_lexicons()
+INDICATORS = {category: LEXICONS[category] for category in ('positive', 'negative', 'neutral')}
+
+
+def per_term_counts(lexicons, text):
+    """One whole-word regex per term: what the compiled single-pass pattern must reproduce"""
+    counts = {}
+    for category, terms in lexicons.items():
+        found = Counter()
+        for term in terms:
+            pattern = re.escape(term.rstrip('*').lower()) + (r'\w*' if term.endswith('*') else '')
+            occurrences = len(re.findall(r'\b' + pattern + r'\b', text, re.IGNORECASE))
+            if occurrences:
+                found[term.lower()] += occurrences
+        counts[category] = dict(found)
+    return counts
+
+
+def test_single_pass_matches_per_term_regexes_on_the_shipped_lexicons():
+    matcher = LexiconMatcher(INDICATORS)
+    words = [term.rstrip('*') for terms in INDICATORS.values() for term in terms]
+    words += [word + ending for word in words for ending in ('s', 'ed', 'ies', 'x')]
+    words += ['mongo', 'ngos', 'scammer', 'trusty', 'Fraud.', 'non', 'profit', 'x-ngo', 'CHARITY', '', '--']
+    rng = random.Random(0)
+
+    for _ in range(500):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(0, 40)))
+        assert matcher.count(text) == per_term_counts(INDICATORS, text), text
+
+
+def test_terms_match_whole_words_only():
+    matcher = LexiconMatcher({'positive': ['ngo*'], 'negative': ['fake']})
+
+    assert matcher.count('Mongo db, fakes and an NGO with NGOs') == {'positive': {'ngo*': 2}, 'negative': {}}
+
+
+def test_an_exact_term_wins_over_a_prefix_and_the_longest_prefix_wins():
+    matcher = LexiconMatcher({'a': ['help*', 'helpful*'], 'b': ['helping']})
+
+    assert matcher.count('helping helper helpfulness') == {'a': {'help*': 1, 'helpful*': 1}, 'b': {'helping': 1}}
+
+
+def test_a_term_may_belong_to_several_categories():
+    matcher = LexiconMatcher({'legitimate_name': ['trust'], 'neutral': ['trust', 'society']})
+
+    assert matcher.count('Seva Trust') == {'legitimate_name': {'trust': 1}, 'neutral': {'trust': 1}}
+    assert matcher.matches_any('Seva Society', 'neutral')
+    assert not matcher.matches_any('Seva Society', 'legitimate_name')
+    assert not matcher.matches_any('')
+
+
+def test_an_empty_lexicon_matches_nothing():
+    assert LexiconMatcher({'positive': []}).count('anything') == {'positive': {}}
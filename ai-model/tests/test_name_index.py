@@ -0,0 +1,127 @@
+import pytest
+
+from name_index import NameIndex, trigrams
+
+
+@pytest.fixture
+def index(tmp_path):
+    names = NameIndex('test', path=str(tmp_path / 'names.db'))
+    names.add('Akshaya Patra Foundation')
+    names.add('Goonj')
+    return names
+
+
+def test_same_canonical_key_resolves_to_the_recorded_name(index):
+    assert index.resolve('The Akshaya Patra foundation.') == {
+        'name': 'Akshaya Patra Foundation', 'key': 'akshaya patra foundation', 'match': 'exact', 'similarity': 1.0
+    }
+
+
+def test_another_legal_suffix_is_another_ngo(index):
+    index.add('Helping Hands Society')
+
+    match = index.resolve('Helping Hands Trust')
+
+    assert match['name'] == 'Helping Hands Trust'
+    assert match['match'] == 'new'  # far below the match threshold once the suffixes differ
+    assert index.resolve('Helping Hands Soc')['match'] != 'exact'
+
+
+def test_a_close_name_is_verified_as_submitted_with_a_suggestion(index):
+    strict = NameIndex('test', path=index.path, reuse_threshold=0.95)
+
+    match = strict.resolve('Akshya Patra Foundation')
+
+    assert match['name'] == 'Akshya Patra Foundation'
+    assert match['key'] == 'akshya patra foundation'
+    assert match['match'] == 'fuzzy'
+    assert not match['reused']
+    assert match['suggestion'] == 'Akshaya Patra Foundation'
+    assert strict.threshold <= match['similarity'] < strict.reuse_threshold
+
+
+def test_a_near_duplicate_with_the_same_suffix_and_id_reuses_the_record(index):
+    match = index.resolve('Akshya Patra Foundation')
+
+    assert match['name'] == 'Akshaya Patra Foundation'
+    assert match['key'] == 'akshaya patra foundation'
+    assert match['match'] == 'fuzzy'
+    assert match['reused']
+    assert match['similarity'] >= index.reuse_threshold
+    assert index.stats()['reused'] == 1
+
+
+def test_a_near_duplicate_is_not_reused_when_the_suffix_or_id_differs(index):
+    index.add('Helping Hands Society', registration_id='MH/2016/0098765')
+
+    assert index.resolve('Helpng Hands Society', 'mh 2016 0098765')['reused']
+    assert not index.resolve('Helpng Hands Society')['reused']
+    assert not index.resolve('Helpng Hands Society', 'KA/2017/0123456')['reused']
+    assert not index.resolve('Akshaya Patra Foundation Trust')['reused']
+
+
+def test_unrelated_and_short_names_are_new(index):
+    assert index.resolve('Smile Foundation')['match'] == 'new'
+    assert index.resolve('Goonja')['match'] == 'new'  # under NAME_MATCH_MIN_LENGTH, exact only
+    assert index.stats()['new'] == 2
+
+
+def test_records_added_by_another_worker_are_found(index, tmp_path):
+    other = NameIndex('test', path=index.path)
+    assert other.resolve('Smile Foundation')['match'] == 'new'
+
+    index.add('Smile Foundation')
+
+    assert other.resolve('smile foundation')['match'] == 'exact'
+
+
+def test_the_first_name_verified_for_a_key_stays_its_name(index):
+    index.add('AKSHAYA PATRA FOUNDATION')
+
+    assert index.resolve('akshaya patra foundation')['name'] == 'Akshaya Patra Foundation'
+
+
+def test_trigrams_mark_word_boundaries():
+    assert trigrams('ab') == {'  a', ' ab', 'ab '}
+
+
+@pytest.fixture
+def simple_engine(monkeypatch):
+    """app_simple with Helping Hands Foundation verified (score 95), recording the pipeline runs (score 40)"""
+    pytest.importorskip('flask')
+    import app_simple
+
+    app_simple.name_index.add('Helping Hands Foundation')
+    app_simple.verification_cache.put('Helping Hands Foundation', {'ngo_name': 'Helping Hands Foundation',
+                                                                   'trust_score': 95})
+    computed = []
+
+    def compute_verification(ngo_name, deadline_ms=None, registration_id=None):
+        computed.append(ngo_name)
+        return {'ngo_name': ngo_name, 'trust_score': 40}
+
+    monkeypatch.setattr(app_simple, 'compute_verification', compute_verification)
+    return app_simple, computed
+
+
+def test_a_name_with_another_suffix_does_not_reuse_the_cached_verdict(simple_engine):
+    app_simple, computed = simple_engine
+
+    exact = app_simple.get_verification('The Helping Hands Foundation')
+    other = app_simple.get_verification('Helping Hands Trust')
+    close = app_simple.get_verification('Helping Hands Foundation Trust')
+
+    assert (exact['cached'], exact['trust_score']) == (True, 95)
+    assert computed == ['Helping Hands Trust', 'Helping Hands Foundation Trust']
+    assert (other['trust_score'], close['trust_score']) == (40, 40)
+    assert close['canonical']['suggestion'] == 'Helping Hands Foundation'
+
+
+def test_a_near_duplicate_reuses_the_cached_verdict(simple_engine):
+    app_simple, computed = simple_engine
+
+    result = app_simple.get_verification('Helpng Hands Foundation')
+
+    assert computed == []
+    assert (result['cached'], result['trust_score']) == (True, 95)
+    assert result['canonical']['reused']
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from page_cache import PageCache, conditional_headers, is_cacheable
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache('page', path=str(tmp_path / 'pages.db'), fresh_seconds=60, negative_seconds=60)
+
+
+def test_a_stored_page_comes_back_fresh_with_its_validators(cache):
+    cache.put('https://a.org/', 'About us', 200, '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT')
+
+    cached = cache.get('https://a.org/')
+
+    assert (cached.text, cached.status, cached.etag, cached.last_modified) == (
+        'About us', 200, '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT'
+    )
+    assert cached.fresh
+    assert cache.get('https://b.org/') is None
+
+
+def test_namespaces_do_not_share_entries(cache):
+    probes = PageCache('probe', path=cache.path)
+    cache.put('https://a.org/', 'text')
+
+    assert probes.get('https://a.org/') is None
+    assert probes.stats()['entries'] == 0
+    assert cache.stats()['entries'] == 1
+
+
+def test_failures_go_stale_after_the_shorter_negative_window(tmp_path):
+    cache = PageCache('probe', path=str(tmp_path / 'pages.db'), fresh_seconds=60, negative_seconds=0.05)
+    cache.put('https://ok.org/', status=200)
+    cache.put('https://down.org/', status=0)
+    cache.put('https://gone.org/', status=404)
+    time.sleep(0.1)
+
+    assert cache.get('https://ok.org/').fresh
+    assert not cache.get('https://down.org/').fresh
+    assert not cache.get('https://gone.org/').fresh
+
+
+def test_revalidation_makes_a_stale_entry_fresh_again(tmp_path):
+    cache = PageCache('page', path=str(tmp_path / 'pages.db'), fresh_seconds=0.05)
+    cache.put('https://a.org/', 'About us', 200, '"v1"')
+    time.sleep(0.1)
+    assert not cache.get('https://a.org/').fresh
+
+    cache.revalidated('https://a.org/')
+
+    cached = cache.get('https://a.org/')
+    assert cached.fresh
+    assert (cached.text, cached.etag) == ('About us', '"v1"')
+
+
+def test_least_recently_used_entries_are_evicted_past_the_size_limit(tmp_path):
+    cache = PageCache('page', path=str(tmp_path / 'pages.db'), max_bytes=300)
+    for name in 'abc':
+        cache.put(f"https://{name}.org/", 'x' * 80)
+        time.sleep(0.01)
+    cache.get('https://a.org/')  # a becomes the most recently used
+    time.sleep(0.01)
+
+    cache.put('https://d.org/', 'x' * 80)
+
+    assert cache.get('https://b.org/') is None
+    assert all(cache.get(f"https://{name}.org/") for name in 'acd')
+    assert cache.stats()['bytes'] <= 300
+
+
+def test_conditional_headers_only_revalidate_successful_entries(cache):
+    cache.put('https://a.org/', 'text', 200, '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT')
+    cache.put('https://b.org/', 'text', 200, None, 'Mon, 01 Jan 2024 00:00:00 GMT')
+    cache.put('https://c.org/', '', 0, '"v1"')
+
+    assert conditional_headers(cache.get('https://a.org/')) == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'
+    }
+    assert conditional_headers(cache.get('https://b.org/')) == {'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert conditional_headers(cache.get('https://c.org/')) == {}
+    assert conditional_headers(None) == {}
+
+
+@pytest.mark.parametrize('cache_control, expected', [
+    (None, True), ('max-age=60', True), ('private, no-store', False), ('No-Store', False)
+])
+def test_is_cacheable_honours_no_store(cache_control, expected):
+    assert is_cacheable({'Cache-Control': cache_control} if cache_control else {}) is expected
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_a_304_serves_the_cached_text_and_refreshes_the_entry(tmp_path, monkeypatch):
+    pytest.importorskip('flask')
+    import app
+
+    stale = PageCache('page', path=str(tmp_path / 'pages.db'), fresh_seconds=0.05)
+    stale.put('https://a.org/', 'About us', 200, '"v1"')
+    time.sleep(0.1)
+    sent = {}
+
+    def get(link, headers, **kwargs):
+        sent.update(headers)
+        return FakeResponse(304)
+
+    monkeypatch.setattr(app, 'page_cache', stale)
+    monkeypatch.setattr(app.outbound, 'get', get)
+
+    assert app.fetch_page_text('https://a.org/', time.monotonic() + 5) == 'About us'
+    assert sent['If-None-Match'] == '"v1"'
+    assert stale.get('https://a.org/').fresh
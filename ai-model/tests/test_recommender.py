@@ -0,0 +1,157 @@
+import math
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from geo_index import haversine_km
+from recommender import (
+    PREDICT_DISTANCE_SCALE_KM, RECOMMENDATION_WEIGHTS, CauseMatrix, parse_cause_filter, parse_profile, recommend,
+    select_rows, tokenize, top_k
+)
+
+WORDS = 'water school health food teach medical tree river clean build read code design animal shelter'.split()
+CATEGORIES = ['education', 'health', 'environment', 'animals']
+
+
+def random_cause(rng, cause_id):
+    return {
+        'id': cause_id,
+        'title': ' '.join(rng.choices(WORDS, k=rng.randint(1, 4))),
+        'description': ' '.join(rng.choices(WORDS, k=rng.randint(0, 12))),
+        'category': rng.choice(CATEGORIES),
+        'requiredSkills': rng.sample(WORDS, rng.randint(0, 2)),
+        'location': {'lat': 12.9 + rng.uniform(-1, 1), 'lng': 77.6 + rng.uniform(-1, 1)}
+    }
+
+
+def cause_tokens(cause):
+    return tokenize(' '.join([cause['title'], cause['description'], cause['category'], *cause['requiredSkills']]))
+
+
+def reference_cosines(causes, vocabulary, query_terms):
+    """Cosine of every cause with the query over plain per-document TF-IDF dicts"""
+    documents = [Counter(cause_tokens(cause)) for cause in causes]
+    df = Counter(term for document in documents for term in document)
+    idf = {term: math.log((1 + len(documents)) / (1 + df[term])) + 1 for term in vocabulary}
+    query = {term: idf[term] for term in set(query_terms) if term in vocabulary}
+    query_norm = math.sqrt(sum(w * w for w in query.values()))
+    cosines = []
+    for document in documents:
+        length = sum(document.values())
+        weights = {term: count / length * idf[term] for term, count in document.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        cosines.append(sum(weights.get(t, 0) * w for t, w in query.items()) / (norm * query_norm) if query else 0.0)
+    return cosines
+
+
+def test_cosines_match_a_plain_tfidf_through_upserts_and_deletes():
+    rng = random.Random(0)
+    causes = {i: random_cause(rng, i) for i in range(200)}
+    matrix = CauseMatrix(list(causes.values()))
+    vocabulary = {term for cause in causes.values() for term in cause_tokens(cause)}
+
+    for round_ in range(6):
+        replaced = {i: random_cause(rng, i) for i in rng.sample(sorted(causes), 20)}
+        added = {1000 * (round_ + 1) + i: random_cause(rng, 1000 * (round_ + 1) + i) for i in range(10)}
+        removed = rng.sample(sorted(set(causes) - set(replaced)), 25)
+        matrix.upsert(list(replaced.values()) + list(added.values()))
+        matrix.delete(removed)
+        causes.update(replaced)
+        causes.update(added)
+        for cause_id in removed:
+            del causes[cause_id]
+        vocabulary |= {term for cause in list(replaced.values()) + list(added.values()) for term in cause_tokens(cause)}
+
+        query = rng.sample(WORDS, 3) + ['unknownword']
+        live = matrix.live_rows()
+        expected = reference_cosines([matrix.causes[row] for row in live], vocabulary, query)
+        assert len(live) == len(causes)
+        np.testing.assert_allclose(matrix.cosine(query)[live], expected, atol=1e-12)
+
+        subset = np.sort(rng.sample(list(live), 5))  # scored from the rows' own entries
+        scores = matrix.cosine(query, subset)
+        np.testing.assert_allclose(scores[subset], [expected[list(live).index(row)] for row in subset], atol=1e-12)
+        assert not np.delete(scores, subset).any()
+
+
+def test_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.random(1000)
+    rows = np.sort(rng.choice(1000, 300, replace=False))
+
+    assert list(top_k(scores, 10, rows)) == sorted(rows, key=lambda row: -scores[row])[:10]
+    assert list(top_k(scores, 500, rows)) == sorted(rows, key=lambda row: -scores[row])
+
+
+def test_recommendations_follow_the_documented_formula():
+    rng = random.Random(1)
+    causes = [random_cause(rng, i) for i in range(300)]
+    data = {
+        'userId': 'u1', 'interests': ['health', 'clean water'], 'skills': ['teach'],
+        'location': {'lat': 12.97, 'lng': 77.59}, 'topK': 300, 'causes': causes
+    }
+
+    response = recommend(data)
+
+    matrix = CauseMatrix(causes)
+    vocabulary = set(matrix.vocabulary)
+    interests = reference_cosines(causes, vocabulary, ['health', 'clean', 'water'])
+    skills = reference_cosines(causes, vocabulary, ['teach'])
+    expected = {}
+    for cause, interest, skill in zip(causes, interests, skills):
+        km = haversine_km(12.97, 77.59, cause['location']['lat'], cause['location']['lng'])
+        expected[cause['id']] = (
+            RECOMMENDATION_WEIGHTS['interests'] * interest
+            + RECOMMENDATION_WEIGHTS['category'] * (cause['category'] == 'health')
+            + RECOMMENDATION_WEIGHTS['skills'] * skill
+            + RECOMMENDATION_WEIGHTS['distance'] * math.exp(-km / PREDICT_DISTANCE_SCALE_KM)
+        )
+    assert [r['causeId'] for r in response['recommendations']] == sorted(expected, key=lambda i: -expected[i])
+    for recommendation in response['recommendations']:
+        assert recommendation['score'] == pytest.approx(expected[recommendation['causeId']], abs=1e-4)
+
+
+def test_reasons_and_distances():
+    causes = [
+        {'id': 'a', 'title': 'Teach kids to read', 'category': 'Education', 'location': {'lat': 12.97, 'lng': 77.59}},
+        {'id': 'b', 'name': 'River clean up', 'lat': 13.5, 'lng': 77.59},
+    ]
+    response = recommend({'interests': ['education'], 'skills': ['read'], 'location': {'lat': 12.97, 'lng': 77.59},
+                          'causes': causes})
+
+    first, second = response['recommendations']
+    assert first['causeId'] == 'a'
+    assert first['reason'] == 'Matches your interest in Education; Uses your skills: read; 0.0 km from you'
+    assert second['distanceKm'] == pytest.approx(58.9, abs=0.1)
+
+
+def test_select_rows_matches_a_brute_force_filter():
+    rng = random.Random(2)
+    causes = [random_cause(rng, i) for i in range(500)]
+    causes[7]['location'] = {}  # no coordinates: never within a distance
+    matrix = CauseMatrix(causes)
+    profile = parse_profile({'location': {'lat': 12.9, 'lng': 77.6}})
+    km = haversine_km(12.9, 77.6, matrix.lats, matrix.lngs)
+
+    rows = select_rows(matrix, profile, parse_cause_filter({'maxDistanceKm': 40, 'categories': ['Health']}))
+    expected = [i for i, cause in enumerate(causes) if cause['category'] == 'health' and km[i] <= 40]
+    assert list(rows) == expected
+
+    rows = select_rows(matrix, profile, parse_cause_filter({'nearest': 15, 'ids': list(range(0, 500, 2))}))
+    even = sorted((km[i], i) for i in range(0, 500, 2) if not np.isnan(km[i]))
+    assert list(rows) == sorted(i for _, i in even[:15])
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'interests': 5}, 'interests'),
+    ({'topK': 0}, 'topK'),
+    ({'matcher': 'bm25'}, 'matcher'),
+    ({'causes': []}, 'causes'),
+    ({'causes': [{'id': 1}], 'filter': {'radius': 5}}, 'Unknown filter'),
+    ({'causes': [{'id': 1}], 'filter': {'maxDistanceKm': 5}}, 'user location'),
+])
+def test_bad_requests_raise_value_errors(data, message):
+    with pytest.raises(ValueError, match=message):
+        recommend({'userId': 'u1', **data})
@@ -0,0 +1,181 @@
+import os
+
+import pytest
+
+from registry import Registry, registry_result
+
+DARPAN_CSV = (
+    'Name of the VO/NGO,Unique Id of VO/NGO,Registration No,State\n'
+    'Helping Hands Society,MH/2016/0098765,S-1234,Maharashtra\n'
+    'The Akshaya Patra Foundation,KA/2017/0123456,BLR-99,Karnataka\n'
+)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    source = tmp_path / 'darpan.csv'
+    source.write_text(DARPAN_CSV, encoding='utf-8')
+    return Registry(str(source), str(tmp_path / 'snapshot'), check_seconds=0)
+
+
+def test_a_name_matches_on_its_canonical_form(registry):
+    records, matched_by = registry.lookup('Helping Hands Trust')
+
+    assert matched_by == 'name'
+    assert [r['name'] for r in records] == ['Helping Hands Society']
+    assert records[0]['darpan_id'] == 'MH/2016/0098765'
+    assert records[0]['state'] == 'Maharashtra'
+
+
+def test_a_registration_id_matches_with_the_same_name(registry):
+    records, matched_by = registry.lookup('Akshaya Patra Foundation', 'ka 2017 0123456')
+
+    assert matched_by == 'registration_id'
+    assert [r['name'] for r in records] == ['The Akshaya Patra Foundation']
+    assert registry.lookup('Akshaya Patra', 'BLR-99')[1] == 'registration_id'
+
+
+def test_a_registration_id_with_another_name_is_ignored(registry):
+    assert registry.lookup('Goonj', 'KA/2017/0123456') == ([], None)
+    assert registry.lookup('Helping Hands', 'KA/2017/0123456')[1] == 'name'
+
+
+def test_no_source_loads_nothing(tmp_path):
+    empty = Registry(None, str(tmp_path / 'snapshot'))
+
+    assert empty.lookup('Helping Hands Society') == ([], None)
+    assert empty.stats() == {'loaded': False, 'source': None}
+
+
+def test_a_csv_without_a_name_column_is_not_loaded(tmp_path):
+    source = tmp_path / 'bad.csv'
+    source.write_text('Id,State\n1,Goa\n', encoding='utf-8')
+
+    assert not Registry(str(source), str(tmp_path / 'snapshot')).loaded
+
+
+def append_record(registry, line):
+    with open(registry.source_path, 'a', encoding='utf-8') as f:
+        f.write(line)
+    os.utime(registry.source_path, ns=(len(line), len(line)))
+
+
+def test_a_changed_export_is_rebuilt_off_the_request_path(registry):
+    append_record(registry, 'Goonj,DL/2010/0001111,G-1,Delhi\n')
+
+    registry.lookup('Goonj')  # starts the rebuild, answered from the mapped snapshot meanwhile
+    registry._builder.join(5)
+
+    assert registry.lookup('Goonj')[1] == 'name'
+    assert registry.stats()['records'] == 3
+
+
+def snapshot_files(registry, version):
+    return [name for name in os.listdir(registry.directory) if f".{version}." in name]
+
+
+def test_replaced_snapshots_are_deleted_only_after_the_grace_period(registry):
+    first = registry.stats()['version']
+    append_record(registry, 'Goonj,DL/2010/0001111,G-1,Delhi\n')
+    registry.refresh(force=True, background=False)
+    second = registry.stats()['version']
+
+    assert second != first
+    assert len(snapshot_files(registry, first)) == 6  # another worker may still map them
+
+    for name in snapshot_files(registry, first):
+        os.utime(os.path.join(registry.directory, name), (0, 0))
+    append_record(registry, 'Seva Mandir,RJ/2000/0002222,S-9,Rajasthan\n')
+    registry.refresh(force=True, background=False)
+
+    assert snapshot_files(registry, first) == []
+    assert len(snapshot_files(registry, second)) == 6
+    assert registry.lookup('Seva Mandir')[1] == 'name'
+
+
+def test_registry_result_leaves_out_the_lookup_keys(registry):
+    records, matched_by = registry.lookup('Helping Hands Society')
+
+    result = registry_result(records, matched_by)
+
+    assert result['matched_by'] == 'name'
+    assert set(result['records'][0]) == {'name', 'darpan_id', 'registration_no', 'state'}
+    assert registry_result([], None) is None
+
+
+@pytest.fixture
+def searches(monkeypatch, registry):
+    """Point app_simple at the test registry and record the web searches it runs"""
+    app_simple = pytest.importorskip('app_simple')
+    searched = []
+
+    def perform_web_search(ngo_name, max_results=10, deadline=None):
+        searched.append(ngo_name)
+        return [{'title': 'Fraud alert', 'url': 'https://news.example/scam', 'snippet': 'fraud scam complaint'}]
+
+    monkeypatch.setattr(app_simple, 'registry', registry)
+    monkeypatch.setattr(app_simple, 'perform_web_search', perform_web_search)
+    return searched
+
+
+def test_a_name_only_match_still_searches_the_web(searches):
+    import app_simple
+
+    result = app_simple.run_verification('Helping Hands Trust')
+
+    assert searches == ['Helping Hands Trust']
+    assert result['registry']['matched_by'] == 'name'
+    assert result['num_links'] == 1
+    assert any('Negative indicators' in note for note in result['notes'])
+    assert 'Listed in the NGO registry' in result['notes']
+
+
+def test_a_registration_id_match_skips_the_web_search(searches):
+    import app_simple
+
+    result = app_simple.run_verification('Helping Hands Society', registration_id='MH/2016/0098765')
+
+    assert searches == []
+    assert result['registry']['matched_by'] == 'registration_id'
+    assert 'No web search results - NGO listed in the registry' in result['notes']
+
+
+@pytest.fixture
+def full_searches(monkeypatch, registry):
+    """Point app at the test registry and record the web searches it runs (which find nothing)"""
+    app = pytest.importorskip('app')
+    searched = []
+
+    def search_ngo(ngo_name, max_results=10, deadline=None):
+        searched.append(ngo_name)
+        return [], []
+
+    monkeypatch.setattr(app, 'registry', registry)
+    monkeypatch.setattr(app, 'search_ngo', search_ngo)
+    return searched
+
+
+def test_the_full_engine_adds_a_name_match_to_the_web_checks(full_searches):
+    import app
+
+    listed = app.run_verification('Helping Hands Trust')
+    unlisted = app.run_verification('Goonj')
+
+    assert full_searches == ['Helping Hands Trust', 'Goonj']
+    assert listed['registry']['matched_by'] == 'name'
+    assert unlisted['registry'] is None
+    assert listed['trust_score'] - unlisted['trust_score'] == app.SCORING_WEIGHTS['registry_match']
+    assert f"Listed in the NGO registry (+{app.SCORING_WEIGHTS['registry_match']})" in listed['notes']
+
+
+def test_the_full_engine_answers_a_registration_id_match_offline(full_searches):
+    import app
+
+    result = app.run_verification('Helping Hands Society', registration_id='MH/2016/0098765')
+
+    weights = app.SCORING_WEIGHTS
+    assert full_searches == []
+    assert result['registry']['matched_by'] == 'registration_id'
+    assert result['trust_score'] == weights['base'] + weights['registry_match'] + weights['registry_confirmed']
+    assert result['trust_level'] == 'HIGH'
+    assert 'Web checks skipped - registration ID confirmed by the NGO registry' in result['notes']
@@ -0,0 +1,106 @@
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip('flask')
+import app  # noqa: E402
+import app_simple  # noqa: E402
+
+WEIGHT_OVERRIDES = {
+    app: {'wikipedia': 40, 'positive_sentiment': 12, 'links_none': -25, 'registry_match': 5, 'registry_confirmed': 30},
+    app_simple: {'registry_match': 30, 'negative_each': 4, 'sentiment': 40},
+}
+
+
+def full_inputs(rng):
+    links = [
+        rng.choice(['https://en.wikipedia.org/wiki/X', 'https://x.org/', 'https://x.gov.in/', 'https://x.com/a'])
+        for _ in range(rng.randint(0, 7))
+    ]
+    sentiment = {'label': rng.choice(['POSITIVE', 'NEGATIVE', 'NEUTRAL']), 'score': rng.random()}
+    registry = [{'name': 'Some NGO'}] if rng.random() < 0.3 else []
+    matched_by = rng.choice(['name', 'registration_id']) if registry else None
+    text_length = rng.choice([0, 499, 500, 3000, 3001, rng.randint(0, 10000)])
+    return 'Some NGO', sentiment, links, text_length, registry, matched_by
+
+
+def simple_inputs(rng):
+    results = [
+        {'title': rng.choice(['Official site', 'News', '']), 'url': rng.choice(['https://seva.org', 'https://news.com'])}
+        for _ in range(rng.randint(0, 12))
+    ]
+    score = round(rng.random(), 2)
+    analysis = {
+        'sentiment_score': score,
+        'sentiment_label': next(label for minimum, label in app_simple.SENTIMENT_LABELS if score >= minimum),
+        'positive_indicators': rng.randint(0, 12),
+        'negative_indicators': rng.randint(0, 4),
+        'neutral_indicators': rng.randint(0, 4),
+    }
+    registry = [{'name': 'Seva'}] if rng.random() < 0.3 else []
+    return rng.choice(['Seva', 'Seva Trust', 'Acme']), results, analysis, registry
+
+
+def scored_inputs(engine, rng, weights):
+    """(features, calculate_trust_score result) for one random verification"""
+    if engine is app:
+        name, sentiment, links, text_length, registry, matched_by = full_inputs(rng)
+        return (
+            app.scoring_features(sentiment, links, text_length, registry, matched_by),
+            app.calculate_trust_score(name, sentiment, links, text_length, weights, registry, matched_by)
+        )
+    name, results, analysis, registry = simple_inputs(rng)
+    return (
+        app_simple.scoring_features(name, results, analysis, registry),
+        app_simple.calculate_trust_score(name, results, analysis, weights, registry)
+    )
+
+
+@pytest.mark.parametrize('engine', [app, app_simple], ids=['full', 'simple'])
+@pytest.mark.parametrize('overrides', [False, True], ids=['default', 'overridden'])
+def test_vectorized_scores_match_calculate_trust_score(engine, overrides):
+    rng = random.Random(0)
+    weights = {**engine.SCORING_WEIGHTS, **(WEIGHT_OVERRIDES[engine] if overrides else {})}
+    rows, expected = [], []
+    for _ in range(2000):
+        features, trust_data = scored_inputs(engine, rng, weights)
+        rows.append([float(features[column]) for column in engine.FEATURE_COLUMNS])
+        expected.append(trust_data)
+
+    scores, levels = engine.score_features(np.array(rows), weights)
+
+    assert [round(float(score), 1) for score in scores] == [t['trust_score'] for t in expected]
+    assert list(levels) == [t['trust_level'] for t in expected]
+
+
+@pytest.mark.parametrize('engine', [app, app_simple], ids=['full', 'simple'])
+def test_rescore_rebuilds_the_cached_notes_from_the_new_weights(engine):
+    rng = random.Random(1)
+    weights = {**engine.SCORING_WEIGHTS, **WEIGHT_OVERRIDES[engine]}
+    stored = {}
+    for i in range(30):
+        features, trust_data = scored_inputs(engine, rng, engine.SCORING_WEIGHTS)
+        name = f"Rescore {engine.__name__} {i}"
+        engine.feature_store.put(name, features, trust_data['trust_score'])
+        engine.verification_cache.put(name, {'ngo_name': name, **trust_data})
+        stored[name] = features
+
+    engine.rescore(WEIGHT_OVERRIDES[engine], list(stored), update_cache=True)
+
+    for name, features in stored.items():
+        cached, _ = engine.verification_cache.get(name)
+        expected = engine.score_trust(features, weights)
+        assert cached['rescored'] is True
+        assert cached['trust_score'] == expected['trust_score']
+        assert cached['notes'] == expected['notes']
+
+
+def test_rescored_notes_quote_the_new_weights():
+    features = app.scoring_features({'label': 'NEUTRAL', 'score': 0.5}, ['https://en.wikipedia.org/wiki/Seva'], 100)
+    app.feature_store.put('Rescore Seva', features, 0)
+    app.verification_cache.put('Rescore Seva', {'ngo_name': 'Rescore Seva', 'notes': ['Found Wikipedia page (+15)']})
+
+    app.rescore({'wikipedia': 40}, ['Rescore Seva'], update_cache=True)
+
+    assert 'Found Wikipedia page (+40)' in app.verification_cache.get('Rescore Seva')[0]['notes']
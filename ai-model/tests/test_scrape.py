@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+import app  # noqa: E402
+
+
+@pytest.fixture
+def slow_pages(monkeypatch):
+    """Replace fetch_page_text with one whose per-link delay is set by the test"""
+    delays = {}
+    release = threading.Event()
+
+    def fetch(link, deadline):
+        if delays[link] is None:
+            release.wait(5)  # never answers in time
+        else:
+            time.sleep(delays[link])
+        return '' if link.endswith('empty/') else f"text of {link}"
+
+    monkeypatch.setattr(app, 'fetch_page_text', fetch)
+    yield delays
+    release.set()
+
+
+def test_scrape_pages_keeps_link_order(slow_pages):
+    slow_pages.update({'https://a.org/': 0.1, 'https://b.org/': 0.0, 'https://c.org/empty/': 0.0})
+
+    pages = app.scrape_pages(list(slow_pages), deadline_seconds=2)
+
+    # b answers first, but pages come back in link order; empty ones are dropped
+    assert pages == [('https://a.org/', 'text of https://a.org/'), ('https://b.org/', 'text of https://b.org/')]
+
+
+def test_scrape_pages_drops_pages_unfinished_at_the_deadline(slow_pages):
+    slow_pages.update({'https://a.org/': 0.0, 'https://slow.org/': None})
+
+    started = time.monotonic()
+    pages = app.scrape_pages(list(slow_pages), deadline_seconds=0.3)
+
+    assert time.monotonic() - started < 2
+    assert pages == [('https://a.org/', 'text of https://a.org/')]
+
+
+def test_scrape_pages_fetches_at_most_max_links(slow_pages):
+    slow_pages.update({f"https://{i}.org/": 0.0 for i in range(8)})
+
+    assert len(app.scrape_pages(list(slow_pages), max_links=3)) == 3
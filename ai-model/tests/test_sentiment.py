@@ -0,0 +1,96 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('transformers')
+pytest.importorskip('flask')
+from tokenizers import Tokenizer, models, pre_tokenizers, trainers  # noqa: E402
+from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaForSequenceClassification  # noqa: E402
+
+import app  # noqa: E402
+from inference_backends import TorchBackend  # noqa: E402
+from sentiment_batcher import SentimentBatcher  # noqa: E402
+
+CORPUS = [
+    'the foundation feeds children every school day and publishes audited accounts',
+    'volunteers report the trust as a scam with fraud complaints and unpaid staff',
+    'a registered charity working on education health and rural livelihoods',
+]
+
+
+def corpus_tokenizer():
+    """A word-level tokenizer over CORPUS"""
+    word_tokenizer = Tokenizer(models.WordLevel(unk_token='<unk>'))
+    word_tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    word_tokenizer.train_from_iterator(CORPUS, trainers.WordLevelTrainer(special_tokens=['<s>', '<pad>', '</s>', '<unk>']))
+    return PreTrainedTokenizerFast(
+        tokenizer_object=word_tokenizer, bos_token='<s>', eos_token='</s>', pad_token='<pad>', unk_token='<unk>'
+    )
+
+
+@pytest.fixture
+def tiny_model(monkeypatch):
+    """A small randomly initialised RoBERTa with a word-level tokenizer, installed as app's model"""
+    torch.manual_seed(0)
+    tokenizer = corpus_tokenizer()
+    model = RobertaForSequenceClassification(RobertaConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=80, pad_token_id=tokenizer.pad_token_id, num_labels=3
+    )).eval()
+
+    monkeypatch.setattr(app, 'tokenizer', tokenizer)
+    monkeypatch.setattr(app, 'sentiment_model', model)
+    monkeypatch.setattr(app, 'sentiment_backend', TorchBackend(model))
+    monkeypatch.setattr(app, 'sentiment_batcher', SentimentBatcher(app.run_sentiment_batch, max_wait_ms=1))
+    monkeypatch.setattr(app, 'SENTIMENT_WINDOW_TOKENS', 16)
+    monkeypatch.setattr(app, 'SENTIMENT_WINDOW_STRIDE', 4)
+    return tokenizer
+
+
+def reference_chunked(pages, tokenizer):
+    """The single padded forward pass analyze_sentiment_chunked made before it went through the batcher"""
+    inputs = tokenizer(
+        [text for _, text in pages], return_tensors='pt', padding=True, truncation=True,
+        max_length=16, stride=4, return_overflowing_tokens=True
+    )
+    window_pages = inputs.pop('overflow_to_sample_mapping')
+    scores = app.sentiment_backend.predict_proba(inputs)
+    weights = inputs['attention_mask'].sum(dim=-1).float()
+    overall = (scores * weights.unsqueeze(-1)).sum(dim=0) / weights.sum()
+    return window_pages, overall
+
+
+def test_chunked_sentiment_goes_through_the_batcher(tiny_model):
+    pages = [('https://a.org/', ' '.join(CORPUS * 3)), ('https://b.org/', CORPUS[1])]
+
+    result = app.analyze_sentiment_chunked(pages)
+
+    window_pages, overall = reference_chunked(pages, tiny_model)
+    prediction = int(torch.argmax(overall))
+    assert result['label'] == app.SENTIMENT_LABELS[prediction]
+    assert result['score'] == pytest.approx(overall[prediction].item(), abs=1e-5)
+    assert [page['windows'] for page in result['pages']] == [int((window_pages == i).sum()) for i in range(2)]
+    assert app.sentiment_batcher.metrics()['items'] == len(window_pages)
+
+
+def test_single_mode_goes_through_the_batcher(tiny_model):
+    result = app.analyze_sentiment(CORPUS[0])
+
+    inputs = tiny_model(CORPUS[0], return_tensors='pt', truncation=True, max_length=512)
+    scores = app.sentiment_backend.predict_proba(inputs)[0]
+    assert result['label'] == app.SENTIMENT_LABELS[int(scores.argmax())]
+    assert result['score'] == pytest.approx(scores.max().item(), abs=1e-5)
+    assert app.sentiment_batcher.metrics()['batches'] == 1
+
+
+def test_a_long_scraped_page_spans_several_windows():
+    html = '<html><body>' + ''.join(f"<p>{sentence}</p>" for sentence in CORPUS * 200) + '</body></html>'
+    text = app.extract_text(html)
+
+    windows = corpus_tokenizer()(
+        text, truncation=True, max_length=app.SENTIMENT_WINDOW_TOKENS, stride=app.SENTIMENT_WINDOW_STRIDE,
+        return_overflowing_tokens=True
+    )['input_ids']
+
+    assert app.SENTIMENT_MODE == 'chunked'
+    assert len(text) == app.PAGE_TEXT_CHARS
+    assert len(windows) >= 3  # 1000 characters fit in one window, which never slid
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from sentiment_batcher import SentimentBatcher
+
+
+def test_concurrent_requests_share_a_batch_and_get_their_own_rows():
+    batches = []
+    started = threading.Barrier(3)
+
+    def run_batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = SentimentBatcher(run_batch, max_batch_size=16, max_wait_ms=200)
+    results = {}
+
+    def submit(name, items):
+        started.wait()
+        results[name] = batcher.submit(items).result(timeout=5)
+
+    threads = [threading.Thread(target=submit, args=args) for args in (('a', [1, 2, 3]), ('b', [4]), ('c', [5, 6]))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {'a': [10, 20, 30], 'b': [40], 'c': [50, 60]}
+    assert len(batches) == 1 and sorted(batches[0]) == [1, 2, 3, 4, 5, 6]
+    assert batcher.metrics()['requests'] == 3 and batcher.metrics()['items'] == 6
+
+
+def test_a_request_larger_than_the_batch_size_is_not_split():
+    batches = []
+
+    def run_batch(items):
+        batches.append(len(items))
+        return items
+
+    batcher = SentimentBatcher(run_batch, max_batch_size=2, max_wait_ms=1)
+
+    assert batcher.submit(list(range(5))).result(timeout=5) == [0, 1, 2, 3, 4]
+    assert batches == [5]
+
+
+def test_predict_returns_the_single_result():
+    batcher = SentimentBatcher(lambda items: [f"scored {item}" for item in items], max_wait_ms=1)
+
+    assert batcher.predict('text', timeout=5) == 'scored text'
+    assert batcher.submit([]).result(timeout=5) == []
+
+
+def test_errors_reach_every_request_of_the_batch():
+    def run_batch(items):
+        raise RuntimeError('model crashed')
+
+    batcher = SentimentBatcher(run_batch, max_wait_ms=1)
+
+    with pytest.raises(RuntimeError, match='model crashed'):
+        batcher.predict('text', timeout=5)
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+release = threading.Event()
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Start callers threads on flight.do(key, fn) while fn is held, return their outcomes"""
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(flight.do, key, fn) for _ in range(callers)]
+        while flight.stats()['coalesced'] < callers - 1:
+            threading.Event().wait(0.01)
+        release.set()
+        return [future.exception() or future.result() for future in futures]
+
+
+@pytest.fixture(autouse=True)
+def reset_release():
+    release.clear()
+
+
+def test_concurrent_calls_for_one_key_share_a_single_run():
+    flight = SingleFlight()
+    runs = []
+
+    def verify():
+        runs.append(1)
+        release.wait(5)
+        return {'trust_score': 80}
+
+    outcomes = run_concurrently(flight, 'goonj', verify, 8)
+
+    assert len(runs) == 1
+    assert all(result == {'trust_score': 80} for result, _ in outcomes)
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * 7
+    assert flight.stats() == {'in_flight': 0, 'coalesced': 7}
+
+
+def test_an_exception_is_raised_in_every_waiting_caller():
+    flight = SingleFlight()
+
+    def verify():
+        release.wait(5)
+        raise RuntimeError('search failed')
+
+    outcomes = run_concurrently(flight, 'goonj', verify, 4)
+
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_the_key_is_released_once_the_run_finishes():
+    flight = SingleFlight()
+    results = iter([1, 2])
+
+    assert flight.do('goonj', lambda: next(results)) == (1, False)
+    assert flight.do('goonj', lambda: next(results)) == (2, False)
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    started = threading.Barrier(2, timeout=5)
+
+    def verify(name):
+        started.wait()  # only passes if both keys run at the same time
+        return name
+
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(flight.do, name, verify, name) for name in ('goonj', 'cry')]
+        assert [future.result() for future in futures] == [('goonj', False), ('cry', False)]
+
+
+def test_async_calls_for_one_key_share_a_single_run():
+    flight = AsyncSingleFlight()
+    runs = []
+
+    async def verify(name):
+        runs.append(name)
+        await asyncio.sleep(0.05)
+        return name.upper()
+
+    async def main():
+        return await asyncio.gather(*(flight.do('goonj', verify, 'goonj') for _ in range(5)))
+
+    outcomes = asyncio.run(main())
+
+    assert runs == ['goonj']
+    assert outcomes == [('GOONJ', False)] + [('GOONJ', True)] * 4
+    assert flight.stats() == {'in_flight': 0, 'coalesced': 4}
+
+
+def test_async_exception_reaches_every_caller():
+    flight = AsyncSingleFlight()
+
+    async def verify():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('search failed')
+
+    async def main():
+        return await asyncio.gather(*(flight.do('goonj', verify) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(outcome, RuntimeError) for outcome in asyncio.run(main()))
+
+
+def test_a_cancelled_async_caller_does_not_cancel_the_shared_run():
+    flight = AsyncSingleFlight()
+
+    async def verify():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def main():
+        impatient = asyncio.ensure_future(flight.do('goonj', verify))
+        patient = asyncio.ensure_future(flight.do('goonj', verify))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(main()) == ('done', True)
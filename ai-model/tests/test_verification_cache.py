@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from verification_cache import VerificationCache, normalize_ngo_name, parse_force_refresh, parse_max_age
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return VerificationCache('test', path=str(tmp_path / 'cache.db'), ttl=3600, max_entries=3)
+
+
+def test_names_share_a_key_regardless_of_case_articles_and_legal_suffixes():
+    assert normalize_ngo_name('The Akshaya Patra Foundation') == 'akshaya patra'
+    assert normalize_ngo_name('AKSHAYA  PATRA') == 'akshaya patra'
+    assert normalize_ngo_name('Smile & Hope Trust') == 'smile and hope'
+    assert normalize_ngo_name('Foundation') == 'foundation'
+
+
+def test_put_then_get_returns_the_result_and_its_age(cache):
+    cache.put('Goonj', {'trust_score': 80})
+
+    result, age = cache.get('goonj')
+
+    assert result == {'trust_score': 80}
+    assert 0 <= age < 5
+    assert cache.stats()['hits'] == 1
+
+
+def test_max_age_rejects_older_results(cache, monkeypatch):
+    cache.put('Goonj', {'trust_score': 80})
+    now = time.time()
+    monkeypatch.setattr('verification_cache.time.time', lambda: now + 100)
+
+    assert cache.get('Goonj', max_age=50) is None
+    assert cache.get('Goonj', max_age=200) is not None
+    assert cache.get('Goonj', max_age=0) is None
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for name in ('A1', 'B1', 'C1'):
+        cache.put(name, {'name': name})
+    cache.get('A1')
+    cache.put('D1', {'name': 'D1'})
+
+    assert cache.get('A1') is not None
+    assert cache.get('B1') is None
+    assert cache.stats()['entries'] == 3
+
+
+def test_update_merges_fields_into_cached_results(cache):
+    cache.put('Goonj', {'trust_score': 80, 'notes': ['a']})
+
+    assert cache.update({'Goonj': {'trust_score': 70}, 'Unknown': {'trust_score': 1}}) == 1
+    assert cache.get('Goonj')[0] == {'trust_score': 70, 'notes': ['a']}
+
+
+@pytest.mark.parametrize('value', [0, 60, 1.5, None])
+def test_parse_max_age_accepts_non_negative_numbers(value):
+    assert parse_max_age(value) == value
+
+
+@pytest.mark.parametrize('value', ['abc', '60', -1, True, float('nan'), float('inf'), [60], {}])
+def test_parse_max_age_rejects_anything_else(value):
+    with pytest.raises(ValueError):
+        parse_max_age(value)
+
+
+def test_parse_force_refresh_only_accepts_booleans():
+    assert parse_force_refresh(None) is False
+    assert parse_force_refresh(True) is True
+    assert parse_force_refresh(False) is False
+    for value in ('false', 'true', 0, 1, [], {}):
+        with pytest.raises(ValueError):
+            parse_force_refresh(value)
@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip('flask')
+import app  # noqa: E402
+import app_simple  # noqa: E402
+
+
+@pytest.fixture(params=[app, app_simple], ids=['full', 'simple'])
+def client(request):
+    return request.param.app.test_client()
+
+
+@pytest.mark.parametrize('max_age', ['abc', -5, [1]])
+def test_verify_ngo_rejects_a_bad_max_age(client, max_age):
+    response = client.post('/verify_ngo', json={'ngo_name': 'Goonj', 'max_age': max_age})
+
+    assert response.status_code == 400
+    assert 'max_age' in response.get_json()['error']
+
+
+def test_batch_rejects_a_bad_max_age(client):
+    response = client.post('/verify_ngo/batch', json={'ngo_names': ['Goonj'], 'max_age': 'abc'})
+
+    assert response.status_code == 400
+    assert 'max_age' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('force_refresh', ['false', 0, 1, 'yes'])
+def test_verify_ngo_rejects_a_non_boolean_force_refresh(client, force_refresh):
+    response = client.post('/verify_ngo', json={'ngo_name': 'Goonj', 'force_refresh': force_refresh})
+
+    assert response.status_code == 400
+    assert 'force_refresh' in response.get_json()['error']
+
+
+def test_batch_rejects_a_non_boolean_force_refresh(client):
+    response = client.post('/verify_ngo/batch', json={'ngo_names': ['Goonj'], 'force_refresh': 'false'})
+
+    assert response.status_code == 400
+    assert 'force_refresh' in response.get_json()['error']
+
+
+def test_verify_ngo_rejects_a_bad_deadline(client):
+    response = client.post('/verify_ngo', json={'ngo_name': 'Goonj', 'deadline_ms': 'soon'})
+
+    assert response.status_code == 400
+
+
+def test_async_verification_rejects_an_internal_callback_url(client):
+    response = client.post(
+        '/verify_ngo', json={'ngo_name': 'Goonj', 'async': True, 'callback_url': 'http://127.0.0.1:8080/admin'}
+    )
+
+    assert response.status_code == 400
+    assert 'non-public' in response.get_json()['error']
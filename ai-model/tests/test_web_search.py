@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+import app  # noqa: E402
+import app_simple  # noqa: E402
+from deadline import Deadline  # noqa: E402
+
+
+def result(url):
+    return {'title': url, 'url': url, 'snippet': ''}
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Record the domain probes perform_web_search starts; only www.goonj.org answers"""
+    probed = []
+    lock = threading.Lock()
+
+    def probe_url(url):
+        with lock:
+            probed.append(url)
+        return url == 'https://www.goonj.org'
+
+    monkeypatch.setattr(app_simple, 'probe_url', probe_url)
+    return probed
+
+
+def test_no_probes_when_duckduckgo_finds_results(monkeypatch, probes):
+    monkeypatch.setattr(app_simple, 'run_search_query', lambda query, deadline: [result(f"https://{query}.example/")])
+
+    results = app_simple.perform_web_search('Goonj')
+
+    assert len(results) == 3
+    assert probes == []
+
+
+def test_probes_start_once_duckduckgo_finds_nothing(monkeypatch, probes):
+    monkeypatch.setattr(app_simple, 'run_search_query', lambda query, deadline: [])
+
+    results = app_simple.perform_web_search('Goonj')
+
+    assert [r['url'] for r in results] == ['https://www.goonj.org']
+    assert probes[0] == 'https://www.goonj.org'
+
+
+def test_nothing_found_adds_no_placeholder_links(monkeypatch, probes):
+    # The fallback once listed NGO database search pages for every name, which
+    # counted as results; an NGO nobody has heard of must score as one
+    monkeypatch.setattr(app_simple, 'run_search_query', lambda query, deadline: [])
+
+    result = app_simple.run_verification('Unheard Of Welfare Society')
+
+    assert result['num_links'] == 0
+    assert result['links'] == []
+    assert 'No web presence detected - verification needed' in result['notes']
+    weights = app_simple.SCORING_WEIGHTS
+    expected = weights['base'] + weights['legitimate_name'] + int(0.5 * weights['sentiment']) + weights['results_none']
+    assert result['trust_score'] == expected
+
+
+def test_probes_start_after_the_grace_period_when_duckduckgo_is_slow(monkeypatch, probes):
+    def slow_query(query, deadline):
+        time.sleep(0.3)
+        return [result(f"https://{query}.example/")]
+
+    monkeypatch.setattr(app_simple, 'run_search_query', slow_query)
+    monkeypatch.setattr(app_simple, 'SEARCH_PROBE_GRACE', 0.05)
+
+    results = app_simple.perform_web_search('Goonj')
+
+    assert len(results) == 3
+    assert probes  # started while the queries were still running
+
+
+class SlowDDGS:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def text(self, query, max_results=10):
+        time.sleep(self.seconds)
+        return [{'href': 'https://goonj.org', 'body': 'Goonj', 'title': 'Goonj'}]
+
+
+def test_the_search_is_skipped_when_no_budget_is_left(monkeypatch, probes):
+    monkeypatch.setattr(app_simple, 'run_search_query', lambda query, deadline: pytest.fail('searched'))
+    monkeypatch.setattr(app, 'get_ddgs', lambda: pytest.fail('searched'))
+    spent = Deadline(0)
+
+    assert app_simple.perform_web_search('Goonj', deadline=spent) == []
+    assert app.search_ngo('Goonj', deadline=spent) == ([], [])
+    assert spent.skipped == ['search']
+    assert probes == []
+
+
+def test_the_full_engine_stops_waiting_for_duckduckgo_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(app, 'get_ddgs', lambda: SlowDDGS(1))
+    deadline = Deadline(100)
+    started = time.monotonic()
+
+    assert app.search_ngo('Goonj', deadline=deadline) == ([], [])
+    assert time.monotonic() - started < 0.5
+    assert deadline.skipped == ['search']
+
+
+def test_searches_pass_the_deadline_to_the_rate_limiter(monkeypatch):
+    seen = []
+
+    def call(host, func, *args, deadline=None, **kwargs):
+        seen.append((host, deadline))
+        return func(*args)
+
+    monkeypatch.setattr(app.outbound, 'call', call)
+    monkeypatch.setattr(app, 'get_ddgs', lambda: SlowDDGS(0))
+    monkeypatch.setattr(app_simple, 'get_ddgs', lambda: SlowDDGS(0))
+    deadline = Deadline(5000)
+
+    assert app.search_ngo('Goonj', deadline=deadline)[0] == ['https://goonj.org']
+    assert app_simple.run_search_query('Goonj NGO', deadline)[0]['url'] == 'https://goonj.org'
+    assert app_simple.run_search_query('Goonj NGO')[0]['url'] == 'https://goonj.org'
+    assert seen == [('duckduckgo.com', deadline.expires)] * 2 + [('duckduckgo.com', None)]
+    assert deadline.skipped == []
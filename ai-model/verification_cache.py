@@ -0,0 +1,254 @@
+"""
+Persistent verification result cache
+
+Results are stored in a local SQLite database so every gunicorn worker shares
+the same cache and entries survive restarts. Entries expire after a TTL and the
+least recently used ones are evicted once the cache grows past its size limit.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+CACHE_PATH = os.getenv('VERIFY_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verification_cache.db'))
+CACHE_TTL = int(os.getenv('VERIFY_CACHE_TTL', 30 * 24 * 60 * 60))  # 30 days
+CACHE_MAX_ENTRIES = int(os.getenv('VERIFY_CACHE_MAX_ENTRIES', 5000))
+
+
+# Words that only state an NGO's legal form; dropped from the end of a name
+LEGAL_SUFFIXES = {
+    'foundation', 'trust', 'charitable', 'society', 'ngo', 'organisation', 'organization', 'org',
+    'association', 'sanstha', 'sansthan', 'samiti', 'inc', 'incorporated', 'ltd', 'limited', 'pvt',
+    'private', 'llp', 'co', 'company'
+}
+
+
+# Spellings of one legal form, so "Pvt Ltd" and "Private Limited" share a key
+LEGAL_SUFFIX_ALIASES = {
+    'organization': 'organisation', 'org': 'organisation', 'incorporated': 'inc', 'limited': 'ltd',
+    'private': 'pvt', 'company': 'co'
+}
+
+
+def ngo_name_words(ngo_name):
+    """
+    Words of an NGO name as (name, legal suffix) lists
+
+    Case, accents, punctuation, "&" vs "and" and a leading "The" are ignored;
+    the trailing legal-form words ("Foundation", "Pvt Ltd", ...) are split off,
+    unless the name is made only of such words.
+    """
+    text = unicodedata.normalize('NFKD', ngo_name or '')
+    # Accents are dropped from Latin letters only; other scripts write vowels as combining marks
+    text = ''.join(
+        c for i, c in enumerate(text) if not (unicodedata.combining(c) and i and text[i - 1].isascii())
+    )
+    text = re.sub(r"['’]", '', unicodedata.normalize('NFKC', text).lower().replace('&', ' and '))
+    words = ''.join(c if c.isalnum() or unicodedata.category(c)[0] == 'M' else ' ' for c in text).split()
+    if len(words) > 1 and words[0] == 'the':
+        words = words[1:]
+    end = len(words)
+    while end > 1 and words[end - 1] in LEGAL_SUFFIXES:
+        end -= 1
+    return words[:end], [LEGAL_SUFFIX_ALIASES.get(word, word) for word in words[end:]]
+
+
+def normalize_ngo_name(ngo_name):
+    """
+    Canonical name of an NGO, without its legal suffix
+
+    "The Akshaya Patra Foundation" and "akshaya patra" share it. Used to match
+    names against the registry, where a match only counts towards the score.
+    """
+    return ' '.join(ngo_name_words(ngo_name)[0])
+
+
+def ngo_name_key(ngo_name):
+    """
+    Canonical key of an NGO: its canonical name followed by its legal suffix
+
+    "The Akshaya Patra Foundation" and "akshaya patra foundation" share a key,
+    while "Helping Hands Trust" and "Helping Hands Society" are different NGOs.
+    Cached results, saved features and verified names are stored under it.
+    """
+    name, suffix = ngo_name_words(ngo_name)
+    return ' '.join(name + suffix)
+
+
+def legal_suffix(key):
+    """The legal suffix at the end of a canonical key ('' if there is none)"""
+    return ' '.join(ngo_name_words(key)[1])
+
+
+def normalize_registration_id(value):
+    """Registration ID key: uppercase, without spaces and punctuation"""
+    return re.sub(r'[^0-9A-Z]', '', str(value or '').upper())
+
+
+def parse_max_age(value):
+    """Validate the optional max_age of a request in seconds (None means the cache TTL)"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError('max_age must be a non-negative number of seconds')
+    return value
+
+
+def parse_force_refresh(value):
+    """Validate the optional force_refresh of a request (a JSON boolean; None means false)"""
+    if value is None:
+        return False
+    if not isinstance(value, bool):
+        raise ValueError('force_refresh must be true or false')
+    return value
+
+
+class VerificationCache:
+    """SQLite-backed TTL + LRU cache of /verify_ngo results"""
+
+    def __init__(self, namespace, path=CACHE_PATH, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.namespace = namespace
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connect(self):
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    ngo_name TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, ngo_name):
+        return f"{self.namespace}:{ngo_name_key(ngo_name)}"
+
+    def _count(self, conn, name):
+        conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, 1) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + 1',
+            (f"{self.namespace}:{name}",)
+        )
+
+    def get(self, ngo_name, max_age=None):
+        """
+        Return (result, age_seconds) for a cached verification, or None on a miss
+
+        max_age lets a caller demand a fresher result than the cache TTL.
+        """
+        max_age = self.ttl if max_age is None else min(float(max_age), self.ttl)
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT result, created_at FROM results WHERE key = ?',
+                (self._key(ngo_name),)
+            ).fetchone()
+
+            if row is None or now - row[1] > max_age:
+                self._count(conn, 'misses')
+                return None
+
+            conn.execute('UPDATE results SET accessed_at = ? WHERE key = ?', (now, self._key(ngo_name)))
+            self._count(conn, 'hits')
+            return json.loads(row[0]), now - row[1]
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache read error: {e}")
+            return None
+
+    def put(self, ngo_name, result):
+        """Store a verification result and evict least recently used entries"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO results (key, ngo_name, result, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (self._key(ngo_name), ngo_name, json.dumps(result), now, now)
+            )
+            conn.execute('DELETE FROM results WHERE created_at < ?', (now - self.ttl,))
+            conn.execute(
+                'DELETE FROM results WHERE key IN ('
+                'SELECT key FROM results WHERE key LIKE ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (f"{self.namespace}:%", self.max_entries)
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache write error: {e}")
+
+    def update(self, updates):
+        """
+        Merge fields into cached results, e.g. {ngo_name: {'trust_score': 72.5}}
+
+        Entries keep their age; names that are not cached are ignored. Returns the
+        number of entries updated.
+        """
+        updated = 0
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN')
+            try:
+                for ngo_name, fields in updates.items():
+                    key = self._key(ngo_name)
+                    row = conn.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+                    if row is None:
+                        continue
+                    conn.execute(
+                        'UPDATE results SET result = ? WHERE key = ?',
+                        (json.dumps({**json.loads(row[0]), **fields}), key)
+                    )
+                    updated += 1
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache write error: {e}")
+            return 0
+        return updated
+
+    def stats(self):
+        """Hit/miss counters (shared by all workers) and current size"""
+        try:
+            conn = self._connect()
+            counters = dict(conn.execute(
+                'SELECT name, value FROM stats WHERE name LIKE ?',
+                (f"{self.namespace}:%",)
+            ).fetchall())
+            entries = conn.execute(
+                'SELECT COUNT(*) FROM results WHERE key LIKE ?',
+                (f"{self.namespace}:%",)
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache stats error: {e}")
+            return {'error': str(e)}
+
+        hits = counters.get(f"{self.namespace}:hits", 0)
+        misses = counters.get(f"{self.namespace}:misses", 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl
+        }